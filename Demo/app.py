@@ -1,12 +1,16 @@
 # app.py
-import os
-import tempfile
 from io import BytesIO
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 
-from logic import ProcesadorLogico
+from logic import (
+    ProcesadorLogico, EsquemaOperaciones, CalculosAuxiliares, IndiceDuplicados, MODOS_EXTRACCION, FORMATOS_EXPORTACION,
+)
+from cache_resumenes import CacheResumenes
+from cache_exportaciones import CacheExportaciones
+from historial_operaciones import HistorialOperaciones
+import instrumentacion
 
 # ---------------------------
 # Configuración general
@@ -22,8 +26,33 @@ st.title("📊 Validador de Reportes - Tarjeta NARANJA")
 # ---------------------------
 # Estado global
 # ---------------------------
+@st.cache_resource
+def obtener_cache_resumenes():
+    """Caché en disco compartida por todas las sesiones (evita re-parsear PDFs en cada rerun)."""
+    return CacheResumenes()
+
+@st.cache_resource
+def obtener_cache_exportaciones():
+    """Exportaciones ya generadas, en memoria y compartidas por todas las sesiones."""
+    return CacheExportaciones()
+
+@st.cache_resource
+def obtener_historial():
+    """Historial de operaciones en disco (persiste entre sesiones)."""
+    return HistorialOperaciones()
+
+def crear_procesador():
+    return ProcesadorLogico(
+        cache=obtener_cache_resumenes(), historial=obtener_historial(), cache_exportaciones=obtener_cache_exportaciones()
+    )
+
 if "procesador" not in st.session_state:
-    st.session_state.procesador = ProcesadorLogico()
+    st.session_state.procesador = crear_procesador()
+
+# Tiempos por sesión: lo que se mide en esta corrida del script queda en el registro de la sesión
+if "registro_tiempos" not in st.session_state:
+    st.session_state.registro_tiempos = instrumentacion.Registro()
+instrumentacion.activar(st.session_state.registro_tiempos)
 
 if "df_combinado" not in st.session_state:
     st.session_state.df_combinado = None
@@ -44,7 +73,11 @@ if "archivos_cargados" not in st.session_state:
 if "archivos_duplicados" not in st.session_state:
     st.session_state.archivos_duplicados = {}
 
+if "indice_duplicados" not in st.session_state:
+    st.session_state.indice_duplicados = IndiceDuplicados()
+
 procesador: ProcesadorLogico = st.session_state.procesador
+indice_duplicados: IndiceDuplicados = st.session_state.indice_duplicados
 
 # ============================================================
 # Funciones que se conservan/adaptan desde InterfazGrafica
@@ -75,7 +108,7 @@ def construir_resumen_inicial():
         c3.metric("Devoluciones (DEV)", f"{len(dev):,}")
 
         # Tabla de operaciones
-        st.dataframe(df, use_container_width=True)
+        st.dataframe(EsquemaOperaciones.vista_formateada(df), use_container_width=True)
 
         # Metadatos
         meta = procesador.metadatos_por_resumen.get(clave, {})
@@ -102,11 +135,42 @@ def combinar_datos_archivos():
         procesador.operaciones_por_resumen.values(), ignore_index=True
     )
 
-    # IMPORTANTE: fijar combinado como base para detectar planes y recalcular
+    # IMPORTANTE: fijar combinado como base para detectar planes y recalcular.
+    # concat pierde las categorías si difieren entre resúmenes; el setter las rearma.
     procesador.dataframe_operaciones = df_combinado.copy()
+    df_combinado = procesador.dataframe_operaciones
     st.session_state.df_combinado = df_combinado
     return df_combinado
 
+def manejar_historial():
+    """
+    Guarda los resúmenes cargados en el historial en disco y permite traer
+    resúmenes/meses guardados como base combinada, sin volver a subir PDFs.
+    """
+    historial = procesador.historial
+    cargados = [d["resumen"] for d in st.session_state.archivos_cargados.values() if "resumen" in d]
+
+    if st.button("💾 Guardar cargados en historial", disabled=not cargados):
+        guardados = procesador.guardar_en_historial(cargados)
+        st.success(f"Guardados {len(guardados)} resumen(es) en el historial.")
+
+    disponibles = historial.resumenes()
+    if not disponibles:
+        st.caption("El historial está vacío.")
+        return
+
+    elegidos = st.multiselect("Resúmenes del historial", disponibles, default=disponibles)
+    meses = sorted({m for r in elegidos for m in historial.meses(r)})
+    c1, c2 = st.columns(2)
+    desde = c1.selectbox("Desde (mes)", [""] + meses, key="historial_desde")
+    hasta = c2.selectbox("Hasta (mes)", [""] + meses, key="historial_hasta")
+
+    if st.button("📚 Cargar desde historial", disabled=not elegidos):
+        df_historial = procesador.cargar_desde_historial(elegidos, desde or None, hasta or None)
+        st.session_state.df_combinado = df_historial
+        st.success(f"Cargados {len(df_historial):,} registros del historial.")
+        st.dataframe(EsquemaOperaciones.vista_formateada(df_historial), use_container_width=True)
+
 def pedir_porcentajes():
     """
     (Conservada) Editor de porcentajes por 'variante_plan' (arancel/interes/bonificacion)
@@ -160,23 +224,26 @@ def construir_vista_previa():
         st.warning("No hay resultados para vista previa. Ejecutá el recálculo.")
         return
 
-    df = procesador.dataframe_resultados.copy()
+    df = EsquemaOperaciones.vista_formateada(procesador.dataframe_resultados)
     st.subheader("Tabla completa de resultados")
     st.dataframe(df, use_container_width=True)
 
-    errores = df[df["estado"] == "Incorrecta"].copy()
+    errores = EsquemaOperaciones.vista_en_pesos(
+        procesador.dataframe_resultados[procesador.dataframe_resultados["estado"] == "Incorrecta"]
+    )
     if not errores.empty:
         st.subheader("❌ Operaciones con errores")
-        st.dataframe(errores, use_container_width=True)
+        st.dataframe(df[df["estado"] == "Incorrecta"], use_container_width=True)
 
         # Resumen por variante
         st.subheader("📌 Resumen de errores por variante")
         resumen = (errores
-                   .groupby("variante_plan")
+                   .groupby("variante_plan", observed=True)
                    .agg(operaciones_erroneas=("estado", "count"),
                         diferencia_total=("diferencia", "sum"))
                    .reset_index()
                    .sort_values("operaciones_erroneas", ascending=False))
+        resumen["diferencia_total"] = CalculosAuxiliares.formatear_columna_moneda(resumen["diferencia_total"])
         st.dataframe(resumen, use_container_width=True)
     else:
         st.success("✅ No se encontraron operaciones con errores.")
@@ -216,7 +283,7 @@ def mostrar_resultados_recalculo():
     # Detalle expandible por plan
     for variante, datos in reporte.items():
         with st.expander(f"🔎 Detalle de errores: {variante}"):
-            st.dataframe(datos["detalle_errores"], use_container_width=True)
+            st.dataframe(EsquemaOperaciones.vista_formateada(datos["detalle_errores"]), use_container_width=True)
 
 def _crear_figura_pie_desde_df(df: pd.DataFrame):
     """
@@ -238,7 +305,7 @@ def actualizar_grafico_planes():
     """
     (Conservada) Muestra el gráfico de distribución de planes.
     - En UI: mostramos con matplotlib -> st.pyplot(fig)
-    - Para PDF: el procesador ya tiene guardar_grafico_planes_temp()
+    - Para PDF: el informe dibuja su propio gráfico vectorial (informe_pdf.grafico_torta)
     """
     df_base = st.session_state.df_combinado or procesador.dataframe_operaciones
     if df_base is None or df_base.empty:
@@ -254,17 +321,22 @@ def actualizar_grafico_planes():
 def manejar_exportacion():
     """
     (Conservada) Exporta CSV/Excel/PDF usando la lógica del ProcesadorLogico.
-    - Usa archivos temporales y expone botones de descarga.
+    - Cada formato se genera en memoria recién cuando se lo pide (sin archivos temporales).
+    - "Preparar seleccionados" genera los que falten en paralelo.
+    - Lo ya generado (en esta sesión o en otra, con los mismos resultados) sale de la caché de exportaciones.
     """
     if procesador.dataframe_resultados is None or procesador.dataframe_resultados.empty:
         st.warning("No hay resultados para exportar. Ejecutá el recálculo primero.")
         return
 
-    st.caption("Elegí el/los formatos and descargá los archivos generados.")
+    st.caption("Elegí el/los formatos, prepará los archivos y descargalos.")
     col1, col2, col3 = st.columns(3)
     chk_csv = col1.checkbox("CSV", value=True)
     chk_xlsx = col2.checkbox("Excel", value=True)
     chk_pdf = col3.checkbox("PDF", value=True)
+    procesador.excel_hojas_por_variante = col2.checkbox(
+        "Una hoja por variante de plan", value=procesador.excel_hojas_por_variante, disabled=not chk_xlsx
+    )
 
     formatos = []
     if chk_csv: formatos.append("csv")
@@ -275,32 +347,47 @@ def manejar_exportacion():
         st.info("Seleccioná al menos un formato.")
         return
 
-    if st.button("📦 Generar archivos"):
+    preparadas = {}
+    for fmt in formatos:
+        datos = procesador.exportacion_en_cache(fmt)
+        if datos is not None:
+            preparadas[fmt] = datos
+    pendientes = [fmt for fmt in formatos if fmt not in preparadas]
+    if len(pendientes) > 1 and st.button("📦 Preparar seleccionados"):
         with st.spinner("Generando exportaciones…"):
-            with tempfile.TemporaryDirectory() as tmpdir:
-                base = os.path.join(tmpdir, "reporte")
-                rutas = procesador.exportacion_de_informes(formatos, ruta_base=base)
-
-                # Mostrar botones de descarga
-                for fmt, ruta in rutas.items():
-                    if not os.path.exists(ruta):
-                        continue
-                    with open(ruta, "rb") as f:
-                        data = f.read()
-                    if fmt == "csv":
-                        mime = "text/csv"
-                    elif fmt == "excel":
-                        mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    else:
-                        mime = "application/pdf"
-
-                    st.download_button(
-                        label=f"⬇️ Descargar {fmt.upper()}",
-                        data=data,
-                        file_name=f"reporte.{ 'xlsx' if fmt=='excel' else fmt }",
-                        mime=mime,
-                    )
-        st.success("Exportaciones listas ✅")
+            preparadas.update(procesador.exportar_en_memoria(pendientes))
+        for fmt, error in procesador.errores_exportacion.items():
+            st.error(f"No se pudo exportar {fmt.upper()}: {error}")
+
+    for fmt, columna in zip(formatos, st.columns(len(formatos))):
+        extension, mime = FORMATOS_EXPORTACION[fmt]
+        if fmt not in preparadas and columna.button(f"⚙️ Preparar {fmt.upper()}", key=f"preparar_{fmt}"):
+            with st.spinner(f"Generando {fmt.upper()}…"):
+                try:
+                    preparadas[fmt] = procesador.exportar_bytes(fmt)
+                except Exception as e:
+                    columna.error(f"No se pudo exportar {fmt.upper()}: {e}")
+        if fmt in preparadas:
+            columna.download_button(
+                label=f"⬇️ Descargar {fmt.upper()}",
+                data=preparadas[fmt],
+                file_name=f"reporte.{extension}",
+                mime=mime,
+                key=f"descargar_{fmt}",
+            )
+
+def mostrar_panel_tiempos(contenedor):
+    """Panel plegable con los tiempos de la sesión (se llena al final del script, ya con esta corrida)."""
+    registro_tiempos = st.session_state.registro_tiempos
+    with contenedor.expander("⏱️ Tiempos", expanded=False):
+        filas_tiempos = registro_tiempos.filas()
+        if filas_tiempos:
+            st.dataframe(pd.DataFrame(filas_tiempos).fillna(0), hide_index=True, use_container_width=True)
+        else:
+            st.caption("Todavía no se midió nada en esta sesión.")
+        if st.button("Reiniciar tiempos"):
+            registro_tiempos.reiniciar()
+            st.rerun()
 
 def manejar_recalculo():
     """
@@ -333,37 +420,45 @@ def manejar_carga_pdf_streamlit(uploaded_files):
     """
     Reemplazo completo de manejar_carga_pdf con detección de duplicados
     """
-    for i, archivo in enumerate(uploaded_files):
-        with st.spinner(f"Procesando {archivo.name} ({i+1}/{len(uploaded_files)})..."):
-            # Extraer datos
-            df_ops = procesador.extraer_operaciones_del_pdf(archivo)
-            meta = procesador.extraer_metadatos_del_pdf(archivo)
-            
-            # Verificar duplicados por Tipo y Nº
-            tipo_numero = meta.get("tipo_numero", archivo.name)
-            duplicado = False
-            archivo_duplicado = None
-            
-            for ruta, datos in st.session_state.archivos_cargados.items():
-                if datos["metadatos"].get("tipo_numero") == tipo_numero and ruta != archivo.name:
-                    duplicado = True
-                    archivo_duplicado = ruta
-                    break
-            
-            if duplicado:
-                st.session_state.archivos_duplicados[archivo.name] = {
-                    "dataframe": df_ops,
-                    "metadatos": meta,
-                    "procesador": ProcesadorLogico(),
-                    "duplicado_de": archivo_duplicado
-                }
-                st.warning(f"Archivo duplicado detectado: {tipo_numero}")
-            else:
-                st.session_state.archivos_cargados[archivo.name] = {
-                    "dataframe": df_ops,
-                    "metadatos": meta,
-                    "procesador": procesador
-                }
+    with st.spinner(f"Procesando {len(uploaded_files)} archivo(s)..."):
+        # Extraer datos (una sola lectura por PDF, en paralelo y con caché)
+        resumenes = procesador.cargar_resumenes_lote(uploaded_files)
+
+    for archivo, resumen in zip(uploaded_files, resumenes):
+        if resumen.error:
+            st.error(f"No se pudo procesar {archivo.name}: {resumen.error}")
+            continue
+
+        df_ops = resumen.operaciones
+        meta = resumen.metadatos
+        tipo_numero = meta.get("tipo_numero", archivo.name)
+
+        # Duplicados por Tipo y Nº, bytes del PDF u operaciones (índice con búsquedas O(1))
+        coincidencias = indice_duplicados.buscar(archivo.name, resumen)
+
+        if coincidencias["duplicado_de"]:
+            st.session_state.archivos_duplicados[archivo.name] = {
+                "dataframe": df_ops,
+                "metadatos": meta,
+                "resumen_impositivo": resumen.resumen_impositivo,
+                "procesador": ProcesadorLogico(),
+                "duplicado_de": coincidencias["duplicado_de"],
+                "motivo": coincidencias["motivo"],
+                "resumen": resumen,
+            }
+            st.warning(f"Archivo duplicado detectado: {tipo_numero}")
+        else:
+            st.session_state.archivos_cargados[archivo.name] = {
+                "dataframe": df_ops,
+                "metadatos": meta,
+                "resumen_impositivo": resumen.resumen_impositivo,
+                "procesador": procesador,
+                "resumen": resumen,
+            }
+            indice_duplicados.registrar(archivo.name, resumen)
+
+            for otro, cantidad in coincidencias["operaciones_repetidas"].items():
+                st.warning(f"{archivo.name}: {cantidad:,} operación(es) ya figuran en {otro}")
 
 def mostrar_y_resolver_duplicados():
     """
@@ -379,6 +474,8 @@ def mostrar_y_resolver_duplicados():
             st.write(f"**Archivo:** {archivo}")
             st.write(f"**Tipo y Nº:** {datos['metadatos'].get('tipo_numero', 'No identificado')}")
             st.write(f"**Duplicado de:** {datos['duplicado_de']}")
+            if datos.get("motivo"):
+                st.write(f"**Coincide por:** {datos['motivo'].replace('_', ' ')}")
             
             opcion = st.radio(
                 f"¿Qué deseas hacer con {archivo}?",
@@ -396,13 +493,16 @@ def mostrar_y_resolver_duplicados():
                     if nuevo_tipo_numero:
                         datos["metadatos"]["tipo_numero"] = nuevo_tipo_numero
                         st.session_state.archivos_cargados[archivo] = datos
+                        indice_duplicados.registrar(archivo, datos["resumen"])
                         del st.session_state.archivos_duplicados[archivo]
                         st.rerun()
             
             elif opcion == "Reemplazar archivo existente":
                 if st.button("Confirmar reemplazo", key=f"reemplazar_{archivo}"):
                     del st.session_state.archivos_cargados[datos["duplicado_de"]]
+                    indice_duplicados.quitar(datos["duplicado_de"])
                     st.session_state.archivos_cargados[archivo] = datos
+                    indice_duplicados.registrar(archivo, datos["resumen"])
                     del st.session_state.archivos_duplicados[archivo]
                     st.rerun()
             
@@ -429,6 +529,7 @@ def mostrar_tabla_archivos():
             "Archivo": archivo,
             "Tipo y Nº": datos["metadatos"].get("tipo_numero", "Sin identificar"),
             "Operaciones": operaciones,
+            "Extracción": datos["resumen"].descripcion_extraccion() if datos.get("resumen") else "",
             "Acciones": archivo
         })
     
@@ -436,6 +537,8 @@ def mostrar_tabla_archivos():
     for i, fila in enumerate(datos_tabla):
         col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
         col1.write(fila["Archivo"])
+        if fila["Extracción"]:
+            col1.caption(fila["Extracción"])
         col2.write(fila["Tipo y Nº"])
         col3.write(f"{fila['Operaciones']:,}")
         
@@ -447,6 +550,7 @@ def mostrar_tabla_archivos():
     for archivo in archivos_a_eliminar:
         if archivo in st.session_state.archivos_cargados:
             del st.session_state.archivos_cargados[archivo]
+            indice_duplicados.quitar(archivo)
         st.rerun()
 
 def pedir_porcentajes_mejorado():
@@ -526,11 +630,18 @@ with st.sidebar:
     st.header("⚙️ Acciones")
     if st.button("🧹 Limpiar todo"):
         st.session_state.clear()
-        st.session_state.procesador = ProcesadorLogico()
+        st.session_state.procesador = crear_procesador()
         st.rerun()
 
     st.markdown("---")
+    procesador.modo_extraccion = st.selectbox(
+        "Extracción de operaciones",
+        MODOS_EXTRACCION,
+        index=MODOS_EXTRACCION.index(procesador.modo_extraccion),
+        help="texto: lee las filas de la capa de texto (más rápido); las páginas que no validan se leen con tablas.",
+    )
     st.caption("Subí uno o más PDFs del resumen de Tarjeta Naranja.")
+    panel_tiempos = st.container()
 
 uploaded_files = st.file_uploader(
     "📂 Subí tus archivos PDF",
@@ -565,7 +676,11 @@ with tab2:
         dfc = combinar_datos_archivos()
         if dfc is not None:
             st.success(f"Combinados {len(dfc):,} registros.")
-            st.dataframe(dfc, use_container_width=True)
+            st.dataframe(EsquemaOperaciones.vista_formateada(dfc), use_container_width=True)
+
+    st.markdown("---")
+    st.subheader("Historial de resúmenes")
+    manejar_historial()
 
     st.markdown("---")
     st.subheader("Detectar configuraciones de planes (desde combinado)")
@@ -630,3 +745,5 @@ with tab6:
 with tab7:
     st.subheader("📁 Archivos Cargados")
     mostrar_tabla_archivos()
+
+mostrar_panel_tiempos(panel_tiempos)
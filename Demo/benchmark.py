@@ -0,0 +1,276 @@
+"""
+Benchmark de punta a punta
+--------------------------
+
+Mide cada etapa del pipeline con resúmenes sintéticos (generador_resumenes.py)
+de distintos tamaños y guarda los resultados en JSON para comparar commits:
+
+    python benchmark.py --tamanos 1000 100000 1000000 --salida bench.json
+    python benchmark.py --tamanos 1000 --comparar bench.json
+
+Etapas: parseo del PDF, metadatos, detección de planes, recálculo, reporte
+por plan y exportación a CSV, Excel y PDF. Las posteriores al parseo usan
+las operaciones generadas directamente, así los tamaños grandes se pueden
+medir sin generar ni leer PDFs de decenas de miles de páginas. Las etapas
+que pasan de su límite de filas (`LIMITES_POR_DEFECTO`) se registran como
+omitidas; `--sin-limites` las corre igual.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ETAPAS = (
+    "parseo_pdf", "metadatos", "deteccion_planes", "recalculo", "reporte_por_plan",
+    "exportar_csv", "exportar_excel", "exportar_pdf",
+)
+TAMANOS_POR_DEFECTO = (1_000, 100_000, 1_000_000)
+# Más allá de esto la etapa tarda horas o no tiene sentido (Excel admite 1.048.576 filas)
+LIMITES_POR_DEFECTO = {"parseo_pdf": 100_000, "exportar_excel": 1_048_575, "exportar_pdf": 100_000}
+# Etapa -> etapa de la que necesita el resultado
+DEPENDENCIAS = {
+    "recalculo": "deteccion_planes",
+    "reporte_por_plan": "recalculo",
+    "exportar_csv": "recalculo",
+    "exportar_excel": "recalculo",
+    "exportar_pdf": "recalculo",
+}
+
+
+def _memoria_maxima_mb() -> Optional[float]:
+    """Pico de memoria residente del proceso hasta ahora (MB), si el sistema lo informa."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _commit_actual() -> Optional[str]:
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+class _Cronometro:
+    """Corre etapas en orden, midiendo tiempo y memoria, y respetando límites y dependencias."""
+
+    def __init__(self, operaciones: int, etapas: Iterable[str], limites: Dict[str, int]):
+        self.operaciones = operaciones
+        self.etapas = set(etapas)
+        self.limites = limites
+        self.resultados = {}
+
+    def correr(self, etapa: str, funcion):
+        """Corre `funcion()` si corresponde; devuelve su resultado o None si se omitió o falló.
+
+        `funcion` devuelve (resultado, detalle); el detalle se agrega a la
+        medición y puede reemplazar "segundos" si parte del tiempo no cuenta.
+        """
+        if etapa not in self.etapas:
+            return None
+        limite = self.limites.get(etapa)
+        if limite is not None and self.operaciones > limite:
+            self.resultados[etapa] = {"omitida": f"más de {limite:,} operaciones"}
+            return None
+        previa = DEPENDENCIAS.get(etapa)
+        if previa and "segundos" not in self.resultados.get(previa, {}):
+            self.resultados[etapa] = {"omitida": f"requiere {previa}"}
+            return None
+
+        inicio = time.perf_counter()
+        try:
+            resultado, detalle = funcion()
+        except Exception as e:
+            self.resultados[etapa] = {"error": f"{type(e).__name__}: {e}"}
+            return None
+        self.resultados[etapa] = {
+            "segundos": round(time.perf_counter() - inicio, 4),
+            **detalle,  # puede reemplazar "segundos"
+            "memoria_maxima_mb": _memoria_maxima_mb(),
+        }
+        return resultado
+
+
+def medir_tamano(
+    operaciones: int,
+    etapas: Iterable[str] = ETAPAS,
+    limites: Optional[Dict[str, int]] = None,
+    modo_extraccion: str = "tablas",
+    semilla: int = 0,
+) -> dict:
+    """Corre las etapas para un resumen sintético de `operaciones` filas y devuelve las mediciones."""
+    from generador_resumenes import GeneradorResumenes
+    from logic import ProcesadorLogico
+
+    generador = GeneradorResumenes(proporcion_errores=0.02, semilla=semilla)
+    inicio = time.perf_counter()
+    filas = generador.filas(operaciones)
+    dataframe = generador.dataframe(filas=filas)
+    preparacion = round(time.perf_counter() - inicio, 4)
+
+    cronometro = _Cronometro(operaciones, etapas, LIMITES_POR_DEFECTO if limites is None else limites)
+    procesador = ProcesadorLogico(modo_extraccion=modo_extraccion)
+
+    def parseo_pdf():
+        inicio_pdf = time.perf_counter()
+        datos_pdf = generador.pdf(filas=filas)
+        generacion = time.perf_counter() - inicio_pdf
+        inicio_lectura = time.perf_counter()
+        resumen = ProcesadorLogico(modo_extraccion=modo_extraccion).cargar_resumen_pdf(datos_pdf)
+        lectura = time.perf_counter() - inicio_lectura
+        if len(resumen.operaciones) != operaciones:
+            raise AssertionError(f"se leyeron {len(resumen.operaciones)} de {operaciones} operaciones")
+        return resumen, {
+            "segundos": round(lectura, 4),
+            "segundos_generacion": round(generacion, 4),
+            "bytes_pdf": len(datos_pdf),
+            "extraccion": resumen.extraccion,
+        }
+
+    def metadatos():
+        encontrados = procesador._metadatos_desde_texto(texto)
+        procesador.impuestos_retenciones_contribuciones(texto)
+        return None, {"metadatos": len(encontrados), "caracteres": len(texto)}
+
+    def deteccion_planes():
+        porcentajes = procesador.detectar_configuraciones_plan()
+        return porcentajes, {"variantes": len(porcentajes)}
+
+    def recalculo():
+        resultados = procesador.recalcular_con_porcentajes_ajustados(porcentajes)
+        return None, {"incorrectas": int((resultados["estado"] == "Incorrecta").sum())}
+
+    def reporte_por_plan():
+        return None, {"variantes_con_error": len(procesador.generar_reporte_por_plan())}
+
+    cronometro.correr("parseo_pdf", parseo_pdf)  # la generación del PDF no cuenta en "segundos"
+    texto = generador.texto(filas=filas)
+    cronometro.correr("metadatos", metadatos)
+    procesador.dataframe_operaciones = dataframe
+    porcentajes = cronometro.correr("deteccion_planes", deteccion_planes)
+    cronometro.correr("recalculo", recalculo)
+    cronometro.correr("reporte_por_plan", reporte_por_plan)
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as directorio:
+        def exportar(extension, funcion):
+            ruta = os.path.join(directorio, f"resultados.{extension}")
+            funcion(ruta)
+            return None, {"bytes": os.path.getsize(ruta)}
+
+        cronometro.correr("exportar_csv", lambda: exportar("csv", procesador._exportar_csv_interno))
+        cronometro.correr("exportar_excel", lambda: exportar("xlsx", procesador._exportar_excel_interno))
+        cronometro.correr("exportar_pdf", lambda: exportar("pdf", procesador._exportar_pdf_interno))
+
+    return {"operaciones": operaciones, "segundos_preparacion": preparacion, "etapas": cronometro.resultados}
+
+
+def ejecutar_benchmark(
+    tamanos: Iterable[int] = TAMANOS_POR_DEFECTO,
+    etapas: Iterable[str] = ETAPAS,
+    limites: Optional[Dict[str, int]] = None,
+    modo_extraccion: str = "tablas",
+    semilla: int = 0,
+    al_terminar_tamano=None,
+) -> dict:
+    """Mide todos los tamaños y devuelve el documento JSON (con commit y versiones)."""
+    import numpy
+    import pandas
+
+    documento = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "modo_extraccion": modo_extraccion,
+        "resultados": [],
+    }
+    for operaciones in tamanos:
+        medicion = medir_tamano(operaciones, etapas, limites, modo_extraccion, semilla)
+        documento["resultados"].append(medicion)
+        if al_terminar_tamano is not None:
+            al_terminar_tamano(medicion)
+    return documento
+
+
+def describir(medicion: dict) -> str:
+    """Resumen legible de un tamaño: una línea por etapa."""
+    lineas = [f"{medicion['operaciones']:,} operaciones"]
+    for etapa, datos in medicion["etapas"].items():
+        if "segundos" in datos:
+            estado = f"{datos['segundos']:.3f} s"
+        else:
+            estado = datos.get("error") or f"omitida ({datos['omitida']})"
+        lineas.append(f"  {etapa:<18} {estado}")
+    return "\n".join(lineas)
+
+
+def comparar(anterior: dict, actual: dict) -> str:
+    """Compara dos documentos del benchmark (tiempo actual / anterior por tamaño y etapa)."""
+    previos = {m["operaciones"]: m["etapas"] for m in anterior.get("resultados", [])}
+    lineas = [f"{anterior.get('commit') or '?'} -> {actual.get('commit') or '?'}"]
+    for medicion in actual["resultados"]:
+        etapas_previas = previos.get(medicion["operaciones"])
+        if etapas_previas is None:
+            continue
+        lineas.append(f"{medicion['operaciones']:,} operaciones")
+        for etapa, datos in medicion["etapas"].items():
+            previo = etapas_previas.get(etapa, {}).get("segundos")
+            if "segundos" not in datos or not previo:
+                continue
+            lineas.append(f"  {etapa:<18} {previo:9.3f} s -> {datos['segundos']:9.3f} s  (x{datos['segundos'] / previo:.2f})")
+    return "\n".join(lineas)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de punta a punta con resúmenes sintéticos")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=list(TAMANOS_POR_DEFECTO),
+                        help="Cantidades de operaciones a medir")
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=list(ETAPAS), help="Etapas a medir")
+    parser.add_argument("--modo", choices=("tablas", "texto"), default="tablas", help="Modo de extracción del PDF")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--sin-limites", action="store_true", help="Corre las etapas aunque pasen su límite de filas")
+    parser.add_argument("--salida", default=None, help="Archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", default=None, metavar="JSON", help="Resultados anteriores para comparar")
+    args = parser.parse_args(argv)
+
+    documento = ejecutar_benchmark(
+        args.tamanos, args.etapas, limites={} if args.sin_limites else None,
+        modo_extraccion=args.modo, semilla=args.semilla,
+        al_terminar_tamano=lambda medicion: print(describir(medicion), flush=True),
+    )
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as fh:
+            json.dump(documento, fh, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as fh:
+            print(comparar(json.load(fh), documento))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
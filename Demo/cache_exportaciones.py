@@ -0,0 +1,100 @@
+"""
+Caché en memoria de exportaciones
+---------------------------------
+
+Generar el PDF o el Excel de una conciliación grande lleva segundos; si nada
+cambió desde la última vez (ni los resultados, ni los porcentajes, ni las
+opciones) se sirven los mismos bytes:
+
+- **Clave**: la arma `ProcesadorLogico.huella_exportacion` (formato + huella
+  de los resultados, porcentajes ajustados, metadatos y opciones).
+- **Compartida**: en la app hay una sola instancia por proceso, así dos
+  sesiones que exportan la misma conciliación la generan una sola vez
+  (mientras una la genera, la otra espera y después la toma de la caché).
+- **Límite de tamaño** con desalojo LRU; lo que no entra no se guarda.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+LIMITE_BYTES_POR_DEFECTO = 128 * 1024 * 1024
+
+
+class CacheExportaciones:
+    """Bytes de exportaciones ya generadas, por clave, con límite total y desalojo LRU."""
+
+    def __init__(self, limite_bytes: int = LIMITE_BYTES_POR_DEFECTO):
+        self.limite_bytes = int(limite_bytes)
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, bytes]" = OrderedDict()
+        self._total = 0
+        self._generando = {}  # clave -> Lock de quien la está generando
+        self.aciertos = 0
+        self.generadas = 0
+
+    def obtener(self, clave: str) -> Optional[bytes]:
+        """Devuelve los bytes guardados bajo `clave` (y los marca como recién usados) o None."""
+        with self._lock:
+            datos = self._entradas.get(clave)
+            if datos is not None:
+                self._entradas.move_to_end(clave)
+            return datos
+
+    def guardar(self, clave: str, datos: bytes) -> None:
+        """Guarda `datos` y desaloja las entradas menos usadas hasta quedar dentro del límite."""
+        datos = bytes(datos)
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._total -= len(anterior)
+            if len(datos) > self.limite_bytes:
+                return
+            self._entradas[clave] = datos
+            self._total += len(datos)
+            while self._total > self.limite_bytes:
+                _, desalojada = self._entradas.popitem(last=False)
+                self._total -= len(desalojada)
+
+    def obtener_o_generar(self, clave: str, generar: Callable[[], bytes]) -> Tuple[bytes, bool]:
+        """Devuelve (bytes, si hubo que generarlos).
+
+        Si otro hilo ya está generando la misma clave, espera a que termine y
+        usa su resultado en vez de generarla de nuevo.
+        """
+        datos = self.obtener(clave)
+        if datos is None:
+            with self._lock:
+                generando = self._generando.setdefault(clave, threading.Lock())
+            with generando:
+                datos = self.obtener(clave)
+                if datos is None:
+                    try:
+                        datos = generar()
+                        self.guardar(clave, datos)
+                    finally:
+                        with self._lock:
+                            self._generando.pop(clave, None)
+                    with self._lock:
+                        self.generadas += 1
+                    return datos, True
+
+        with self._lock:
+            self.aciertos += 1
+        return datos, False
+
+    def tamano_total(self) -> int:
+        with self._lock:
+            return self._total
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entradas)
+
+    def limpiar(self) -> None:
+        """Elimina todas las entradas de la caché."""
+        with self._lock:
+            self._entradas.clear()
+            self._total = 0
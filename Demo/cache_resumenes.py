@@ -0,0 +1,117 @@
+"""
+Caché en disco de resúmenes procesados
+--------------------------------------
+
+Streamlit re-ejecuta `app.py` completo en cada interacción; sin caché, cada
+PDF subido se vuelve a parsear con pdfplumber. Este módulo guarda el
+resultado ya procesado (operaciones, metadatos y resumen impositivo) en disco:
+
+- **Clave**: hash SHA-256 de los bytes del PDF + versión del parser.
+  Si cambia el parser, se sube `VERSION_PARSER` en `logic.py` y las entradas
+  viejas simplemente dejan de coincidir.
+- **Límite de tamaño** con desalojo LRU: cada lectura actualiza el mtime de la
+  entrada y, al superar el límite, se borran las menos usadas.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import tempfile
+import threading
+from typing import Optional
+
+DIRECTORIO_POR_DEFECTO = os.environ.get("NARANJA_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "naranja_resumenes"
+)
+LIMITE_BYTES_POR_DEFECTO = 256 * 1024 * 1024
+EXTENSION_ENTRADA = ".pkl"
+
+
+class CacheResumenes:
+    """Caché persistente de resúmenes procesados, direccionada por contenido."""
+
+    def __init__(self, directorio: Optional[str] = None, limite_bytes: int = LIMITE_BYTES_POR_DEFECTO):
+        self.directorio = directorio or DIRECTORIO_POR_DEFECTO
+        self.limite_bytes = int(limite_bytes)
+        self._lock = threading.Lock()
+        os.makedirs(self.directorio, exist_ok=True)
+
+    @staticmethod
+    def calcular_clave(hash_pdf: str, version_parser) -> str:
+        """Combina el hash del PDF con la versión del parser."""
+        return f"{hash_pdf}-v{version_parser}"
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave + EXTENSION_ENTRADA)
+
+    def obtener(self, clave: str):
+        """Devuelve el objeto guardado bajo `clave` o None si no existe o está dañado."""
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "rb") as fh:
+                valor = pickle.load(fh)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Entrada corrupta o de una versión incompatible de pandas: se descarta
+            self._borrar(ruta)
+            return None
+
+        try:
+            os.utime(ruta, None)  # marca de último uso para el LRU
+        except OSError:
+            pass
+        return valor
+
+    def guardar(self, clave: str, valor) -> None:
+        """Guarda `valor` de forma atómica y desaloja entradas si se supera el límite."""
+        descriptor, ruta_temporal = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as fh:
+                pickle.dump(valor, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(ruta_temporal, self._ruta(clave))
+        except Exception:
+            self._borrar(ruta_temporal)
+            raise
+        self._desalojar()
+
+    def _entradas(self):
+        """Lista (mtime, tamaño, ruta) de las entradas actuales."""
+        entradas = []
+        with os.scandir(self.directorio) as iterador:
+            for entrada in iterador:
+                if not entrada.name.endswith(EXTENSION_ENTRADA):
+                    continue
+                try:
+                    info = entrada.stat()
+                except FileNotFoundError:
+                    continue
+                entradas.append((info.st_mtime, info.st_size, entrada.path))
+        return entradas
+
+    def tamano_total(self) -> int:
+        return sum(tamano for _, tamano, _ in self._entradas())
+
+    def _desalojar(self) -> None:
+        """Borra las entradas menos usadas hasta quedar por debajo del límite."""
+        with self._lock:
+            entradas = sorted(self._entradas())
+            total = sum(tamano for _, tamano, _ in entradas)
+            for _, tamano, ruta in entradas:
+                if total <= self.limite_bytes:
+                    break
+                self._borrar(ruta)
+                total -= tamano
+
+    def limpiar(self) -> None:
+        """Elimina todas las entradas de la caché."""
+        for _, _, ruta in self._entradas():
+            self._borrar(ruta)
+
+    @staticmethod
+    def _borrar(ruta: str) -> None:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
@@ -0,0 +1,236 @@
+"""
+Generador de resúmenes sintéticos
+---------------------------------
+
+Arma PDFs con el formato de un resumen de Tarjeta Naranja (metadatos y tabla
+"Detalle de Cupones" con grilla) para tests y benchmarks, sin depender de
+resúmenes reales:
+
+- **Configurable**: cantidad de operaciones, planes con sus porcentajes,
+  proporción de devoluciones (DEV) y de operaciones con error, filas por
+  página o cantidad de páginas, y páginas de texto legal sin operaciones.
+- **Coherente**: arancel, interés y bonificación salen de los porcentajes del
+  plan y cierran contra el importe, así el recálculo da "Correcta" salvo en
+  las operaciones marcadas con error.
+- **Reproducible**: misma semilla, mismas operaciones.
+
+`filas`, `dataframe` y `texto` sirven para las etapas posteriores al parseo
+en tamaños donde generar y leer el PDF no tiene sentido (ver benchmark.py).
+"""
+
+from __future__ import annotations
+
+import io
+import math
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# plan -> (% arancel, % interés, % bonificación)
+PLANES_POR_DEFECTO: Dict[str, Tuple[float, float, float]] = {
+    "1": (1.80, 0.00, 0.50),
+    "3": (1.80, 6.50, 0.00),
+    "6": (2.20, 12.00, 1.00),
+}
+
+LINEAS_METADATOS = [
+    "Tipo y Nº: LIQ 0001-{numero:08d}",
+    "Fecha de Emisión: {emision}",
+    "Echeq a la Orden Pago Diferido Fecha: {pago}",
+    "Detalle de facturación",
+    "Arancel $ 1.234,00",
+    "Neto Liquidado $ 98.765,43",
+]
+
+LINEAS_LEGALES = [
+    "Condiciones generales vigentes desde el 01/01/{anio}.",
+    "Las operaciones presentadas se liquidan según el plan elegido por el comercio.",
+    "Los importes se expresan en pesos e incluyen los impuestos que correspondan.",
+]
+
+ENCABEZADOS = [
+    "Fecha", "Term.-Lote", "Present.", "Cupón", "Plan", "Importe", "% Aran.",
+    "Arancel", "% Int.", "Interés", "% Bonif.", "Bonif.", "Tipo",
+]
+# Ancho de cada columna en puntos (el importe admite "$ 99.999.999,99" en cuerpo 7)
+ANCHOS_COLUMNAS = [46, 50, 46, 40, 26, 66, 38, 56, 38, 56, 38, 56, 34]
+
+MARGEN = 36
+ALTO_FILA = 16
+ALTO_LINEA_TEXTO = 12
+TAMANO_FUENTE = 7
+
+
+def _pesos(centavos: int) -> str:
+    """1234567 -> "$ 12.345,67"."""
+    entero, resto = divmod(int(centavos), 100)
+    return f"$ {entero:,}".replace(",", ".") + f",{resto:02d}"
+
+
+def _porcentaje(valor: float) -> str:
+    """1.8 -> "1,80 %"."""
+    return f"{valor:.2f} %".replace(".", ",")
+
+
+class GeneradorResumenes:
+    """Genera operaciones y PDFs sintéticos con el formato del resumen."""
+
+    def __init__(
+        self,
+        planes: Optional[Dict[str, Tuple[float, float, float]]] = None,
+        proporcion_devoluciones: float = 0.1,
+        proporcion_errores: float = 0.0,
+        anio: int = 2024,
+        mes: int = 3,
+        semilla: int = 0,
+    ):
+        self.planes = dict(planes or PLANES_POR_DEFECTO)
+        self.proporcion_devoluciones = proporcion_devoluciones
+        self.proporcion_errores = proporcion_errores
+        self.anio = anio
+        self.mes = mes
+        self.semilla = semilla
+
+    def filas(self, cantidad_operaciones: int) -> list:
+        """Filas crudas de la tabla, como las devuelve `extract_tables()` (13 textos por fila)."""
+        generador = np.random.default_rng(self.semilla)
+        n = int(cantidad_operaciones)
+
+        nombres_planes = list(self.planes)
+        codigos_plan = generador.integers(0, len(nombres_planes), n)
+        pb = np.rint(np.array([self.planes[p] for p in nombres_planes]) * 100).astype(np.int64)
+        pb_arancel, pb_interes, pb_bonificacion = pb[codigos_plan].T
+
+        importes = generador.integers(1_000, 50_000_000, n, dtype=np.int64)  # centavos
+        # Interés y bonificación redondeados al centavo; el arancel absorbe el redondeo
+        # para que importe - arancel - interés + bonificación sea el teórico exacto
+        interes = (importes * pb_interes + 5_000) // 10_000
+        bonificacion = (importes * pb_bonificacion + 5_000) // 10_000
+        teorico = (importes * (10_000 - pb_arancel - pb_interes + pb_bonificacion) + 5_000) // 10_000
+        arancel = importes - interes + bonificacion - teorico
+
+        con_error = generador.random(n) < self.proporcion_errores
+        arancel = arancel + np.where(con_error, generador.integers(5, 500, n), 0)
+        es_devolucion = generador.random(n) < self.proporcion_devoluciones
+
+        dias_mes = 28
+        dias = generador.integers(1, dias_mes + 1, n)
+        demoras = generador.integers(1, 4, n)
+        terminales = generador.integers(100, 130, n)
+        lotes = generador.integers(1, 60, n)
+
+        filas = []
+        for i in range(n):
+            dia_presentacion = min(int(dias[i] + demoras[i]), dias_mes)
+            plan_actual = nombres_planes[codigos_plan[i]]
+            porcentajes = self.planes[plan_actual]
+            filas.append([
+                f"{dias[i]:02d}/{self.mes:02d}/{self.anio}",
+                f"{terminales[i]}-{lotes[i]:02d}",
+                f"{dia_presentacion:02d}/{self.mes:02d}/{self.anio}",
+                str(1000 + i),
+                plan_actual,
+                _pesos(importes[i]),
+                _porcentaje(porcentajes[0]),
+                _pesos(arancel[i]),
+                _porcentaje(porcentajes[1]) if porcentajes[1] else "",
+                _pesos(interes[i]) if porcentajes[1] else "",
+                _porcentaje(porcentajes[2]) if porcentajes[2] else "",
+                _pesos(bonificacion[i]) if porcentajes[2] else "",
+                "DEV" if es_devolucion[i] else "VTA",
+            ])
+        return filas
+
+    def dataframe(self, cantidad_operaciones: Optional[int] = None, filas: Optional[list] = None):
+        """Operaciones ya normalizadas (EsquemaOperaciones), como las deja el parseo del PDF."""
+        from logic import ProcesadorLogico
+
+        filas = filas if filas is not None else self.filas(cantidad_operaciones or 0)
+        return ProcesadorLogico._construir_dataframe_operaciones(filas)
+
+    def _metadatos(self) -> list:
+        return [
+            linea.format(
+                numero=12345 + self.semilla,
+                emision=f"05/{self.mes:02d}/{self.anio}",
+                pago=f"10/{self.mes:02d}/{self.anio}",
+            )
+            for linea in LINEAS_METADATOS
+        ]
+
+    def texto(self, cantidad_operaciones: Optional[int] = None, filas: Optional[list] = None) -> str:
+        """Texto de las páginas como lo devuelve `extract_text()` (metadatos + una línea por fila)."""
+        filas = filas if filas is not None else self.filas(cantidad_operaciones or 0)
+        lineas = self._metadatos() + [" ".join(ENCABEZADOS)]
+        lineas.extend(" ".join(celda for celda in fila if celda) for fila in filas)
+        return "\n".join(lineas)
+
+    def pdf(
+        self,
+        cantidad_operaciones: Optional[int] = None,
+        filas: Optional[list] = None,
+        filas_por_pagina: int = 24,
+        paginas: Optional[int] = None,
+        paginas_sin_operaciones: int = 0,
+    ) -> bytes:
+        """PDF del resumen (bytes).
+
+        `paginas` fija la cantidad de páginas con operaciones (reparte las filas
+        en partes iguales); si no, se usan `filas_por_pagina`. Las
+        `paginas_sin_operaciones` (texto legal, sin grilla) van al principio.
+        """
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.pdfgen import canvas
+
+        filas = filas if filas is not None else self.filas(cantidad_operaciones or 0)
+        if paginas:
+            filas_por_pagina = max(1, math.ceil(len(filas) / paginas))
+
+        ancho_pagina, alto_pagina = landscape(A4)
+        metadatos = self._metadatos()
+        alto_disponible = alto_pagina - 2 * MARGEN - len(metadatos) * ALTO_LINEA_TEXTO
+        maximo_por_pagina = int(alto_disponible // ALTO_FILA) - 1  # menos el encabezado
+        if filas_por_pagina > maximo_por_pagina:
+            raise ValueError(f"Entran como máximo {maximo_por_pagina} filas por página")
+
+        xs = [float(MARGEN)]
+        for ancho in ANCHOS_COLUMNAS:
+            xs.append(xs[-1] + ancho)
+
+        buffer = io.BytesIO()
+        lienzo = canvas.Canvas(buffer, pagesize=(ancho_pagina, alto_pagina))
+
+        for _ in range(paginas_sin_operaciones):
+            self._dibujar_lineas(lienzo, [linea.format(anio=self.anio) for linea in LINEAS_LEGALES], alto_pagina - MARGEN)
+            lienzo.showPage()
+
+        bloques = [filas[i:i + filas_por_pagina] for i in range(0, len(filas), filas_por_pagina)] or [[]]
+        for numero_bloque, bloque in enumerate(bloques):
+            y = alto_pagina - MARGEN
+            if numero_bloque == 0:
+                y = self._dibujar_lineas(lienzo, metadatos, y)
+            self._dibujar_tabla(lienzo, xs, y, [ENCABEZADOS] + bloque)
+            lienzo.showPage()
+
+        lienzo.save()
+        return buffer.getvalue()
+
+    @staticmethod
+    def _dibujar_lineas(lienzo, lineas: Sequence[str], y: float) -> float:
+        lienzo.setFont("Helvetica", 9)
+        for linea in lineas:
+            y -= ALTO_LINEA_TEXTO
+            lienzo.drawString(MARGEN, y, linea)
+        return y - ALTO_LINEA_TEXTO
+
+    @staticmethod
+    def _dibujar_tabla(lienzo, xs: Sequence[float], y: float, filas: Sequence[Sequence[str]]) -> None:
+        ys = [y - i * ALTO_FILA for i in range(len(filas) + 1)]
+        lienzo.setLineWidth(0.5)
+        lienzo.grid(list(xs), ys)
+        lienzo.setFont("Helvetica", TAMANO_FUENTE)
+        for fila, y_fila in zip(filas, ys):
+            base = y_fila - ALTO_FILA + 5
+            for x, celda in zip(xs, fila):
+                if celda:
+                    lienzo.drawString(x + 2, base, celda)
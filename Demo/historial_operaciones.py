@@ -0,0 +1,193 @@
+"""
+Historial columnar de operaciones
+---------------------------------
+
+Guarda en disco las operaciones ya procesadas de cada resumen para poder
+analizar varios meses juntos sin volver a subir ni parsear los PDFs.
+
+- **Formato**: archivos Arrow IPC (sin compresión), uno por resumen y mes:
+  `resumen=<id>/mes=<aaaa-mm>/operaciones.arrow`. Se escriben de forma atómica.
+- **Escritura**: `agregar` reemplaza las particiones del mismo resumen, así
+  volver a guardar un resumen no duplica operaciones.
+- **Lectura**: los archivos se abren con memory-map y solo se materializan las
+  columnas pedidas; los filtros por resumen y mes descartan particiones
+  enteras sin abrirlas.
+
+Las columnas conservan el esquema de `EsquemaOperaciones` (centavos, puntos
+básicos, categorías y fechas), por lo que lo leído entra directo al pipeline.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import tempfile
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+DIRECTORIO_POR_DEFECTO = os.environ.get("NARANJA_HISTORIAL_DIR") or os.path.join(
+    os.path.expanduser("~"), ".local", "share", "naranja_historial"
+)
+NOMBRE_ARCHIVO = "operaciones.arrow"
+PREFIJO_RESUMEN = "resumen="
+PREFIJO_MES = "mes="
+MES_SIN_FECHA = "sin-fecha"
+
+
+class HistorialOperaciones:
+    """Almacén local de operaciones particionado por resumen y mes."""
+
+    def __init__(self, directorio: Optional[str] = None):
+        self.directorio = directorio or DIRECTORIO_POR_DEFECTO
+        os.makedirs(self.directorio, exist_ok=True)
+
+    @staticmethod
+    def identificador_resumen(resumen) -> str:
+        """Id de partición de un ResumenProcesado: Tipo y Nº, si no el hash o el nombre."""
+        metadatos = getattr(resumen, "metadatos", None) or {}
+        candidato = (
+            metadatos.get("tipo_numero")
+            or (resumen.hash_contenido or "")[:16]
+            or resumen.nombre
+        )
+        identificador = re.sub(r"[^0-9A-Za-z._-]+", "_", str(candidato)).strip("._")
+        if not identificador:
+            raise ValueError("No se pudo identificar el resumen para el historial")
+        return identificador
+
+    def _ruta_resumen(self, identificador: str) -> str:
+        return os.path.join(self.directorio, PREFIJO_RESUMEN + identificador)
+
+    def agregar(self, operaciones: pd.DataFrame, identificador: str) -> int:
+        """Guarda las operaciones de un resumen (reemplazando las anteriores). Devuelve las filas escritas."""
+        from logic import EsquemaOperaciones
+
+        operaciones = EsquemaOperaciones.aplicar(operaciones)
+        fechas = operaciones["fecha"]
+        meses = (fechas.dt.year * 100 + fechas.dt.month).fillna(-1).to_numpy(dtype=np.int64)  # aaaamm
+
+        # Se arma todo en un directorio temporal y se reemplaza el del resumen de una vez
+        destino = self._ruta_resumen(identificador)
+        temporal = tempfile.mkdtemp(dir=self.directorio, prefix=".tmp-")
+        try:
+            for mes, grupo in operaciones.groupby(meses, sort=True):
+                nombre_mes = MES_SIN_FECHA if mes < 0 else f"{mes // 100:04d}-{mes % 100:02d}"
+                particion = os.path.join(temporal, PREFIJO_MES + nombre_mes)
+                os.makedirs(particion)
+                tabla = self._tabla_arrow(grupo)
+                with pa.OSFile(os.path.join(particion, NOMBRE_ARCHIVO), "wb") as destino_archivo:
+                    with pa.ipc.new_file(destino_archivo, tabla.schema) as escritor:
+                        escritor.write_table(tabla)
+
+            if os.path.isdir(destino):
+                viejo = os.path.join(self.directorio, ".viejo-" + identificador)
+                os.replace(destino, viejo)
+                os.replace(temporal, destino)
+                shutil.rmtree(viejo, ignore_errors=True)
+            else:
+                os.replace(temporal, destino)
+        except Exception:
+            shutil.rmtree(temporal, ignore_errors=True)
+            raise
+        return len(operaciones)
+
+    @staticmethod
+    def _tabla_arrow(operaciones: pd.DataFrame) -> pa.Table:
+        """Tabla Arrow con índices de diccionario int32 en las categorías.
+
+        pandas elige int8/int16 según la cantidad de categorías; fijar el ancho
+        deja a todas las particiones con el mismo esquema y se pueden concatenar.
+        """
+        tabla = pa.Table.from_pandas(operaciones, preserve_index=False)
+        campos = [
+            campo.with_type(pa.dictionary(pa.int32(), campo.type.value_type))
+            if pa.types.is_dictionary(campo.type) else campo
+            for campo in tabla.schema
+        ]
+        return tabla.cast(pa.schema(campos, metadata=tabla.schema.metadata))
+
+    def agregar_resumen(self, resumen) -> int:
+        """Guarda un ResumenProcesado bajo su identificador (ver `identificador_resumen`)."""
+        return self.agregar(resumen.operaciones, self.identificador_resumen(resumen))
+
+    def resumenes(self) -> list:
+        """Identificadores de los resúmenes guardados, ordenados."""
+        return sorted(
+            nombre[len(PREFIJO_RESUMEN):]
+            for nombre in os.listdir(self.directorio)
+            if nombre.startswith(PREFIJO_RESUMEN)
+        )
+
+    def meses(self, identificador: str) -> list:
+        """Meses (aaaa-mm) guardados para un resumen."""
+        ruta = self._ruta_resumen(identificador)
+        if not os.path.isdir(ruta):
+            return []
+        return sorted(n[len(PREFIJO_MES):] for n in os.listdir(ruta) if n.startswith(PREFIJO_MES))
+
+    def eliminar(self, identificador: str) -> None:
+        shutil.rmtree(self._ruta_resumen(identificador), ignore_errors=True)
+
+    def _particiones(self, resumenes: Optional[Iterable[str]], desde: Optional[str], hasta: Optional[str]):
+        """(id, mes, ruta) de las particiones que pasan los filtros, en orden."""
+        elegidos = self.resumenes() if resumenes is None else sorted(set(resumenes))
+        for identificador in elegidos:
+            for mes in self.meses(identificador):
+                if mes != MES_SIN_FECHA and ((desde and mes < desde) or (hasta and mes > hasta)):
+                    continue
+                if mes == MES_SIN_FECHA and (desde or hasta):
+                    continue
+                yield identificador, mes, os.path.join(
+                    self._ruta_resumen(identificador), PREFIJO_MES + mes, NOMBRE_ARCHIVO
+                )
+
+    def leer(
+        self,
+        columnas: Optional[Iterable[str]] = None,
+        resumenes: Optional[Iterable[str]] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None,
+        con_resumen: bool = False,
+    ) -> pd.DataFrame:
+        """Lee operaciones del historial.
+
+        `columnas` limita lo que se materializa (el resto del archivo mapeado
+        no se toca); `resumenes`, `desde` y `hasta` (aaaa-mm, inclusive) filtran
+        particiones. Con `con_resumen` se agrega la columna categórica "resumen".
+        Pedir una columna que no es de `COLUMNAS_OPERACIONES` da ValueError.
+        """
+        from logic import COLUMNAS_OPERACIONES, EsquemaOperaciones
+
+        columnas = list(columnas) if columnas is not None else list(COLUMNAS_OPERACIONES)
+        desconocidas = [c for c in columnas if c not in COLUMNAS_OPERACIONES]
+        if desconocidas:
+            raise ValueError(f"Columnas desconocidas en el historial: {', '.join(desconocidas)}")
+        tablas = []
+        identificadores = []
+
+        for identificador, _, ruta in self._particiones(resumenes, desde, hasta):
+            with pa.memory_map(ruta, "r") as origen:
+                tabla = pa.ipc.open_file(origen).read_all()
+            tablas.append(tabla.select([c for c in columnas if c in tabla.column_names]))
+            identificadores.append((identificador, tabla.num_rows))
+
+        if not tablas:
+            vacio = EsquemaOperaciones.aplicar(pd.DataFrame(columns=COLUMNAS_OPERACIONES))[columnas]
+            return vacio.assign(resumen=pd.Categorical([])) if con_resumen else vacio
+
+        # Los diccionarios de las categorías pueden diferir entre particiones
+        tabla = pa.concat_tables(tablas).unify_dictionaries()
+        dataframe = EsquemaOperaciones.aplicar(tabla.to_pandas())
+
+        if con_resumen:
+            nombres = sorted({identificador for identificador, _ in identificadores})
+            codigos = np.repeat(
+                [nombres.index(identificador) for identificador, _ in identificadores],
+                [filas for _, filas in identificadores],
+            )
+            dataframe["resumen"] = pd.Categorical.from_codes(codigos, categories=nombres)
+        return dataframe
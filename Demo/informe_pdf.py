@@ -0,0 +1,141 @@
+"""
+Piezas de reportlab para el informe PDF
+---------------------------------------
+
+Se importa recién al exportar a PDF (reportlab no se carga con logic.py).
+
+- **TablaPorSegmentos**: tabla de largo arbitrario que se arma de a pedazos
+  mientras se pagina. Una `Table` con decenas de miles de filas calcula el
+  alto de todas antes de dibujar y, al cortarse en cada página, vuelve a
+  copiar todas las filas que le quedan; acá en memoria hay a lo sumo un
+  segmento de filas formateadas y cada corte trabaja sobre ese segmento.
+- **grafico_torta**: torta vectorial con `reportlab.graphics`, que entra al
+  documento como cualquier otro flowable (sin matplotlib ni PNG intermedio).
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib import colors
+from reportlab.platypus import FrameBreak, Table
+from reportlab.platypus.flowables import Flowable
+
+
+class TablaPorSegmentos(Flowable):
+    """Tabla que consume sus filas de un iterador a medida que se dibuja.
+
+    Nunca entra entera en el espacio disponible: el frame le pide que se
+    corte, y en ese momento arma una `Table` con el encabezado y las filas
+    pendientes (completando de a `filas_por_segmento`), la corta al alto que
+    queda en la página y devuelve esa parte más una continuación con lo que
+    sobró. Cada página empieza con el encabezado, como con `repeatRows=1`.
+    Conviene que `filas_por_segmento` ronde lo que entra en una página: cada
+    corte arma y estila una `Table` con todo el segmento.
+    """
+
+    def __init__(
+        self,
+        encabezado: Sequence[str],
+        filas: Iterable[Sequence[str]],
+        anchos_columnas: Optional[Sequence[float]] = None,
+        estilo=None,
+        filas_por_segmento: int = 40,
+        _pendientes: Optional[List[Sequence[str]]] = None,
+    ):
+        Flowable.__init__(self)
+        self.encabezado = list(encabezado)
+        self.filas: Iterator[Sequence[str]] = iter(filas)
+        self.anchos_columnas = anchos_columnas
+        self.estilo = estilo
+        self.filas_por_segmento = max(1, int(filas_por_segmento))
+        self.pendientes: List[Sequence[str]] = _pendientes if _pendientes is not None else []
+
+    def _completar(self, cantidad: int) -> None:
+        faltan = cantidad - len(self.pendientes)
+        if faltan > 0:
+            self.pendientes.extend(itertools.islice(self.filas, faltan))
+
+    def _tabla(self) -> Table:
+        tabla = Table([self.encabezado] + self.pendientes, colWidths=self.anchos_columnas, repeatRows=1)
+        if self.estilo is not None:
+            tabla.setStyle(self.estilo)
+        return tabla
+
+    def wrap(self, ancho_disponible, alto_disponible):
+        # Siempre "no entra": así el frame llama a split con el alto que queda
+        return ancho_disponible, alto_disponible + 1
+
+    def split(self, ancho_disponible, alto_disponible):
+        self._completar(self.filas_por_segmento)
+        while True:
+            partes = self._tabla().split(ancho_disponible, alto_disponible)
+            if len(partes) != 1:
+                break
+            # Entró todo el segmento: se suma otro, salvo que no queden filas
+            cantidad = len(self.pendientes)
+            self._completar(cantidad + self.filas_por_segmento)
+            if len(self.pendientes) == cantidad:
+                return partes
+
+        if not partes:
+            return []  # ni el encabezado y una fila: sigue en la próxima página
+        usadas = len(partes[0]._cellvalues) - 1
+        continuacion = TablaPorSegmentos(
+            self.encabezado, self.filas, self.anchos_columnas, self.estilo,
+            self.filas_por_segmento, _pendientes=self.pendientes[usadas:],
+        )
+        # La página quedó llena: la continuación va directo a la siguiente
+        # (sin probar un corte más en el espacio que sobra)
+        return [partes[0], FrameBreak(), continuacion]
+
+    def draw(self):
+        pass
+
+
+# Misma paleta que usa matplotlib por defecto ("tab10"), la del gráfico de la app
+COLORES_TORTA = [
+    colors.HexColor(codigo) for codigo in (
+        "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+        "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+    )
+]
+
+
+def grafico_torta(
+    conteo: Sequence[Tuple[str, int]],
+    titulo: str,
+    ancho: float,
+    alto: float,
+) -> Drawing:
+    """Torta con una porción por (etiqueta, cantidad), rotulada con su porcentaje.
+
+    Devuelve un `Drawing` de `ancho` x `alto` puntos. Los rótulos van a los
+    costados (`sideLabels`) para que las porciones chicas no se pisen.
+    """
+    total = sum(cantidad for _, cantidad in conteo)
+    dibujo = Drawing(ancho, alto)
+    alto_titulo = 18
+    dibujo.add(String(ancho / 2, alto - 12, titulo, fontName="Helvetica-Bold", fontSize=11, textAnchor="middle"))
+
+    torta = Pie()
+    diametro = max(alto - alto_titulo - 30, 10)
+    torta.width = torta.height = diametro
+    torta.x = (ancho - diametro) / 2
+    torta.y = (alto - alto_titulo - diametro) / 2
+    torta.data = [cantidad for _, cantidad in conteo]
+    torta.labels = [f"{etiqueta} ({100 * cantidad / total:.1f}%)" for etiqueta, cantidad in conteo]
+    torta.sideLabels = True
+    torta.startAngle = 90
+    torta.direction = "anticlockwise"  # como matplotlib con startangle=90
+    torta.slices.strokeColor = colors.white
+    torta.slices.strokeWidth = 0.5
+    torta.slices.fontName = "Helvetica"
+    torta.slices.fontSize = 8
+    for i in range(len(conteo)):
+        torta.slices[i].fillColor = COLORES_TORTA[i % len(COLORES_TORTA)]
+    dibujo.add(torta)
+    return dibujo
@@ -0,0 +1,176 @@
+"""
+Instrumentación de tiempos
+--------------------------
+
+Tramos livianos con nombre ("ingesta", "pagina.tablas", "recalculo",
+"exportar.csv", ...) y contadores (filas, páginas, bytes) para saber en qué
+se va el tiempo sin salir del código de producción:
+
+- **logging**: cada tramo se emite con nivel DEBUG en el logger
+  `instrumentacion` ("recalculo 0.012 s filas=1000").
+- **Registro**: además se acumula por nombre (cantidad, total, máximo y
+  contadores sumados) en el registro activo. Cada sesión de la app o
+  corrida del CLI puede activar el suyo (`activar`); si no, se usa uno
+  global del proceso.
+- **Procesos**: lo medido dentro de un worker se captura con `capturar` y el
+  proceso principal lo suma con `Registro.fusionar`.
+
+Medir cuesta dos lecturas de `perf_counter` y un diccionario; los tramos por
+página son la granularidad más fina que se usa.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("instrumentacion")
+
+
+class Registro:
+    """Totales de tiempo y contadores por nombre de tramo (seguro entre hilos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tramos: Dict[str, dict] = {}
+
+    def _tramo(self, nombre: str) -> dict:
+        return self._tramos.setdefault(nombre, {"cantidad": 0, "segundos": 0.0, "maximo": 0.0, "contadores": {}})
+
+    def registrar(self, nombre: str, segundos: float, **contadores) -> None:
+        with self._lock:
+            tramo = self._tramo(nombre)
+            tramo["cantidad"] += 1
+            tramo["segundos"] += segundos
+            tramo["maximo"] = max(tramo["maximo"], segundos)
+            for clave, valor in contadores.items():
+                tramo["contadores"][clave] = tramo["contadores"].get(clave, 0) + valor
+
+        if logger.isEnabledFor(logging.DEBUG):
+            detalle = " ".join(f"{clave}={valor}" for clave, valor in contadores.items())
+            logger.debug("%s %.4f s %s", nombre, segundos, detalle)
+
+    def fusionar(self, instantanea: Dict[str, dict]) -> None:
+        """Suma los tramos de otro registro (por ejemplo, el de un worker)."""
+        with self._lock:
+            for nombre, otro in instantanea.items():
+                tramo = self._tramo(nombre)
+                tramo["cantidad"] += otro["cantidad"]
+                tramo["segundos"] += otro["segundos"]
+                tramo["maximo"] = max(tramo["maximo"], otro["maximo"])
+                for clave, valor in otro["contadores"].items():
+                    tramo["contadores"][clave] = tramo["contadores"].get(clave, 0) + valor
+
+    def instantanea(self) -> Dict[str, dict]:
+        """Copia de los tramos acumulados (serializable, se puede mandar entre procesos)."""
+        with self._lock:
+            return {
+                nombre: {**tramo, "contadores": dict(tramo["contadores"])}
+                for nombre, tramo in self._tramos.items()
+            }
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._tramos.clear()
+
+    def filas(self) -> list:
+        """Una fila por tramo, de mayor a menor tiempo total (para tablas y el panel de la app)."""
+        return [
+            {
+                "tramo": nombre,
+                "veces": tramo["cantidad"],
+                "total_s": round(tramo["segundos"], 4),
+                "promedio_ms": round(1000 * tramo["segundos"] / tramo["cantidad"], 2),
+                "maximo_ms": round(1000 * tramo["maximo"], 2),
+                **tramo["contadores"],
+            }
+            for nombre, tramo in sorted(self.instantanea().items(), key=lambda par: -par[1]["segundos"])
+        ]
+
+    def como_texto(self) -> str:
+        """Tabla de texto con los tramos, para el CLI."""
+        filas = self.filas()
+        if not filas:
+            return "Sin tiempos registrados."
+        lineas = [f"{'tramo':<24} {'veces':>7} {'total s':>10} {'prom. ms':>10} {'máx. ms':>10}  contadores"]
+        for fila in filas:
+            contadores = " ".join(
+                f"{clave}={valor}" for clave, valor in fila.items()
+                if clave not in ("tramo", "veces", "total_s", "promedio_ms", "maximo_ms")
+            )
+            lineas.append(
+                f"{fila['tramo']:<24} {fila['veces']:>7} {fila['total_s']:>10.3f} "
+                f"{fila['promedio_ms']:>10.2f} {fila['maximo_ms']:>10.2f}  {contadores}"
+            )
+        return "\n".join(lineas)
+
+
+_REGISTRO_GLOBAL = Registro()
+_registro_activo: contextvars.ContextVar[Optional[Registro]] = contextvars.ContextVar(
+    "registro_tiempos", default=None
+)
+
+
+def registro() -> Registro:
+    """Registro activo en este contexto (el de la sesión si se activó uno, si no el global)."""
+    return _registro_activo.get() or _REGISTRO_GLOBAL
+
+
+def activar(nuevo: Registro) -> None:
+    """Usa `nuevo` como registro activo en el contexto actual (hilo o script run de Streamlit)."""
+    _registro_activo.set(nuevo)
+
+
+def registrar(nombre: str, segundos: float, **contadores) -> None:
+    registro().registrar(nombre, segundos, **contadores)
+
+
+class Tramo:
+    """Tramo en curso: permite sumar contadores antes de cerrarlo."""
+
+    __slots__ = ("nombre", "contadores")
+
+    def __init__(self, nombre: str, contadores: dict):
+        self.nombre = nombre
+        self.contadores = contadores
+
+    def contar(self, **contadores) -> None:
+        for clave, valor in contadores.items():
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+
+@contextlib.contextmanager
+def medir(nombre: str, **contadores):
+    """Mide el bloque y lo registra al salir (también si sale con error)."""
+    tramo = Tramo(nombre, dict(contadores))
+    inicio = time.perf_counter()
+    try:
+        yield tramo
+    finally:
+        registro().registrar(tramo.nombre, time.perf_counter() - inicio, **tramo.contadores)
+
+
+@contextlib.contextmanager
+def capturar():
+    """Activa un registro nuevo mientras dura el bloque y lo devuelve (para workers)."""
+    propio = Registro()
+    token = _registro_activo.set(propio)
+    try:
+        yield propio
+    finally:
+        _registro_activo.reset(token)
+
+
+def con_tiempos(funcion, *args):
+    """Corre `funcion(*args)` capturando sus tramos; devuelve (resultado, instantánea).
+
+    Se usa como tarea del pool de procesos: lo que mide el worker viaja con
+    el resultado y el proceso principal lo fusiona en su registro.
+    """
+    with capturar() as propio:
+        resultado = funcion(*args)
+    return resultado, propio.instantanea()
@@ -1,20 +1,159 @@
-import pdfplumber
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
 import re
+import bisect
 import io
 import os
-
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet
+import json
+import hashlib
+import importlib
+import functools
+import logging
+import time
+import threading
+import contextvars
+import multiprocessing
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import instrumentacion
+
+logger = logging.getLogger(__name__)
+
+class _ModuloDiferido:
+    """Módulo que se importa recién la primera vez que se usa uno de sus atributos.
+
+    pdfplumber solo hace falta al leer PDFs; así `import logic` (workers,
+    CLI, reinicios de la app) no paga ese import. reportlab se importa
+    dentro de las funciones que exportan a PDF.
+    """
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+
+    def __getattr__(self, atributo):
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self._nombre)
+        return getattr(self._modulo, atributo)
+
+pdfplumber = _ModuloDiferido("pdfplumber")
+
+# Subir este número cuando cambie el resultado del parseo: invalida la caché en disco
+VERSION_PARSER = 4
+
+# Cómo se leen las filas de operaciones de cada página:
+# - "tablas": extract_tables() de pdfplumber (el comportamiento original).
+# - "texto": palabras de la capa de texto ubicadas en la grilla de la tabla;
+#   las páginas que no pasan la validación se vuelven a leer con extract_tables().
+MODOS_EXTRACCION = ("tablas", "texto")
+MODO_EXTRACCION_POR_DEFECTO = "tablas"
+
+# formato -> (extensión, tipo MIME) de lo que generan exportar_bytes / exportacion_de_informes
+FORMATOS_EXPORTACION = {
+    "csv": ("csv", "text/csv"),
+    "excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "pdf": ("pdf", "application/pdf"),
+}
+
+COLUMNAS_OPERACIONES = [
+    "fecha", "terminal-lote", "presentacion", "cupon", "plan", "importe",
+    "arancel_pct", "arancel_valor", "interes_pct", "interes_valor",
+    "bonificacion_pct", "bonificacion_valor", "tipo_operacion"
+]
+
+COLUMNAS_NUMERICAS = [
+    "importe", "arancel_pct", "arancel_valor", "interes_pct",
+    "interes_valor", "bonificacion_pct", "bonificacion_valor"
+]
+
+def _convertir_textos_en_bloque(textos):
+    """Convierte un array de textos distintos con la misma limpieza que convertir_a_numero.
+
+    En vez de limpiar celda por celda, une todos los textos en un único buffer,
+    quita "$", "%" y espacios con str.replace sobre ese buffer y lo vuelve a
+    partir; el paso final a float es una sola conversión de array. Si algo no
+    encaja en ese camino (saltos de línea dentro de un texto, valores basura)
+    se usa la versión escalar, así el resultado es siempre idéntico.
+    """
+    bloque = "\n".join(textos)
+    if bloque.count("\n") != len(textos) - 1:
+        return np.array([CalculosAuxiliares.convertir_a_numero(t) for t in textos], dtype=float)
+
+    for caracter in ("$", "%", " "):
+        bloque = bloque.replace(caracter, "")
+
+    # Con coma decimal, los puntos son de miles: "1.234,56" -> "1234.56"
+    limpios = [
+        "0" if t == "" or t == "-" else (t.replace(".", "").replace(",", ".") if "," in t else t)
+        for t in bloque.split("\n")
+    ]
+    try:
+        return np.array(limpios, dtype=object).astype(float)
+    except ValueError:
+        return np.array([CalculosAuxiliares.convertir_a_numero(t) for t in textos], dtype=float)
+
+def _textos_de_centesimos(centesimos, negativos, miles=True, prefijo="", sufijo=""):
+    """Arma "1.234,56" para un array de enteros en centésimos, sin una llamada Python por valor.
+
+    Los caracteres de todos los valores se escriben en una matriz de bytes
+    (una fila por posición, alineados a la coma), se descartan las posiciones
+    que no corresponden a cada valor (ceros a la izquierda, signo, puntos de
+    miles) y el buffer resultante se parte en un único split.
+    """
+    entero, decimales = np.divmod(np.abs(np.asarray(centesimos, dtype=np.int64)), 100)
+    cantidad = len(entero)
+    if cantidad == 0:
+        return np.empty(0, dtype=object)
+
+    max_digitos = len(str(int(entero.max())))
+    coma = len(prefijo) + 1 + max_digitos + ((max_digitos - 1) // 3 if miles else 0)
+    ancho = coma + 3 + len(sufijo) + 1
+    caracteres = np.zeros((ancho, cantidad), dtype=np.uint8)
+    usados = np.zeros((ancho, cantidad), dtype=bool)
+
+    for columna, caracter in enumerate(prefijo):
+        caracteres[columna] = ord(caracter)
+    usados[:len(prefijo)] = True
+    caracteres[len(prefijo)] = ord("-")
+    usados[len(prefijo)] = negativos
+
+    # Dígitos de la parte entera, de derecha a izquierda; el primero siempre va ("0,50")
+    resto = entero
+    hay_digito = np.ones(cantidad, dtype=bool)
+    for k in range(max_digitos):
+        columna = coma - 1 - k - (k // 3 if miles else 0)
+        resto, digito = np.divmod(resto, 10)
+        caracteres[columna] = digito + ord("0")
+        usados[columna] = hay_digito
+        hay_digito = resto > 0
+        if miles and k % 3 == 2 and k + 1 < max_digitos:
+            caracteres[columna - 1] = ord(".")
+            usados[columna - 1] = hay_digito
+
+    decenas, unidades = np.divmod(decimales, 10)
+    caracteres[coma] = ord(",")
+    caracteres[coma + 1] = decenas + ord("0")
+    caracteres[coma + 2] = unidades + ord("0")
+    for posicion, caracter in enumerate(sufijo):
+        caracteres[coma + 3 + posicion] = ord(caracter)
+    caracteres[-1] = ord("\n")
+    usados[coma:] = True
+
+    texto = np.ascontiguousarray(caracteres.T)[np.ascontiguousarray(usados.T)].tobytes().decode("latin-1")
+    return np.array(texto.split("\n")[:-1], dtype=object)
+
+@functools.lru_cache(maxsize=4096)
+def _convertir_texto_cacheado(valor):
+    return CalculosAuxiliares.convertir_a_numero(valor)
 
 # 🔹 Clase auxiliar para conversiones y formatos
 class CalculosAuxiliares:
     """Contiene métodos utilitarios para conversiones, formateos y cálculos básicos."""
 
+    NO_FIGURA = "No figura"
+
     @staticmethod
     def convertir_a_numero(valor):
         """Convierte strings numéricos con formatos variados a float."""
@@ -39,6 +178,62 @@ class CalculosAuxiliares:
         except ValueError:
             return 0.0
 
+    @staticmethod
+    def convertir_columna_a_numero(serie, cachear=False):
+        """Versión columnar de convertir_a_numero: misma semántica, sin una llamada Python por celda.
+
+        Cada texto distinto se convierte una sola vez y la limpieza ($, %, espacios,
+        puntos de miles y coma decimal) se hace en bloque para toda la columna.
+        Con `cachear=True` los textos distintos pasan por una caché global, útil
+        para columnas muy repetitivas como los porcentajes.
+        """
+        serie = serie if isinstance(serie, pd.Series) else pd.Series(serie, dtype=object)
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            return serie.astype(float)
+
+        valores = serie.to_numpy(dtype=object)
+        codigos, unicos = pd.factorize(valores)
+        unicos = np.asarray(unicos, dtype=object)
+
+        if cachear:
+            convertidos = np.array([_convertir_texto_cacheado(v) for v in unicos], dtype=float)
+        elif pd.api.types.infer_dtype(unicos, skipna=False) == "string":
+            convertidos = _convertir_textos_en_bloque(unicos)
+        else:
+            convertidos = np.array([CalculosAuxiliares.convertir_a_numero(v) for v in unicos], dtype=float)
+
+        resultado = np.empty(len(valores), dtype=float)
+        presentes = codigos >= 0
+        resultado[presentes] = convertidos[codigos[presentes]]
+        # None -> 0.0, NaN -> NaN (igual que la versión escalar)
+        resultado[~presentes] = [CalculosAuxiliares.convertir_a_numero(v) for v in valores[~presentes]]
+
+        return pd.Series(resultado, index=serie.index, name=serie.name)
+
+    @staticmethod
+    def columna_a_float(serie):
+        """Convierte una columna completa a un array float64 (ver convertir_columna_a_numero)."""
+        return CalculosAuxiliares.convertir_columna_a_numero(serie).to_numpy(dtype=float)
+
+    @staticmethod
+    def redondear_como_python(valores, decimales=2):
+        """Redondea un array igual que round(x, decimales) de Python.
+
+        np.round escala por 10**decimales antes de redondear, lo que puede
+        cambiar el resultado en valores muy cercanos a un empate (p. ej. 2.675).
+        Esos pocos casos se resuelven con round() de Python.
+        """
+        valores = np.asarray(valores, dtype=float)
+        redondeados = np.round(valores, decimales)
+
+        escalados = valores * 10 ** decimales
+        with np.errstate(invalid="ignore"):
+            distancia_empate = np.abs(escalados - np.floor(escalados) - 0.5)
+            dudosos = distancia_empate <= 1e-6 + np.abs(escalados) * 1e-15
+        if dudosos.any():
+            redondeados[dudosos] = [round(float(v), decimales) for v in valores[dudosos]]
+        return redondeados
+
     @staticmethod
     def formatear_moneda_pesos(valor):
         """Formatea números al formato monetario argentino."""
@@ -60,6 +255,57 @@ class CalculosAuxiliares:
             
         return f"{valor_float:.2f}".replace(".", ",") + " %"
 
+    @staticmethod
+    def _centesimos_de_columna(valores, escalados, cero_no_figura):
+        """(centésimos int64, negativos, presentes) de una columna en unidades o ya en centésimos."""
+        serie = valores if isinstance(valores, pd.Series) else pd.Series(np.asarray(valores))
+        numeros = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        presentes = np.isfinite(numeros)
+        if cero_no_figura:
+            presentes &= numeros != 0
+        numeros = np.where(presentes, numeros, 0.0)
+        if escalados:
+            return np.rint(numeros).astype(np.int64), numeros < 0, presentes
+        # Mismo redondeo que f"{valor:.2f}" (ver redondear_como_python)
+        redondeados = CalculosAuxiliares.redondear_como_python(numeros, 2)
+        return np.rint(redondeados * 100).astype(np.int64), np.signbit(redondeados), presentes
+
+    @staticmethod
+    def _columna_formateada(valores, textos, presentes, no_figura):
+        textos = np.where(presentes, textos, no_figura)
+        if isinstance(valores, pd.Series):
+            return pd.Series(textos, index=valores.index, name=valores.name, dtype=object)
+        return textos
+
+    @staticmethod
+    def formatear_columna_moneda(valores, en_centavos=False, no_figura=NO_FIGURA, cero_no_figura=False, prefijo=""):
+        """Versión columnar de formatear_moneda_pesos: "1.234,56" para todo el array de una vez.
+
+        Los nulos (y con `cero_no_figura`, también los ceros) quedan como
+        `no_figura`. Con `en_centavos=True` los valores son enteros en
+        centavos, como en EsquemaOperaciones. `prefijo` va antes del signo
+        ("$-1.234,56") y no se agrega a los que no figuran. Devuelve un array
+        de textos, o una Series con el mismo índice si se pasó una Series.
+        """
+        centesimos, negativos, presentes = CalculosAuxiliares._centesimos_de_columna(
+            valores, en_centavos, cero_no_figura
+        )
+        textos = _textos_de_centesimos(centesimos, negativos, miles=True, prefijo=prefijo)
+        return CalculosAuxiliares._columna_formateada(valores, textos, presentes, no_figura)
+
+    @staticmethod
+    def formatear_columna_porcentaje(valores, en_puntos_basicos=False, no_figura=NO_FIGURA, cero_no_figura=False):
+        """Versión columnar de formatear_porcentaje: "3,50 %" para todo el array de una vez.
+
+        Igual que formatear_columna_moneda, con `en_puntos_basicos=True` para
+        los porcentajes enteros de EsquemaOperaciones (1 = 0,01 %).
+        """
+        centesimos, negativos, presentes = CalculosAuxiliares._centesimos_de_columna(
+            valores, en_puntos_basicos, cero_no_figura
+        )
+        textos = _textos_de_centesimos(centesimos, negativos, miles=False, sufijo=" %")
+        return CalculosAuxiliares._columna_formateada(valores, textos, presentes, no_figura)
+
     @staticmethod
     def extraer_numero_de_plan(texto_plan):
         """Extrae el número de plan de un string."""
@@ -91,8 +337,928 @@ class CalculosAuxiliares:
             f"Forma Pago: {diccionario_metadatos.get('forma_pago', '--')}"
         )    
 
-class ProcesadorLogico:
+    @staticmethod
+    def nombre_de_origen(origen):
+        """Devuelve un nombre legible para una ruta, un archivo subido o un buffer."""
+        nombre = getattr(origen, "name", None)
+        if isinstance(origen, (str, os.PathLike)):
+            nombre = os.fspath(origen)
+        return os.path.basename(str(nombre)) if nombre else ""
+
+    @staticmethod
+    def leer_bytes_pdf(origen):
+        """Obtiene los bytes de un PDF desde una ruta, bytes o un archivo subido (file-like)."""
+        if isinstance(origen, (bytes, bytearray)):
+            return bytes(origen)
+        if isinstance(origen, (str, os.PathLike)):
+            with open(origen, "rb") as fh:
+                return fh.read()
+        if hasattr(origen, "getvalue"):
+            return origen.getvalue()
+        origen.seek(0)
+        return origen.read()
+
+class EsquemaOperaciones:
+    """Esquema compacto de las operaciones en memoria.
+
+    - Montos (`importe`, `*_valor`, y en resultados `importe_abonado` y
+      `diferencia`): int64 en **centavos**.
+    - Porcentajes (`*_pct`): int32 en **puntos básicos** (1 = 0,01 %).
+    - Textos de pocos valores distintos: `category`.
+    - `fecha`: datetime64.
+
+    Así el recálculo y la tolerancia de 1 centavo trabajan con aritmética entera
+    exacta. Para mostrar o exportar se usa `vista_en_pesos`, que devuelve los
+    valores en pesos/porcentaje y la fecha como dd/mm/aaaa.
+
+    Al aplicar el esquema, las columnas enteras se toman como ya convertidas
+    (centavos o puntos básicos); las de texto o float se interpretan en pesos
+    y porcentaje.
+    """
+
+    COLUMNAS_MONEDA = ["importe", "arancel_valor", "interes_valor", "bonificacion_valor"]
+    COLUMNAS_PORCENTAJE = ["arancel_pct", "interes_pct", "bonificacion_pct"]
+    COLUMNAS_CATEGORIA = ["terminal-lote", "presentacion", "plan", "tipo_operacion"]
+    COLUMNAS_MONEDA_RESULTADOS = ["importe_abonado", "diferencia"]
+    FORMATO_FECHA = "%d/%m/%Y"
+
+    @staticmethod
+    def a_enteros_escalados(serie, escala, dtype, cachear=False):
+        """Convierte una columna (texto, float o entera) a enteros en unidades de 1/escala."""
+        if pd.api.types.is_integer_dtype(serie):
+            return serie.astype(dtype)
+        valores = CalculosAuxiliares.convertir_columna_a_numero(serie, cachear=cachear).to_numpy(dtype=float)
+        escalados = np.where(np.isfinite(valores), np.rint(valores * escala), 0)
+        return pd.Series(escalados.astype(dtype), index=serie.index, name=serie.name)
+
+    @classmethod
+    def es_compacto(cls, dataframe):
+        tipos = dataframe.dtypes
+        return (
+            all(tipos[c] == np.int64 for c in cls.COLUMNAS_MONEDA if c in tipos)
+            and all(pd.api.types.is_integer_dtype(tipos[c]) for c in cls.COLUMNAS_PORCENTAJE if c in tipos)
+            and all(
+                isinstance(tipos[c], pd.CategoricalDtype) and tipos[c].categories.is_monotonic_increasing
+                for c in cls.COLUMNAS_CATEGORIA if c in tipos
+            )
+            and ("fecha" not in tipos or pd.api.types.is_datetime64_any_dtype(tipos["fecha"]))
+        )
+
+    @classmethod
+    def aplicar(cls, dataframe):
+        """Devuelve las operaciones con el esquema compacto (sin copiar si ya lo tienen)."""
+        if dataframe is None or cls.es_compacto(dataframe):
+            return dataframe
+
+        columnas = {}
+        for columna in dataframe.columns:
+            serie = dataframe[columna]
+            if columna in cls.COLUMNAS_MONEDA:
+                serie = cls.a_enteros_escalados(serie, 100, np.int64)
+            elif columna in cls.COLUMNAS_PORCENTAJE:
+                serie = cls.a_enteros_escalados(serie, 100, np.int32, cachear=True)
+            elif columna in cls.COLUMNAS_CATEGORIA:
+                if isinstance(serie.dtype, pd.CategoricalDtype):
+                    # Categorías en orden alfabético, como las que arma astype("category")
+                    serie = serie.cat.reorder_categories(serie.cat.categories.sort_values())
+                else:
+                    serie = serie.astype("category")
+            elif columna == "fecha" and not pd.api.types.is_datetime64_any_dtype(serie):
+                serie = pd.to_datetime(
+                    serie.astype(str).str.slice(0, 10), format=cls.FORMATO_FECHA, errors="coerce"
+                )
+            columnas[columna] = serie
+
+        return pd.DataFrame(columnas, index=dataframe.index)
+
+    @classmethod
+    def vista_en_pesos(cls, dataframe):
+        """Copia para mostrar/exportar: montos en pesos, porcentajes en %, fecha dd/mm/aaaa."""
+        if dataframe is None:
+            return None
+
+        vista = dataframe.copy(deep=False)
+        for columna in cls.COLUMNAS_MONEDA + cls.COLUMNAS_MONEDA_RESULTADOS + cls.COLUMNAS_PORCENTAJE:
+            if columna in vista.columns and pd.api.types.is_integer_dtype(vista[columna]):
+                vista[columna] = vista[columna] / 100
+        if "fecha" in vista.columns and pd.api.types.is_datetime64_any_dtype(vista["fecha"]):
+            vista["fecha"] = vista["fecha"].dt.strftime(cls.FORMATO_FECHA)
+        return vista
+
+    @classmethod
+    def vista_formateada(cls, dataframe, no_figura=""):
+        """Como vista_en_pesos, con montos ("1.234,56") y porcentajes ("3,50 %") ya como texto.
+
+        Para tablas de la app y exportaciones de texto (CSV); los nulos quedan
+        como `no_figura`.
+        """
+        if dataframe is None:
+            return None
+
+        vista = cls.vista_en_pesos(dataframe)
+        for columna in cls.COLUMNAS_MONEDA + cls.COLUMNAS_MONEDA_RESULTADOS:
+            if columna in vista.columns:
+                vista[columna] = CalculosAuxiliares.formatear_columna_moneda(vista[columna], no_figura=no_figura)
+        for columna in cls.COLUMNAS_PORCENTAJE:
+            if columna in vista.columns:
+                vista[columna] = CalculosAuxiliares.formatear_columna_porcentaje(vista[columna], no_figura=no_figura)
+        return vista
+
+    @staticmethod
+    def dividir_redondeando(numerador, divisor):
+        """División entera (divisor positivo) con los empates redondeados lejos del cero (ROUND_HALF_UP)."""
+        return np.sign(numerador) * ((2 * np.abs(numerador) + divisor) // (2 * divisor))
+
+class IndiceVariantes:
+    """Variantes "plan (a/i/b)" de operaciones con EsquemaOperaciones, calculadas una sola vez.
+
+    - `claves`: claves de variante distintas, en orden alfabético (el del reporte).
+    - `codigos`: id entero de variante por fila (posición dentro de `claves`).
+    - `porcentajes`: porcentajes por clave, con el mismo criterio que usaba
+      detectar_configuraciones_plan (combinaciones con nulos excluidas).
+    - `posiciones(codigo)`: posiciones de fila de cada variante, sin máscaras.
+    """
+
+    COLUMNAS = ["plan", "arancel_pct", "interes_pct", "bonificacion_pct"]
+
+    def __init__(self, dataframe):
+        self.claves = []
+        self.codigos = np.zeros(0, dtype=np.int64)
+        self.porcentajes = {}
+
+        if dataframe is not None and not dataframe.empty:
+            grupos = dataframe.groupby(self.COLUMNAS, sort=True, dropna=False, observed=True)
+            # Los porcentajes vienen en puntos básicos (ver EsquemaOperaciones)
+            combinaciones = [
+                (plan, arancel / 100, interes / 100, bonificacion / 100)
+                for plan, arancel, interes, bonificacion in grupos.size().index
+            ]
+            claves_combinacion = [
+                f"{plan} ({arancel:.2f}/{interes:.2f}/{bonificacion:.2f})"
+                for plan, arancel, interes, bonificacion in combinaciones
+            ]
+
+            # Combinaciones distintas pueden dar la misma clave formateada: se agrupan por texto
+            self.claves = sorted(set(claves_combinacion))
+            codigo_por_clave = {clave: codigo for codigo, clave in enumerate(self.claves)}
+            codigo_por_combinacion = np.array([codigo_por_clave[c] for c in claves_combinacion], dtype=np.int64)
+            self.codigos = codigo_por_combinacion[grupos.ngroup().to_numpy()]
+
+            for combinacion, clave in zip(combinaciones, claves_combinacion):
+                if any(pd.isna(valor) for valor in combinacion):
+                    continue
+                _, arancel, interes, bonificacion = combinacion
+                self.porcentajes[clave] = {
+                    "arancel": float(arancel),
+                    "interes": float(interes),
+                    "bonificacion": float(bonificacion)
+                }
+
+        self._orden, self._limites = self.agrupar_posiciones(self.codigos, len(self.claves))
+
+    @staticmethod
+    def agrupar_posiciones(codigos, cantidad_grupos):
+        """Ordena las filas por código (orden estable) y devuelve (orden, límites) de cada grupo."""
+        orden = np.argsort(codigos, kind="stable")
+        limites = np.concatenate(([0], np.cumsum(np.bincount(codigos, minlength=cantidad_grupos))))
+        return orden, limites
+
+    def posiciones(self, codigo):
+        """Posiciones (iloc) de las filas de la variante `codigo`, en orden original."""
+        return self._orden[self._limites[codigo]:self._limites[codigo + 1]]
+
+    def como_categoria(self):
+        """Columna variante_plan como Categorical (un entero por fila + las claves una vez)."""
+        return pd.Categorical.from_codes(self.codigos, categories=self.claves)
+
+class EntradaReportePlan(Mapping):
+    """Resumen de una variante en generar_reporte_por_plan (de solo lectura).
+
+    Guarda solo las filas con error de la variante, en el esquema compacto;
+    "detalle_errores" (esas filas en pesos) se arma recién cuando alguien lo
+    pide y queda guardado. La clave figura siempre, se haya pedido o no.
+    """
+
+    def __init__(self, datos, errores):
+        self._datos = dict(datos)
+        self._errores = errores
+        self._detalle = None
+
+    def __getitem__(self, clave):
+        if clave != "detalle_errores":
+            return self._datos[clave]
+        if self._detalle is None:
+            self._detalle = EsquemaOperaciones.vista_en_pesos(self._errores)
+        return self._detalle
+
+    def __iter__(self):
+        yield from self._datos
+        yield "detalle_errores"
+
+    def __len__(self):
+        return len(self._datos) + 1
+
+class ResumenProcesado:
+    """Resultado de una única lectura de un PDF: operaciones, metadatos y resumen impositivo."""
+
+    def __init__(self, operaciones, metadatos, resumen_impositivo, nombre="", hash_contenido=""):
+        self.nombre = nombre
+        self.operaciones = operaciones
+        self.metadatos = metadatos
+        self.resumen_impositivo = resumen_impositivo
+        self.hash_contenido = hash_contenido  # SHA-256 de los bytes del PDF
+        self.desde_cache = False
+        self.error = None
+        # {"modo", "paginas", "paginas_texto", "paginas_plantilla", "paginas_tablas", "paginas_omitidas"}
+        self.extraccion = None
+        self.plantillas_tabla = {}  # formato de página -> GeometriaTabla aprendida al leerlo
+
+    @classmethod
+    def con_error(cls, nombre, excepcion):
+        """Resumen vacío que registra por qué no se pudo procesar el archivo."""
+        resumen = cls(EsquemaOperaciones.aplicar(pd.DataFrame(columns=COLUMNAS_OPERACIONES)), {}, None, nombre=nombre)
+        resumen.error = f"{type(excepcion).__name__}: {excepcion}"
+        return resumen
+
+    def descripcion_extraccion(self):
+        """Texto corto con el modo de extracción y cuántas páginas leyó cada método."""
+        if not self.extraccion:
+            return ""
+        e = self.extraccion
+        detalle = f"{e.get('paginas_plantilla', 0)} con plantilla, {e['paginas_tablas']} con extract_tables()"
+        if e.get("paginas_omitidas"):
+            detalle += f", {e['paginas_omitidas']} sin operaciones"
+        if e["modo"] == "tablas":
+            return f"modo tablas: {e['paginas']} págs. ({detalle})"
+        return f"modo texto: {e['paginas_texto']}/{e['paginas']} págs. por texto ({detalle})"
+
+class IndiceDuplicados:
+    """Índice de resúmenes cargados para detectar duplicados con búsquedas en tiempo constante.
+
+    Cada resumen se indexa por su Tipo y Nº, por el hash de los bytes del PDF
+    y por una huella del conjunto de operaciones (cupón, terminal-lote, fecha
+    e importe, sin importar el orden). Además cada operación se indexa por su
+    clave, para avisar cuando una misma operación figura en más de un resumen.
+
+    Cada clave guarda sus dueños en orden de registro (un dict usado como
+    conjunto ordenado), así que quitar un resumen solo toca sus propias claves
+    y la coincidencia informada es la del primer resumen registrado que la tenga.
+    """
+
+    COLUMNAS_OPERACION = ["cupon", "terminal-lote", "fecha", "importe"]
+
     def __init__(self):
+        self._por_tipo_numero = {}
+        self._por_hash = {}
+        self._por_huella = {}
+        self._por_operacion = {}
+        self._claves_por_nombre = {}  # nombre -> (tipo_numero, hash, huella, claves de operaciones)
+
+    @staticmethod
+    def _otro_dueno(duenos, nombre):
+        """Primer dueño registrado distinto de `nombre` (None si no hay)."""
+        if duenos:
+            for dueno in duenos:
+                if dueno != nombre:
+                    return dueno
+        return None
+
+    @classmethod
+    def claves_operaciones(cls, operaciones):
+        """Una clave uint64 por operación, calculada en bloque sobre las columnas identificatorias."""
+        columnas = [c for c in cls.COLUMNAS_OPERACION if c in operaciones.columns]
+        if operaciones.empty or not columnas:
+            return np.zeros(0, dtype=np.uint64)
+        return pd.util.hash_pandas_object(operaciones[columnas], index=False).to_numpy()
+
+    @staticmethod
+    def huella_operaciones(claves):
+        """Huella del conjunto (multiconjunto) de operaciones; "" si no hay operaciones."""
+        if not len(claves):
+            return ""
+        return hashlib.sha256(np.sort(claves).tobytes()).hexdigest()
+
+    def _claves_resumen(self, resumen):
+        claves = self.claves_operaciones(resumen.operaciones)
+        return (
+            (resumen.metadatos or {}).get("tipo_numero") or "",
+            resumen.hash_contenido or "",
+            self.huella_operaciones(claves),
+            claves,
+        )
+
+    def buscar(self, nombre, resumen):
+        """Busca coincidencias de `resumen` con los ya registrados (distintos de `nombre`).
+
+        Devuelve un dict con "duplicado_de" (nombre del resumen igual o None),
+        "motivo" ("tipo_numero", "contenido" u "operaciones") y
+        "operaciones_repetidas" ({nombre: cantidad} de operaciones ya vistas).
+        Si `nombre` ya está registrado con los mismos bytes, no hay coincidencias.
+        """
+        tipo_numero, hash_contenido, huella, claves = self._claves_resumen(resumen)
+        coincidencias = {"duplicado_de": None, "motivo": None, "operaciones_repetidas": {}}
+
+        registrado = self._claves_por_nombre.get(nombre)
+        if registrado is not None and hash_contenido and registrado[1] == hash_contenido:
+            return coincidencias
+
+        for motivo, valor, indice in (
+            ("tipo_numero", tipo_numero, self._por_tipo_numero),
+            ("contenido", hash_contenido, self._por_hash),
+            ("operaciones", huella, self._por_huella),
+        ):
+            otro = self._otro_dueno(indice.get(valor), nombre) if valor else None
+            if otro is not None:
+                coincidencias["duplicado_de"] = otro
+                coincidencias["motivo"] = motivo
+                break
+
+        repetidas = {}
+        por_operacion = self._por_operacion
+        for clave in claves.tolist():
+            otro = self._otro_dueno(por_operacion.get(clave), nombre)
+            if otro is not None:
+                repetidas[otro] = repetidas.get(otro, 0) + 1
+        coincidencias["operaciones_repetidas"] = repetidas
+        return coincidencias
+
+    def registrar(self, nombre, resumen):
+        """Indexa `resumen` bajo `nombre` (reemplaza lo registrado antes con ese nombre)."""
+        self.quitar(nombre)
+        claves_resumen = self._claves_resumen(resumen)
+        self._claves_por_nombre[nombre] = claves_resumen
+        self._indexar(nombre, claves_resumen)
+
+    def _claves_por_indice(self, claves_resumen):
+        tipo_numero, hash_contenido, huella, claves = claves_resumen
+        for valor, indice in (
+            (tipo_numero, self._por_tipo_numero),
+            (hash_contenido, self._por_hash),
+            (huella, self._por_huella),
+        ):
+            if valor:
+                yield indice, valor
+        for clave in set(claves.tolist()):
+            yield self._por_operacion, clave
+
+    def _indexar(self, nombre, claves_resumen):
+        for indice, clave in self._claves_por_indice(claves_resumen):
+            indice.setdefault(clave, {})[nombre] = None
+
+    def quitar(self, nombre):
+        """Saca `nombre` del índice; sus claves quedan a cargo de otro resumen que las tenga."""
+        claves_resumen = self._claves_por_nombre.pop(nombre, None)
+        if claves_resumen is None:
+            return
+        for indice, clave in self._claves_por_indice(claves_resumen):
+            duenos = indice.get(clave)
+            if duenos is not None:
+                duenos.pop(nombre, None)
+                if not duenos:
+                    del indice[clave]
+
+    def __contains__(self, nombre):
+        return nombre in self._claves_por_nombre
+
+    def __len__(self):
+        return len(self._claves_por_nombre)
+
+# 🔹 Pools de procesos para ingesta por lotes
+# Uno por cantidad de procesos, compartido entre lotes, hilos y sesiones de
+# Streamlit: pedir otro tamaño crea otro pool en vez de cerrar uno que puede
+# estar en uso. Con "forkserver" cada worker nace de un proceso que ya importó pdfplumber.
+_pools_procesos = {}  # tamaño -> ProcessPoolExecutor
+_pool_procesos_lock = threading.Lock()
+
+def _inicializar_worker():
+    """Deja pdfplumber importado en el worker antes de recibir el primer PDF."""
+    import pdfplumber  # noqa: F401
+
+def _contexto_multiproceso():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context("forkserver")
+        contexto.set_forkserver_preload(["pdfplumber", "pandas"])
+        return contexto
+    return multiprocessing.get_context("spawn")
+
+def _obtener_pool_procesos(max_procesos=None):
+    """Devuelve el pool compartido de ese tamaño, creándolo y pre-calentando sus workers si hace falta."""
+    tamano = max(1, int(max_procesos or os.cpu_count() or 1))
+
+    with _pool_procesos_lock:
+        pool = _pools_procesos.get(tamano)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=tamano,
+                mp_context=_contexto_multiproceso(),
+                initializer=_inicializar_worker,
+            )
+            # Forzar el arranque de todos los workers ahora y no en el primer lote
+            for futuro in [pool.submit(_inicializar_worker) for _ in range(tamano)]:
+                futuro.result()
+            _pools_procesos[tamano] = pool
+
+        return pool
+
+def _descartar_pool_procesos(pool):
+    """Saca `pool` de los compartidos y lo cierra (cuando se rompió: un worker murió).
+
+    No cancela nada: lo que otros ya enviaron a un pool roto falla solo con
+    BrokenProcessPool, y si otro hilo ya lo reemplazó, el nuevo queda intacto.
+    """
+    with _pool_procesos_lock:
+        for tamano, compartido in list(_pools_procesos.items()):
+            if compartido is pool:
+                del _pools_procesos[tamano]
+    pool.shutdown(wait=False)
+
+def _parsear_resumen_en_worker(datos_pdf, modo_extraccion=MODO_EXTRACCION_POR_DEFECTO, plantillas_tabla=None):
+    """Punto de entrada de los workers: parsea un PDF sin estado compartido."""
+    procesador = ProcesadorLogico(modo_extraccion=modo_extraccion)
+    procesador.plantillas_tabla = dict(plantillas_tabla or {})
+    return procesador._parsear_resumen(datos_pdf)
+
+def _iterar_paginas(datos_pdf, numeros_pagina=None, con_texto=True, modo_extraccion=MODO_EXTRACCION_POR_DEFECTO,
+                    lector_tablas=None):
+    """Recorre las páginas indicadas (1-based) devolviendo (filas de operaciones, texto, método) de a una.
+
+    El método es "omitida", "texto", "plantilla" o "tablas" según cómo se
+    leyeron las filas de esa página (ver `ProcesadorLogico._filas_de_pagina`).
+    El `lector_tablas` conserva la geometría aprendida entre páginas; si no se
+    pasa, se usa uno nuevo. Después de cada página se vacía la caché de
+    objetos de pdfplumber, así la memoria no crece con el largo del documento.
+    """
+    lector_tablas = lector_tablas if lector_tablas is not None else LectorTablas()
+    with pdfplumber.open(io.BytesIO(datos_pdf), pages=numeros_pagina) as documento_pdf:
+        for pagina_actual in documento_pdf.pages:
+            with instrumentacion.medir("pagina") as tramo:
+                filas_pagina, metodo = ProcesadorLogico._filas_de_pagina(pagina_actual, modo_extraccion, lector_tablas)
+                texto_pagina = (pagina_actual.extract_text() or "") if con_texto else None
+                pagina_actual.flush_cache()
+                tramo.nombre = f"pagina.{metodo}"  # el método se conoce recién después de leerla
+                tramo.contar(filas=len(filas_pagina))
+            yield filas_pagina, texto_pagina, metodo
+
+def _extraer_paginas(datos_pdf, numeros_pagina=None, con_texto=True, modo_extraccion=MODO_EXTRACCION_POR_DEFECTO,
+                     plantillas_tabla=None):
+    """Extrae, en orden, las filas de operaciones y el texto de las páginas indicadas (1-based).
+
+    Es el mismo recorrido para el modo secuencial y para cada rango del modo
+    por páginas, así ambos devuelven exactamente lo mismo. Devuelve también
+    el método usado en cada página y las plantillas de tabla que quedaron
+    (las recibidas más las aprendidas en el recorrido).
+    """
+    lista_filas_extraidas = []
+    textos_paginas = []
+    metodos_paginas = []
+    lector_tablas = LectorTablas(plantillas_tabla)
+
+    for filas_pagina, texto_pagina, metodo in _iterar_paginas(
+        datos_pdf, numeros_pagina, con_texto, modo_extraccion, lector_tablas
+    ):
+        lista_filas_extraidas.extend(filas_pagina)
+        metodos_paginas.append(metodo)
+        if con_texto:
+            textos_paginas.append(texto_pagina)
+
+    return lista_filas_extraidas, textos_paginas, metodos_paginas, lector_tablas.plantillas
+
+def _agrupar_coordenadas(valores, tolerancia=3):
+    """Ordena coordenadas y junta las que están a menos de `tolerancia` puntos (se queda con la primera)."""
+    agrupadas = []
+    for valor in sorted(valores):
+        if not agrupadas or valor - agrupadas[-1] > tolerancia:
+            agrupadas.append(valor)
+    return agrupadas
+
+class GeometriaTabla:
+    """Geometría de la tabla "Detalle de Cupones": límites de columna y bbox, aprendidos de una página.
+
+    Todas las páginas de un mismo formato de resumen comparten las columnas;
+    lo que cambia es la cantidad de filas. Con la geometría conocida, cada
+    página nueva solo necesita las líneas horizontales para armar las celdas:
+    no pasa por la detección de tablas de pdfplumber (intersecciones y
+    búsqueda de celdas) y cada carácter se ubica en su celda con una búsqueda
+    binaria, en lugar de recorrer todos los caracteres una vez por fila como
+    hace `Table.extract()`.
+    """
+
+    def __init__(self, columnas, bbox, formato):
+        self.columnas = tuple(columnas)  # x de cada línea vertical, len(COLUMNAS_OPERACIONES) + 1
+        self.bbox = tuple(bbox)  # (x0, top, x1, bottom) de la tabla en la página donde se aprendió
+        self.formato = formato
+
+    def __repr__(self):
+        return f"GeometriaTabla(columnas={len(self.columnas) - 1}, bbox={tuple(round(v, 1) for v in self.bbox)})"
+
+    @staticmethod
+    def formato_de(pagina):
+        """Clave del formato de página (tamaño redondeado); cada formato tiene su plantilla."""
+        return f"{round(pagina.width)}x{round(pagina.height)}"
+
+    @classmethod
+    def aprender(cls, pagina):
+        """Detecta las tablas de la página y devuelve (geometría o None, filas con fecha).
+
+        Las filas son las mismas que `ProcesadorLogico._filas_de_operaciones`.
+        Solo se aprende si una única tabla trae operaciones y tiene exactamente
+        las columnas esperadas; si no, la geometría es None.
+        """
+        filas_pagina = []
+        candidatas = []
+        for tabla in pagina.find_tables():
+            filas_tabla = [
+                fila for fila in tabla.extract()
+                if fila and ProcesadorLogico.PATRON_FECHA_FILA.match(str(fila[0]))
+            ]
+            filas_pagina.extend(filas_tabla)
+            if filas_tabla:
+                candidatas.append(tabla)
+
+        if len(candidatas) != 1:
+            return None, filas_pagina
+
+        tabla = candidatas[0]
+        columnas = _agrupar_coordenadas(
+            {celda[0] for celda in tabla.cells} | {celda[2] for celda in tabla.cells},
+            ProcesadorLogico.TOLERANCIA_GRILLA,
+        )
+        if len(columnas) != len(COLUMNAS_OPERACIONES) + 1:
+            return None, filas_pagina
+        return cls(columnas, tabla.bbox, cls.formato_de(pagina)), filas_pagina
+
+    def filas(self, pagina):
+        """Filas con fecha de la página usando la geometría, o None si la página no encaja.
+
+        La página encaja si sus líneas verticales son exactamente las columnas
+        de la plantilla y hay al menos dos líneas horizontales de la grilla.
+        Cuentan como tales las que van de la primera a la última columna
+        (enteras o en tramos) dentro del alto que cubren las verticales
+        exteriores; una raya del mismo ancho por encima o por debajo de la
+        tabla (encabezado, pie) no es parte de la grilla. Solo cuentan los
+        caracteres dentro de la grilla; el criterio (el centro del carácter
+        dentro de la celda) y el armado del texto de cada celda son los de
+        `Table.extract()`, así las filas salen idénticas.
+        """
+        tolerancia = ProcesadorLogico.TOLERANCIA_GRILLA
+        verticales = _agrupar_coordenadas(
+            (borde["x0"] for borde in pagina.edges if borde["orientation"] == "v"), tolerancia
+        )
+        if len(verticales) != len(self.columnas) or any(
+            abs(x - esperado) > tolerancia for x, esperado in zip(verticales, self.columnas)
+        ):
+            return None
+
+        izquierda, derecha = self.columnas[0], self.columnas[-1]
+        exteriores = [
+            borde for borde in pagina.edges
+            if borde["orientation"] == "v"
+            and min(abs(borde["x0"] - izquierda), abs(borde["x0"] - derecha)) <= tolerancia
+        ]
+        arriba = min(borde["top"] for borde in exteriores) - tolerancia
+        abajo = max(borde["bottom"] for borde in exteriores) + tolerancia
+
+        # Tramos horizontales de la grilla, agrupados por altura: (top, x0 mínimo, x1 máximo)
+        tramos = []
+        for borde in sorted(
+            (
+                borde for borde in pagina.edges
+                if borde["orientation"] == "h" and arriba <= borde["top"] <= abajo
+                and borde["x0"] >= izquierda - tolerancia and borde["x1"] <= derecha + tolerancia
+            ),
+            key=lambda borde: borde["top"],
+        ):
+            if tramos and borde["top"] - tramos[-1][0] <= tolerancia:
+                top, x0, x1 = tramos[-1]
+                tramos[-1] = (top, min(x0, borde["x0"]), max(x1, borde["x1"]))
+            else:
+                tramos.append((borde["top"], borde["x0"], borde["x1"]))
+        horizontales = [
+            top for top, x0, x1 in tramos
+            if x0 <= izquierda + tolerancia and x1 >= derecha - tolerancia
+        ]
+        if len(horizontales) < 2:
+            return None
+
+        cantidad_filas = len(horizontales) - 1
+        cantidad_columnas = len(self.columnas) - 1
+        caracteres_por_celda = {}
+        for caracter in pagina.chars:
+            fila = bisect.bisect_right(horizontales, (caracter["top"] + caracter["bottom"]) / 2) - 1
+            columna = bisect.bisect_right(self.columnas, (caracter["x0"] + caracter["x1"]) / 2) - 1
+            if 0 <= fila < cantidad_filas and 0 <= columna < cantidad_columnas:
+                caracteres_por_celda.setdefault((fila, columna), []).append(caracter)
+
+        filas_pagina = []
+        for fila in range(cantidad_filas):
+            fila_actual = []
+            for columna in range(cantidad_columnas):
+                caracteres = caracteres_por_celda.get((fila, columna))
+                fila_actual.append(
+                    pdfplumber.utils.extract_text(
+                        caracteres, x_shift=self.columnas[columna], y_shift=horizontales[fila]
+                    ) if caracteres else ""
+                )
+            if ProcesadorLogico.PATRON_FECHA_FILA.match(fila_actual[0]):
+                filas_pagina.append(fila_actual)
+        return filas_pagina
+
+class LectorTablas:
+    """Lee las filas de tabla de páginas sucesivas reusando la geometría aprendida.
+
+    `plantillas` (formato -> GeometriaTabla) puede venir de resúmenes ya
+    leídos; si una página no encaja en la plantilla de su formato, se detecta
+    la tabla de nuevo y, si se puede, se reemplaza la plantilla.
+    """
+
+    def __init__(self, plantillas=None):
+        self.plantillas = dict(plantillas or {})
+
+    def filas(self, pagina):
+        """Devuelve (filas, "plantilla") si se usó la geometría o (filas, "tablas") si se detectó la tabla."""
+        formato = GeometriaTabla.formato_de(pagina)
+        geometria = self.plantillas.get(formato)
+        if geometria is not None:
+            filas_pagina = geometria.filas(pagina)
+            if filas_pagina is not None:
+                return filas_pagina, "plantilla"
+
+        geometria, filas_pagina = GeometriaTabla.aprender(pagina)
+        if geometria is not None:
+            self.plantillas[formato] = geometria
+        return filas_pagina, "tablas"
+
+def _dividir_paginas(total_paginas, procesos):
+    """Parte 1..total_paginas en rangos contiguos (unos dos por proceso para balancear carga)."""
+    tamano_rango = max(1, -(-total_paginas // (procesos * 2)))
+    return [
+        list(range(inicio, min(inicio + tamano_rango, total_paginas + 1)))
+        for inicio in range(1, total_paginas + 1, tamano_rango)
+    ]
+
+_FLAGS_METADATOS = re.IGNORECASE
+_FLAGS_IMPUESTOS = re.IGNORECASE | re.DOTALL
+
+class ExtractorMetadatos:
+    """Registro de patrones de metadatos e impuestos, compilados una sola vez al importar.
+
+    En lugar de un `re.search` por patrón sobre todo el texto, `anclas` anota
+    en una pasada por el texto (en minúsculas) dónde aparecen las palabras con
+    las que arranca cada patrón ("fecha", "tipo", "echeq", "neto", ...).
+    Después cada patrón se prueba con `match` solo en esas posiciones, de
+    izquierda a derecha: el primer acierto es el mismo que daría `re.search`,
+    porque toda coincidencia empieza en una de sus anclas. Los patrones y el
+    orden de los fallbacks son los de siempre.
+    """
+
+    # Prefijo literal (en minúsculas) con el que empieza toda coincidencia de cada ancla
+    PALABRAS_ANCLA = {
+        "fecha": "fecha",
+        "tipo": "tipo",
+        "hoja": "hoja",
+        "echeq": "echeq",
+        "transferencia": "transferencia",
+        "deposito": "dep",
+        "nota": "nota de cr",
+        "detalle": "detalle",
+        "forma": "forma",
+        "retenciones": "retenciones",
+        "neto": "neto",
+        "importe": "importe",
+    }
+    # Letras que re.IGNORECASE iguala a "i"/"s" pero str.lower() no
+    LETRAS_SIN_MINUSCULA_ASCII = ("\u0131", "\u017f")
+
+    # (patrón compilado, anclas en las que puede empezar), en orden de fallback
+    FECHA_EMISION = [
+        (re.compile(r"Fecha\s*de\s*Emisi[oó]n\s*:\s*(\d{2}/\d{2}/\d{4})", _FLAGS_METADATOS), ("fecha",)),
+        (re.compile(r"Tipo\s*y\s*N[º°]\s*:\s*.*?\n.*?Fecha\s*de\s*Emisi[oó]n\s*:\s*(\d{2}/\d{2}/\d{4})", _FLAGS_METADATOS), ("tipo",)),
+        (re.compile(r"Hoja\s*N[º°]\s*:\s*\d+\nFecha\s*de\s*Emisi[oó]n\s*:\s*(\d{2}/\d{2}/\d{4})", _FLAGS_METADATOS), ("hoja",)),
+    ]
+    TIPO_NUMERO = [
+        (re.compile(r"Tipo\s*y\s*N[º°]\s*:\s*(\S.*?)(?:\n|$)", _FLAGS_METADATOS), ("tipo",)),
+    ]
+    METODO_PAGO = (
+        re.compile(
+            r"(Echeq|Transferencia|Dep[oó]sito|Nota de Cr[eé]dito)"
+            r"(?:\s*a\s*la\s*Orden)?(?:\s*Pago\s*Diferido)?"
+            r"\s*Fecha\s*:\s*(\d{2}/\d{2}/\d{4})",
+            _FLAGS_METADATOS,
+        ),
+        ("echeq", "transferencia", "deposito", "nota"),
+    )
+    FECHA_PAGO = [
+        (re.compile(r"Fecha\s*de\s*Pago\s*:\s*(\d{2}/\d{2}/\d{4})", _FLAGS_METADATOS), ("fecha",)),
+        (re.compile(r"Detalle\s*de\s*Cupones\s*Liquidados.*?Fecha\s*de\s*Pago\s*:\s*(\d{2}/\d{2}/\d{4})", _FLAGS_METADATOS), ("detalle",)),
+        (re.compile(r"Echeq\s*a\s*la\s*Orden\s*Pago\s*Diferido\s*Fecha\s*:\s*(\d{2}/\d{2}/\d{4})", _FLAGS_METADATOS), ("echeq",)),
+    ]
+    FORMA_PAGO = [
+        (re.compile(r"A\s*Pagar\s*\n.*?\n.*?\n.*?\n(.*?)\n", _FLAGS_METADATOS), ("a_pagar",)),
+        (re.compile(r"Echeq\s*a\s*la\s*Orden\s*(Pago\s*Diferido)", _FLAGS_METADATOS), ("echeq",)),
+        (re.compile(r"Forma\s*de\s*Pago\s*:\s*(.*?)(?:\n|$)", _FLAGS_METADATOS), ("forma",)),
+    ]
+    BORDES_NO_ALFANUMERICOS = re.compile(r"^\W+|\W+$")
+    FECHA_VALIDA = re.compile(r"\d{2}/\d{2}/\d{4}")
+
+    DETALLES_FACTURACION = (
+        re.compile(
+            r"(?:Detalle|Detalles?)\s+de\s+facturaci[oó]n(.*?)"
+            r"(?:(?:Detalle\s+(?:de\s+)?)?Retenciones(?:\s+y\s+Percepciones)?\s+Impositivas?|"
+            r"Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar))",
+            _FLAGS_IMPUESTOS,
+        ),
+        ("detalle",),
+    )
+    RETENCIONES = (
+        re.compile(
+            r"(?:Detalle\s+(?:de\s+)?)?Retenciones(?:\s+y\s+Percepciones)?\s+Impositivas?(.*?)"
+            r"(?:(?:Importe\s*\$\s*[\d\.,]+)|Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar))",
+            _FLAGS_IMPUESTOS,
+        ),
+        ("detalle", "retenciones"),
+    )
+    NETO = [
+        # Caso habitual: el monto aparece después de "Neto ..."
+        (re.compile(r"Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar).*?\$\s*([\d\.\,]+)", _FLAGS_IMPUESTOS), ("neto",)),
+        # Fallback 1: el renglón de pago (Echeq...) trae el mismo monto
+        (re.compile(r"Echeq\s*a\s*la\s*Orden.*?\$\s*([\d\.\,]+)", _FLAGS_IMPUESTOS), ("echeq",)),
+    ]
+    # Fallback 2: tomar el último "Importe $ X" antes del bloque Neto
+    BLOQUE_IMPORTES_NETO = (
+        re.compile(r"(Importe\s*\$\s*[\d\.\,]+\s*)+?\s*Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar)", _FLAGS_IMPUESTOS),
+        ("importe",),
+    )
+    IMPORTE = re.compile(r"Importe\s*\$\s*([\d\.\,]+)", _FLAGS_IMPUESTOS)
+
+    @classmethod
+    def anclas(cls, texto):
+        """Posiciones (en orden) de cada ancla en el texto."""
+        minusculas = texto.lower()
+        if len(minusculas) != len(texto) or any(c in texto for c in cls.LETRAS_SIN_MINUSCULA_ASCII):
+            # Texto con letras cuya minúscula no es 1 a 1: se busca con las mismas reglas que re
+            def buscar_palabra(palabra, desde):
+                coincidencia = re.compile(re.escape(palabra), re.IGNORECASE).search(texto, desde)
+                return coincidencia.start() if coincidencia else -1
+        else:
+            buscar_palabra = minusculas.find
+
+        posiciones = {}
+        for nombre, palabra in cls.PALABRAS_ANCLA.items():
+            encontradas = []
+            posicion = buscar_palabra(palabra, 0)
+            while posicion != -1:
+                encontradas.append(posicion)
+                posicion = buscar_palabra(palabra, posicion + 1)
+            if encontradas:
+                posiciones[nombre] = encontradas
+
+        # "A\s*Pagar" empieza en el carácter anterior a los espacios que preceden a "pagar"
+        inicios_a_pagar = []
+        posicion = buscar_palabra("pagar", 0)
+        while posicion != -1:
+            inicio = posicion - 1
+            while inicio >= 0 and texto[inicio].isspace():
+                inicio -= 1
+            if inicio >= 0:
+                inicios_a_pagar.append(inicio)
+            posicion = buscar_palabra("pagar", posicion + 1)
+        if inicios_a_pagar:
+            posiciones["a_pagar"] = inicios_a_pagar
+        return posiciones
+
+    @staticmethod
+    def buscar(patron, nombres_anclas, texto, anclas):
+        """Equivalente a `patron.search(texto)` probando solo en las anclas del patrón."""
+        if len(nombres_anclas) == 1:
+            candidatas = anclas.get(nombres_anclas[0], ())
+        else:
+            candidatas = sorted(p for nombre in nombres_anclas for p in anclas.get(nombre, ()))
+        for posicion in candidatas:
+            coincidencia = patron.match(texto, posicion)
+            if coincidencia:
+                return coincidencia
+        return None
+
+    @classmethod
+    def primera(cls, patrones, texto, anclas):
+        """Primer patrón (en orden de fallback) que aparece en el texto."""
+        for patron, nombres_anclas in patrones:
+            coincidencia = cls.buscar(patron, nombres_anclas, texto, anclas)
+            if coincidencia:
+                return coincidencia
+        return None
+
+    @classmethod
+    def metadatos(cls, texto, anclas=None):
+        """Tipo y Nº, fecha de emisión, forma y fecha de pago (mismo criterio que antes)."""
+        anclas = cls.anclas(texto) if anclas is None else anclas
+        metadatos = {"tipo_numero": "", "fecha_emision": "", "fecha_pago": "", "forma_pago": ""}
+
+        # Antes la fecha de emisión se buscaba sobre el texto con los espacios
+        # colapsados; sus patrones solo tienen \s* entre palabras, así que da
+        # lo mismo buscar sobre el texto original
+        coincidencia = cls.primera(cls.FECHA_EMISION, texto, anclas)
+        if coincidencia:
+            metadatos["fecha_emision"] = next((g for g in coincidencia.groups() if g), "")
+
+        coincidencia = cls.primera(cls.TIPO_NUMERO, texto, anclas)
+        if coincidencia:
+            metadatos["tipo_numero"] = coincidencia.group(1).strip()
+
+        coincidencia = cls.buscar(*cls.METODO_PAGO, texto, anclas)
+        if coincidencia:
+            metadatos["forma_pago"] = coincidencia.group(1).strip()
+            metadatos["fecha_pago"] = coincidencia.group(2).strip()
+
+        if not metadatos["fecha_pago"]:
+            coincidencia = cls.primera(cls.FECHA_PAGO, texto, anclas)
+            if coincidencia:
+                metadatos["fecha_pago"] = next((g for g in coincidencia.groups() if g), "")
+
+        if not metadatos["forma_pago"]:
+            for patron, nombres_anclas in cls.FORMA_PAGO:
+                coincidencia = cls.buscar(patron, nombres_anclas, texto, anclas)
+                if coincidencia:
+                    forma_pago = next((g for g in coincidencia.groups() if g), "").strip()
+                    forma_pago = cls.BORDES_NO_ALFANUMERICOS.sub("", forma_pago)
+                    forma_pago = " ".join(forma_pago.split())
+                    if forma_pago:
+                        metadatos["forma_pago"] = forma_pago
+                        break
+
+        for campo in ["fecha_emision", "fecha_pago"]:
+            if metadatos[campo] and not cls.FECHA_VALIDA.match(metadatos[campo]):
+                metadatos[campo] = ""
+
+        return metadatos
+
+    @staticmethod
+    def _conceptos_con_monto(bloque, excluir=None):
+        conceptos = {}
+        for linea in bloque.splitlines():
+            ln = linea.strip()
+            if "$" in ln and (excluir is None or excluir not in ln):
+                partes = ln.split("$")
+                concepto = partes[0].strip(" -")
+                monto = partes[-1].strip()
+                if concepto and monto:
+                    conceptos[concepto] = monto
+        return conceptos
+
+    @classmethod
+    def impuestos(cls, texto, anclas=None):
+        """Detalles de facturación, retenciones impositivas y neto liquidado."""
+        anclas = cls.anclas(texto) if anclas is None else anclas
+        res = {
+            "detalles_facturacion": {},
+            "retenciones_impositivas": {},
+            "neto_liquidado": None
+        }
+
+        coincidencia = cls.buscar(*cls.DETALLES_FACTURACION, texto, anclas)
+        if coincidencia:
+            res["detalles_facturacion"] = cls._conceptos_con_monto(coincidencia.group(1))
+
+        coincidencia = cls.buscar(*cls.RETENCIONES, texto, anclas)
+        if coincidencia:
+            res["retenciones_impositivas"] = cls._conceptos_con_monto(
+                coincidencia.group(1), excluir="Retenciones Impositivas"
+            )
+
+        coincidencia = cls.primera(cls.NETO, texto, anclas)
+        if coincidencia:
+            res["neto_liquidado"] = coincidencia.group(1)
+        else:
+            bloque = cls.buscar(*cls.BLOQUE_IMPORTES_NETO, texto, anclas)
+            if bloque:
+                candidatos = cls.IMPORTE.findall(bloque.group(0))
+                if candidatos:
+                    res["neto_liquidado"] = candidatos[-1]
+
+        return res
+
+class ProcesadorLogico:
+    PATRON_FECHA_FILA = re.compile(r"\d{2}/\d{2}/\d{4}")
+    # Celdas numéricas tal como las imprime el resumen: "$ 1.234,56", "1,80 %", "-" o vacías
+    PATRON_CELDA_NUMERICA = re.compile(r"-|[$\s-]*\d[\d.,]*\s*%?")
+    TOLERANCIA_GRILLA = 3  # puntos
+    # Decimales de porcentaje que respeta el recálculo (4 = centésimos de punto
+    # básico); con más se avisa en el log y se redondean
+    DECIMALES_PORCENTAJES = 4
+    FILAS_POR_SEGMENTO_PDF = 40  # ~ una página de la tabla de errores (ver informe_pdf.TablaPorSegmentos)
+    FILAS_POR_BLOQUE_EXCEL = 20_000
+    # Excel no admite estos caracteres en el nombre de una hoja (y lo corta en 31)
+    PATRON_NOMBRE_HOJA_INVALIDO = re.compile(r"[\[\]:*?/\\]")
+
+    def __init__(self, cache=None, historial=None, modo_extraccion=MODO_EXTRACCION_POR_DEFECTO, cache_exportaciones=None):
+        if modo_extraccion not in MODOS_EXTRACCION:
+            raise ValueError(f"Modo de extracción desconocido: {modo_extraccion!r} (válidos: {MODOS_EXTRACCION})")
+        self.modo_extraccion = modo_extraccion
+        self.plantillas_tabla = {}  # formato de página -> GeometriaTabla (ver LectorTablas)
+        self.cache = cache  # CacheResumenes opcional (ver cache_resumenes.py)
+        self.historial = historial  # HistorialOperaciones opcional (ver historial_operaciones.py)
+        self.cache_exportaciones = cache_exportaciones  # CacheExportaciones opcional (ver cache_exportaciones.py)
+
         self.operaciones_por_resumen = {}
         self.resultados_por_resumen = {}
         self.metadatos_por_resumen = {}
@@ -100,50 +1266,494 @@ class ProcesadorLogico:
         self.porcentajes_ajustados_por_resumen = {}
         self.resumen_impositivo_por_resumen = {}
 
-        self.dataframe_operaciones = None
+        self._dataframe_operaciones = None
+        self._indice_variantes = None
+        self._huella_operaciones = None
+        self._conteo_planes = None
         self.dataframe_resultados = None
         self.diccionario_metadatos = {}
         self.diccionario_porcentajes_originales = {}
         self.diccionario_porcentajes_ajustados = {}
         self.resumen_impositivo = None
+        self.errores_exportacion = {}
+        self.excel_hojas_por_variante = False  # además de "Resultados", una hoja por variante de plan
+
+    @property
+    def dataframe_operaciones(self):
+        return self._dataframe_operaciones
+
+    @dataframe_operaciones.setter
+    def dataframe_operaciones(self, dataframe):
+        # Siempre en el esquema compacto; el índice de variantes y la huella se recalculan en el próximo uso
+        self._dataframe_operaciones = EsquemaOperaciones.aplicar(dataframe)
+        self._indice_variantes = None
+        self._huella_operaciones = None
+        self._conteo_planes = None
+
+    @property
+    def dataframe_resultados(self):
+        return self._dataframe_resultados
+
+    @dataframe_resultados.setter
+    def dataframe_resultados(self, dataframe):
+        # Cada asignación es una versión nueva de los resultados (ver huella_exportacion);
+        # si se modifican en el lugar, hay que volver a asignarlos
+        self._dataframe_resultados = dataframe
+        self._huella_resultados = None
+
+    @property
+    def indice_variantes(self):
+        """IndiceVariantes de las operaciones activas (se calcula una vez por DataFrame cargado)."""
+        if self._indice_variantes is None:
+            self._indice_variantes = IndiceVariantes(self._dataframe_operaciones)
+        return self._indice_variantes
+
+    def cargar_resumen_pdf(self, ruta_archivo_pdf, procesos_por_paginas=None):
+        """Lee el PDF una sola vez y devuelve operaciones, metadatos y resumen impositivo juntos.
+
+        Si el procesador tiene caché, un PDF ya visto (mismos bytes y misma
+        VERSION_PARSER y mismo modo de extracción) se recupera sin volver a
+        abrirlo con pdfplumber. Para resúmenes muy largos, `procesos_por_paginas` reparte las páginas
+        entre procesos (ver `_extraer_filas_y_textos`).
+        """
+        with instrumentacion.medir("ingesta", archivos=1) as tramo:
+            datos_pdf = CalculosAuxiliares.leer_bytes_pdf(ruta_archivo_pdf)
+            hash_pdf, resumen = self._buscar_en_cache(datos_pdf)
 
-    def extraer_operaciones_del_pdf(self, ruta_archivo_pdf):
-        """Extrae y normaliza las operaciones de un PDF de resumen."""
-        lista_filas_extraidas = []
-        
-        with pdfplumber.open(ruta_archivo_pdf) as documento_pdf:
-            for pagina_actual in documento_pdf.pages:
-                tablas_extraidas = pagina_actual.extract_tables() or []
-                
-                for tabla_actual in tablas_extraidas:
-                    for fila_actual in tabla_actual or []:
-                        if fila_actual and re.match(r"\d{2}/\d{2}/\d{4}", str(fila_actual[0])):
-                            lista_filas_extraidas.append(fila_actual)
-
-        columnas_esperadas = [
-            "fecha", "terminal-lote", "presentacion", "cupon", "plan", "importe",
-            "arancel_pct", "arancel_valor", "interes_pct", "interes_valor",
-            "bonificacion_pct", "bonificacion_valor", "tipo_operacion"
+            if resumen is None:
+                resumen = self._parsear_resumen(datos_pdf, procesos_por_paginas=procesos_por_paginas)
+                self._guardar_en_cache(hash_pdf, resumen)
+
+            resumen.nombre = CalculosAuxiliares.nombre_de_origen(ruta_archivo_pdf)
+            self._activar_resumen(resumen)
+            tramo.contar(**self._contadores_de_ingesta(resumen))
+        return resumen
+
+    @staticmethod
+    def _contadores_de_ingesta(resumen):
+        """Filas, páginas y aciertos de caché de un resumen, para los tramos de "ingesta"."""
+        return {
+            "filas": len(resumen.operaciones),
+            "paginas": (resumen.extraccion or {}).get("paginas", 0) if not resumen.desde_cache else 0,
+            "desde_cache": int(resumen.desde_cache),
+        }
+
+    def cargar_resumenes_lote(self, origenes, max_procesos=None):
+        """Procesa varios PDFs repartiendo el parseo en un pool de procesos.
+
+        Acepta rutas, bytes o archivos subidos. Devuelve un ResumenProcesado por
+        origen, en el mismo orden; si un archivo falla, su resumen trae `error`
+        y el resto del lote sigue igual.
+        """
+        with instrumentacion.medir("ingesta.lote", archivos=len(origenes)) as tramo:
+            resultados = self._cargar_resumenes_lote(origenes, max_procesos)
+            for resumen in resultados:
+                if resumen.error is None:
+                    tramo.contar(**self._contadores_de_ingesta(resumen))
+                else:
+                    tramo.contar(errores=1)
+        return resultados
+
+    def _cargar_resumenes_lote(self, origenes, max_procesos):
+        resultados = [None] * len(origenes)
+        pendientes = {}  # índice -> (bytes del PDF, hash)
+
+        for indice, origen in enumerate(origenes):
+            nombre = CalculosAuxiliares.nombre_de_origen(origen)
+            try:
+                datos_pdf = CalculosAuxiliares.leer_bytes_pdf(origen)
+                hash_pdf, resumen = self._buscar_en_cache(datos_pdf)
+            except Exception as e:
+                resultados[indice] = ResumenProcesado.con_error(nombre, e)
+                continue
+
+            if resumen is None:
+                pendientes[indice] = (datos_pdf, hash_pdf)
+            else:
+                resumen.nombre = nombre
+                resultados[indice] = resumen
+
+        max_procesos = max(1, int(max_procesos or os.cpu_count() or 1))
+        pool = futuros = None
+        if len(pendientes) > 1 and max_procesos > 1:
+            pool = _obtener_pool_procesos(max_procesos)
+            futuros = {
+                indice: pool.submit(
+                    instrumentacion.con_tiempos,
+                    _parsear_resumen_en_worker, datos_pdf, self.modo_extraccion, self.plantillas_tabla,
+                )
+                for indice, (datos_pdf, _) in pendientes.items()
+            }
+
+        for indice, (datos_pdf, hash_pdf) in pendientes.items():
+            nombre = CalculosAuxiliares.nombre_de_origen(origenes[indice])
+            try:
+                if futuros is None:
+                    resumen = self._parsear_resumen(datos_pdf)
+                else:
+                    resumen, tiempos = futuros[indice].result()
+                    instrumentacion.registro().fusionar(tiempos)
+                    self.plantillas_tabla.update(resumen.plantillas_tabla)
+                self._guardar_en_cache(hash_pdf, resumen)
+            except BrokenProcessPool as e:
+                _descartar_pool_procesos(pool)
+                resumen = ResumenProcesado.con_error(nombre, e)
+            except Exception as e:
+                resumen = ResumenProcesado.con_error(nombre, e)
+
+            resumen.nombre = nombre
+            resultados[indice] = resumen
+
+        correctos = [r for r in resultados if r.error is None]
+        if correctos:
+            self._activar_resumen(correctos[-1])
+        return resultados
+
+    def guardar_en_historial(self, resumenes):
+        """Agrega al historial las operaciones de los resúmenes sin error. Devuelve los ids guardados."""
+        if self.historial is None:
+            raise ValueError("El procesador no tiene historial configurado")
+
+        identificadores = []
+        for resumen in resumenes:
+            if resumen.error is None:
+                self.historial.agregar_resumen(resumen)
+                identificadores.append(self.historial.identificador_resumen(resumen))
+        return identificadores
+
+    def cargar_desde_historial(self, resumenes=None, desde=None, hasta=None, columnas=None):
+        """Lee operaciones guardadas (por resumen y rango de meses aaaa-mm) sin re-parsear PDFs.
+
+        Sin `columnas` se leen todas y quedan como operaciones activas; con
+        `columnas` solo se devuelve esa proyección, sin tocar el procesador.
+        """
+        if self.historial is None:
+            raise ValueError("El procesador no tiene historial configurado")
+
+        dataframe = self.historial.leer(columnas=columnas, resumenes=resumenes, desde=desde, hasta=hasta)
+        if columnas is None:
+            self.dataframe_operaciones = dataframe
+            return self.dataframe_operaciones
+        return dataframe
+
+    def _buscar_en_cache(self, datos_pdf):
+        """Devuelve (hash, resumen) donde resumen es None si no hay caché o no está guardado."""
+        hash_pdf = hashlib.sha256(datos_pdf).hexdigest()
+        if self.cache is None:
+            return hash_pdf, None
+
+        resumen = self.cache.obtener(self.cache.calcular_clave(hash_pdf, self._version_para_cache()))
+        if resumen is not None:
+            resumen.desde_cache = True
+        return hash_pdf, resumen
+
+    def _guardar_en_cache(self, hash_pdf, resumen):
+        resumen.hash_contenido = hash_pdf
+        if self.cache is not None:
+            self.cache.guardar(self.cache.calcular_clave(hash_pdf, self._version_para_cache()), resumen)
+
+    def _version_para_cache(self):
+        """Versión del parser para la clave de caché; cada modo de extracción guarda sus propias entradas."""
+        if self.modo_extraccion == MODO_EXTRACCION_POR_DEFECTO:
+            return VERSION_PARSER
+        return f"{VERSION_PARSER}-{self.modo_extraccion}"
+
+    def _parsear_resumen(self, datos_pdf, procesos_por_paginas=None):
+        """Recorre las páginas una sola vez juntando filas de tablas y texto."""
+        lista_filas_extraidas, textos_paginas, metodos_paginas, plantillas = self._extraer_filas_y_textos(
+            datos_pdf, procesos_por_paginas=procesos_por_paginas
+        )
+        self.plantillas_tabla.update(plantillas)
+        texto_paginas = "\n".join(textos_paginas)
+        with instrumentacion.medir("metadatos", caracteres=len(texto_paginas)):
+            anclas = ExtractorMetadatos.anclas(texto_paginas)  # un solo recorrido para ambos
+            metadatos = self._metadatos_desde_texto(texto_paginas, anclas)
+            resumen_impositivo = self.impuestos_retenciones_contribuciones(texto_paginas, anclas)
+
+        with instrumentacion.medir("operaciones", filas=len(lista_filas_extraidas)):
+            operaciones = self._construir_dataframe_operaciones(lista_filas_extraidas)
+
+        resumen = ResumenProcesado(operaciones, metadatos, resumen_impositivo)
+        resumen.extraccion = {
+            "modo": self.modo_extraccion,
+            "paginas": len(metodos_paginas),
+            "paginas_texto": metodos_paginas.count("texto"),
+            "paginas_plantilla": metodos_paginas.count("plantilla"),
+            "paginas_tablas": metodos_paginas.count("tablas"),
+            "paginas_omitidas": metodos_paginas.count("omitida"),
+        }
+        resumen.plantillas_tabla = plantillas
+        return resumen
+
+    def _extraer_filas_y_textos(self, datos_pdf, procesos_por_paginas=None, con_texto=True):
+        """Extrae filas y textos de todo el PDF, opcionalmente repartiendo las páginas entre procesos.
+
+        Cada proceso abre el PDF por su cuenta y procesa un rango contiguo de
+        páginas; los rangos se concatenan en orden, por lo que el resultado es
+        idéntico al recorrido secuencial.
+        """
+        if not procesos_por_paginas or procesos_por_paginas <= 1:
+            return _extraer_paginas(datos_pdf, None, con_texto, self.modo_extraccion, self.plantillas_tabla)
+
+        with pdfplumber.open(io.BytesIO(datos_pdf)) as documento_pdf:
+            total_paginas = len(documento_pdf.pages)
+
+        rangos = _dividir_paginas(total_paginas, procesos_por_paginas)
+        if len(rangos) <= 1:
+            return _extraer_paginas(datos_pdf, None, con_texto, self.modo_extraccion, self.plantillas_tabla)
+
+        pool = _obtener_pool_procesos(procesos_por_paginas)
+        futuros = [
+            pool.submit(
+                instrumentacion.con_tiempos,
+                _extraer_paginas, datos_pdf, rango, con_texto, self.modo_extraccion, self.plantillas_tabla,
+            )
+            for rango in rangos
         ]
 
+        lista_filas_extraidas = []
+        textos_paginas = []
+        metodos_paginas = []
+        plantillas = {}
+        for futuro in futuros:
+            try:
+                (filas_rango, textos_rango, metodos_rango, plantillas_rango), tiempos = futuro.result()
+            except BrokenProcessPool:
+                _descartar_pool_procesos(pool)
+                raise
+            instrumentacion.registro().fusionar(tiempos)
+            lista_filas_extraidas.extend(filas_rango)
+            textos_paginas.extend(textos_rango)
+            metodos_paginas.extend(metodos_rango)
+            plantillas.update(plantillas_rango)
+
+        return lista_filas_extraidas, textos_paginas, metodos_paginas, plantillas
+
+    def _activar_resumen(self, resumen):
+        """Fija el resumen como datos activos del procesador (igual que las extracciones sueltas)."""
+        self.dataframe_operaciones = resumen.operaciones
+        self.diccionario_metadatos = resumen.metadatos
+        self.resumen_impositivo = resumen.resumen_impositivo
+
+    def iterar_operaciones_del_pdf(self, ruta_archivo_pdf, filas_por_bloque=None, procesos_por_paginas=None):
+        """Genera las operaciones de un PDF en bloques chicos ya normalizados, página por página.
+
+        Cada bloque es un DataFrame con `COLUMNAS_OPERACIONES` y el esquema de
+        `EsquemaOperaciones`; las páginas sin operaciones no generan bloques. Con
+        `filas_por_bloque` se juntan páginas hasta llegar a esa cantidad de filas.
+        Sirve para volcar un resumen grande a un agregado, un almacén o un writer
+        sin tener el documento entero en memoria. No modifica el procesador.
+
+        Con `procesos_por_paginas` > 1 los rangos de páginas se procesan en
+        paralelo y se devuelven en orden (un bloque por rango como mínimo).
+        """
+        datos_pdf = CalculosAuxiliares.leer_bytes_pdf(ruta_archivo_pdf)
+        cantidad_columnas = None  # la primera fila define el ancho, como en la lectura completa
+        pendientes = []
+
+        for filas_pagina in self._iterar_filas_por_pagina(datos_pdf, procesos_por_paginas):
+            if not filas_pagina:
+                continue
+            if cantidad_columnas is None:
+                cantidad_columnas = len(filas_pagina[0])
+            pendientes.extend(filas_pagina)
+            if not filas_por_bloque or len(pendientes) >= filas_por_bloque:
+                yield self._construir_dataframe_operaciones(pendientes, cantidad_columnas)
+                pendientes = []
+
+        if pendientes:
+            yield self._construir_dataframe_operaciones(pendientes, cantidad_columnas)
+
+    def _iterar_filas_por_pagina(self, datos_pdf, procesos_por_paginas=None):
+        """Filas crudas de operaciones por página (o por rango de páginas en modo paralelo)."""
+        if procesos_por_paginas and procesos_por_paginas > 1:
+            with pdfplumber.open(io.BytesIO(datos_pdf)) as documento_pdf:
+                total_paginas = len(documento_pdf.pages)
+            rangos = _dividir_paginas(total_paginas, procesos_por_paginas)
+            if len(rangos) > 1:
+                pool = _obtener_pool_procesos(procesos_por_paginas)
+                futuros = [
+                    pool.submit(
+                        instrumentacion.con_tiempos,
+                        _extraer_paginas, datos_pdf, rango, False, self.modo_extraccion, self.plantillas_tabla,
+                    )
+                    for rango in rangos
+                ]
+                for futuro in futuros:
+                    try:
+                        resultado, tiempos = futuro.result()
+                    except BrokenProcessPool:
+                        _descartar_pool_procesos(pool)
+                        raise
+                    instrumentacion.registro().fusionar(tiempos)
+                    yield resultado[0]
+                return
+
+        lector_tablas = LectorTablas(self.plantillas_tabla)
+        for filas_pagina, _, _ in _iterar_paginas(datos_pdf, None, False, self.modo_extraccion, lector_tablas):
+            yield filas_pagina
+
+    def extraer_operaciones_del_pdf(self, ruta_archivo_pdf, procesos_por_paginas=None):
+        """Extrae y normaliza las operaciones de un PDF de resumen.
+
+        Consume `iterar_operaciones_del_pdf` y junta los bloques. Con
+        `procesos_por_paginas` > 1 (opcional) las páginas se reparten entre
+        procesos; el resultado es el mismo que el del recorrido secuencial.
+        """
+        bloques = list(self.iterar_operaciones_del_pdf(
+            ruta_archivo_pdf, procesos_por_paginas=procesos_por_paginas
+        ))
+
+        # El setter vuelve a armar las categorías si difieren entre bloques
+        self.dataframe_operaciones = (
+            pd.concat(bloques, ignore_index=True) if bloques
+            else self._construir_dataframe_operaciones([])
+        )
+        return self.dataframe_operaciones
+
+    @staticmethod
+    def _puede_tener_operaciones(pagina_actual):
+        """Chequeo barato: ¿la página puede tener filas de operaciones?
+
+        Una fila de operaciones necesita una grilla (líneas horizontales y
+        verticales) y una fecha dd/mm/aaaa. Las portadas, los resúmenes
+        impositivos y el texto legal no tienen alguna de las dos, así que se
+        descartan sin detectar tablas ni armar palabras. Los caracteres ya están
+        parseados (hacen falta igual para el texto de la página). Se buscan
+        primero en el orden del contenido. Si hay barras y no aparece la fecha,
+        se busca de nuevo en orden de lectura antes de descartar la página.
+        """
+        orientaciones = {borde["orientation"] for borde in pagina_actual.edges}
+        if not {"h", "v"} <= orientaciones:
+            return False
+
+        caracteres = pagina_actual.chars
+        texto = "".join(caracter["text"] for caracter in caracteres)
+        if ProcesadorLogico.PATRON_FECHA_FILA.search(texto):
+            return True
+        if "/" not in texto:
+            return False
+        en_orden = sorted(caracteres, key=lambda c: (round(c["top"]), c["x0"]))
+        return bool(ProcesadorLogico.PATRON_FECHA_FILA.search("".join(c["text"] for c in en_orden)))
+
+    @staticmethod
+    def _filas_de_pagina(pagina_actual, modo_extraccion=MODO_EXTRACCION_POR_DEFECTO, lector_tablas=None):
+        """Filas de operaciones de una página y el método con que se leyeron.
+
+        El método es "omitida" (descartada por `_puede_tener_operaciones`),
+        "texto", "plantilla" o "tablas".
+        """
+        if not ProcesadorLogico._puede_tener_operaciones(pagina_actual):
+            return [], "omitida"
+        if modo_extraccion == "texto":
+            filas_pagina = ProcesadorLogico._filas_de_operaciones_por_texto(pagina_actual)
+            if filas_pagina is not None:
+                return filas_pagina, "texto"
+        if lector_tablas is not None:
+            return lector_tablas.filas(pagina_actual)
+        return ProcesadorLogico._filas_de_operaciones(pagina_actual), "tablas"
+
+    @staticmethod
+    def _filas_de_operaciones(pagina_actual):
+        """Devuelve las filas de tablas de la página que comienzan con una fecha dd/mm/aaaa."""
+        filas_pagina = []
+        tablas_extraidas = pagina_actual.extract_tables() or []
+
+        for tabla_actual in tablas_extraidas:
+            for fila_actual in tabla_actual or []:
+                if fila_actual and re.match(r"\d{2}/\d{2}/\d{4}", str(fila_actual[0])):
+                    filas_pagina.append(fila_actual)
+
+        return filas_pagina
+
+    @staticmethod
+    def _filas_de_operaciones_por_texto(pagina_actual):
+        """Lee las filas de operaciones desde la capa de texto, sin extract_tables().
+
+        Los límites de columna salen de las líneas verticales de la grilla y los
+        de fila de las horizontales; cada palabra va a la celda que contiene su
+        centro. Devuelve None si la página no pasa la validación, para que se
+        lea con `_filas_de_operaciones`:
+
+        - la grilla tiene que tener exactamente `len(COLUMNAS_OPERACIONES)` columnas;
+        - ninguna palabra puede cruzar un límite de columna ni haber celdas de
+          más de un renglón;
+        - la fecha tiene que estar completa y las celdas numéricas tener forma
+          de número;
+        - la cantidad de filas tiene que coincidir con la cantidad de renglones
+          de la página que empiezan con una fecha.
+        """
+        tolerancia = ProcesadorLogico.TOLERANCIA_GRILLA
+        bordes_x = _agrupar_coordenadas(
+            (borde["x0"] for borde in pagina_actual.edges if borde["orientation"] == "v"), tolerancia
+        )
+        bordes_y = _agrupar_coordenadas(
+            (borde["top"] for borde in pagina_actual.edges if borde["orientation"] == "h"), tolerancia
+        )
+        if len(bordes_x) != len(COLUMNAS_OPERACIONES) + 1 or len(bordes_y) < 2:
+            return None
+
+        palabras = sorted(pagina_actual.extract_words(), key=lambda p: (p["top"], p["x0"]))
+        celdas = {}  # (fila, columna) -> [(x0, top, texto)]
+        renglones_con_fecha = 0
+        top_renglon = None
+
+        for palabra in palabras:
+            x0, x1, top, bottom = palabra["x0"], palabra["x1"], palabra["top"], palabra["bottom"]
+            if top_renglon is None or top - top_renglon > tolerancia:
+                # Primera palabra de un renglón nuevo de la página
+                top_renglon = top
+                renglones_con_fecha += bool(ProcesadorLogico.PATRON_FECHA_FILA.match(palabra["text"]))
+
+            fila = bisect.bisect_right(bordes_y, (top + bottom) / 2) - 1
+            columna = bisect.bisect_right(bordes_x, (x0 + x1) / 2) - 1
+            if not (0 <= fila < len(bordes_y) - 1 and 0 <= columna < len(COLUMNAS_OPERACIONES)):
+                continue  # fuera de la grilla (encabezados, totales, textos sueltos)
+            if x0 < bordes_x[columna] - tolerancia or x1 > bordes_x[columna + 1] + tolerancia:
+                return None
+            celdas.setdefault((fila, columna), []).append((x0, top, palabra["text"]))
+
+        filas_pagina = []
+        for fila in range(len(bordes_y) - 1):
+            fila_actual = []
+            tops = set()
+            for columna in range(len(COLUMNAS_OPERACIONES)):
+                palabras_celda = sorted(celdas.get((fila, columna), ()))
+                tops.update(round(top) for _, top, _ in palabras_celda)
+                fila_actual.append(" ".join(texto for _, _, texto in palabras_celda))
+
+            if not ProcesadorLogico.PATRON_FECHA_FILA.match(fila_actual[0]):
+                continue
+            if max(tops) - min(tops) > tolerancia:
+                return None  # celda de más de un renglón: extract_tables la arma distinto
+            if not ProcesadorLogico.PATRON_FECHA_FILA.fullmatch(fila_actual[0]):
+                return None
+            for columna, valor in zip(COLUMNAS_OPERACIONES, fila_actual):
+                if columna in COLUMNAS_NUMERICAS and valor and not ProcesadorLogico.PATRON_CELDA_NUMERICA.fullmatch(valor):
+                    return None
+            filas_pagina.append(fila_actual)
+
+        # Total de la página: cada renglón que empieza con una fecha tiene que ser una fila
+        if renglones_con_fecha != len(filas_pagina):
+            return None
+        return filas_pagina
+
+    @staticmethod
+    def _construir_dataframe_operaciones(lista_filas_extraidas, cantidad_columnas=None):
+        """Arma el DataFrame normalizado de operaciones a partir de las filas crudas.
+
+        `cantidad_columnas` fija el ancho de la tabla (por defecto, el de la primera fila).
+        """
+        columnas_esperadas = COLUMNAS_OPERACIONES
+
         if not lista_filas_extraidas:
-            self.dataframe_operaciones = pd.DataFrame(columns=columnas_esperadas)
-            return self.dataframe_operaciones
+            return EsquemaOperaciones.aplicar(pd.DataFrame(columns=columnas_esperadas))
 
         dataframe_crudo = pd.DataFrame(
             lista_filas_extraidas,
-            columns=columnas_esperadas[:len(lista_filas_extraidas[0])]
+            columns=columnas_esperadas[:cantidad_columnas or len(lista_filas_extraidas[0])]
         )
 
-        for columna_numerica in [
-            "importe", "arancel_pct", "arancel_valor", "interes_pct",
-            "interes_valor", "bonificacion_pct", "bonificacion_valor"
-        ]:
-            if columna_numerica in dataframe_crudo.columns:
-                dataframe_crudo[columna_numerica] = dataframe_crudo[columna_numerica].apply(
-                    CalculosAuxiliares.convertir_a_numero
-                )
-
         for columna_requerida in columnas_esperadas:
             if columna_requerida not in dataframe_crudo.columns:
                 valor_por_defecto = (
@@ -152,295 +1762,118 @@ class ProcesadorLogico:
                 )
                 dataframe_crudo[columna_requerida] = valor_por_defecto
 
-        self.dataframe_operaciones = dataframe_crudo[columnas_esperadas]
         if "terminal_lote" in dataframe_crudo.columns:
             dataframe_crudo.rename(columns={"terminal_lote": "terminal-lote"}, inplace=True)
 
-        return self.dataframe_operaciones
+        # Centavos, puntos básicos, categorías y fechas reales
+        return EsquemaOperaciones.aplicar(dataframe_crudo[columnas_esperadas])
 
     def extraer_metadatos_del_pdf(self, ruta_archivo_pdf):
         """Extrae metadatos clave del documento PDF con patrones específicos para Tarjeta Naranja."""
-        metadatos = {
-            "tipo_numero": "",   # 🔹 Nuevo campo
-            "fecha_emision": "",
-            "fecha_pago": "",
-            "forma_pago": ""
-        }
-
-
-        # Patrones optimizados para este formato específico de resumen
-        patrones = {
-            "fecha_emision": [
-                r"Fecha\s*de\s*Emisi[oó]n\s*:\s*(\d{2}/\d{2}/\d{4})",
-                r"Tipo\s*y\s*N[º°]\s*:\s*.*?\n.*?Fecha\s*de\s*Emisi[oó]n\s*:\s*(\d{2}/\d{2}/\d{4})",
-                r"Hoja\s*N[º°]\s*:\s*\d+\nFecha\s*de\s*Emisi[oó]n\s*:\s*(\d{2}/\d{2}/\d{4})"
-            ],
-            "tipo_numero": [
-                r"Tipo\s*y\s*N[º°]\s*:\s*(\S.*?)(?:\n|$)"
-            ]
-        }
-
-
         texto_paginas = ""   # 🔹 Inicialización
         with pdfplumber.open(ruta_archivo_pdf) as pdf:
             # ✅ leer todas las páginas
             texto_paginas = "\n".join((p.extract_text() or "") for p in pdf.pages)
 
-        texto_normalizado = re.sub(r'\s+', ' ', texto_paginas).strip()
-
-        # ---------------------------------------------------
-        # 🔹 Fecha de Emisión
-        # ---------------------------------------------------
-        for patron in patrones["fecha_emision"]:
-            match = re.search(patron, texto_normalizado, re.IGNORECASE)
-            if match:
-                metadatos["fecha_emision"] = next((g for g in match.groups() if g), "")
-                break
-        # Tipo y Nº
-        for patron in patrones["tipo_numero"]:
-            match = re.search(patron, texto_paginas, re.IGNORECASE)
-            if match:
-                metadatos["tipo_numero"] = match.group(1).strip()
-                break
-
-
-        # ---------------------------------------------------
-        # 🔹 Forma y Fecha de Pago (con soporte a varios métodos)
-        # ---------------------------------------------------
-        metodos_pago = ["Echeq", "Transferencia", "Dep[oó]sito", "Nota de Cr[eé]dito"]
-
-        # Construir patrón dinámico
-        patron_metodo_pago = (
-            r"(" + "|".join(metodos_pago) + r")"
-            r"(?:\s*a\s*la\s*Orden)?(?:\s*Pago\s*Diferido)?"
-            r"\s*Fecha\s*:\s*(\d{2}/\d{2}/\d{4})"
-        )
-
-        match = re.search(patron_metodo_pago, texto_paginas, re.IGNORECASE)
-        if match:
-            metadatos["forma_pago"] = match.group(1).strip()
-            metadatos["fecha_pago"] = match.group(2).strip()
-
-        # ---------------------------------------------------
-        # 🔹 Fallback si no se encontró con el patrón dinámico
-        # ---------------------------------------------------
-        if not metadatos["fecha_pago"]:
-            posibles_fechas = [
-                r"Fecha\s*de\s*Pago\s*:\s*(\d{2}/\d{2}/\d{4})",
-                r"Detalle\s*de\s*Cupones\s*Liquidados.*?Fecha\s*de\s*Pago\s*:\s*(\d{2}/\d{2}/\d{4})",
-                r"Echeq\s*a\s*la\s*Orden\s*Pago\s*Diferido\s*Fecha\s*:\s*(\d{2}/\d{2}/\d{4})"
-            ]
-            for patron in posibles_fechas:
-                match = re.search(patron, texto_paginas, re.IGNORECASE)
-                if match:
-                    metadatos["fecha_pago"] = next((g for g in match.groups() if g), "")
-                    break
-
-        if not metadatos["forma_pago"]:
-            posibles_formas = [
-                r"A\s*Pagar\s*\n.*?\n.*?\n.*?\n(.*?)\n",
-                r"Echeq\s*a\s*la\s*Orden\s*(Pago\s*Diferido)",
-                r"Forma\s*de\s*Pago\s*:\s*(.*?)(?:\n|$)"
-            ]
-            for patron in posibles_formas:
-                match = re.search(patron, texto_paginas, re.IGNORECASE)
-                if match:
-                    forma_pago = next((g for g in match.groups() if g), "")
-                    forma_pago = forma_pago.strip()
-                    forma_pago = re.sub(r'^\W+|\W+$', '', forma_pago)
-                    forma_pago = ' '.join(forma_pago.split())
-                    if forma_pago:
-                        metadatos["forma_pago"] = forma_pago
-                        break
-
-        # ---------------------------------------------------
-        # 🔹 Validación final de fechas
-        # ---------------------------------------------------
-        for campo in ["fecha_emision", "fecha_pago"]:
-            if metadatos[campo] and not re.match(r"\d{2}/\d{2}/\d{4}", metadatos[campo]):
-                metadatos[campo] = ""
-
         # ---------------------------------------------------
         # 🔹 Guardar resultados
         # ---------------------------------------------------
-        self.diccionario_metadatos = metadatos
-        self.resumen_impositivo = self.impuestos_retenciones_contribuciones(texto_paginas)
-        return metadatos
-
-    def impuestos_retenciones_contribuciones(self, texto_completo: str):
+        anclas = ExtractorMetadatos.anclas(texto_paginas)
+        self.diccionario_metadatos = self._metadatos_desde_texto(texto_paginas, anclas)
+        self.resumen_impositivo = self.impuestos_retenciones_contribuciones(texto_paginas, anclas)
+        return self.diccionario_metadatos
 
-        flags = re.I | re.S
-        res = {
-            "detalles_facturacion": {},   # {concepto: "$ monto"}
-            "retenciones_impositivas": {},# {concepto: "$ monto"}
-            "neto_liquidado": None
-        }
-
-        # ---------- 1) Bloque "Detalles de facturación" ----------
-        pat_detalles = re.compile(
-            r"(?:Detalle|Detalles?)\s+de\s+facturaci[oó]n(.*?)"
-            r"(?:(?:Detalle\s+(?:de\s+)?)?Retenciones(?:\s+y\s+Percepciones)?\s+Impositivas?|"
-            r"Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar))",
-            flags
-        )
-        m = pat_detalles.search(texto_completo)
-        if m:
-            bloque = m.group(1)
-            for linea in bloque.splitlines():
-                ln = linea.strip()
-                if "$" in ln:
-                    partes = ln.split("$")
-                    concepto = partes[0].strip(" -")
-                    monto = partes[-1].strip()
-                    if concepto and monto:
-                        res["detalles_facturacion"][concepto] = monto
-
-        # ---------- 2) Bloque "Retenciones / Percepciones Impositivas" ----------
-        pat_ret = re.compile(
-            r"(?:Detalle\s+(?:de\s+)?)?Retenciones(?:\s+y\s+Percepciones)?\s+Impositivas?(.*?)"
-            r"(?:(?:Importe\s*\$\s*[\d\.,]+)|Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar))",
-            flags
-        )
-        m = pat_ret.search(texto_completo)
-        if m:
-            bloque = m.group(1)
-            for linea in bloque.splitlines():
-                ln = linea.strip()
-                if "$" in ln and "Retenciones Impositivas" not in ln:
-                    partes = ln.split("$")
-                    concepto = partes[0].strip(" -")
-                    monto = partes[-1].strip()
-                    if concepto and monto:
-                        res["retenciones_impositivas"][concepto] = monto
-
-        # ---------- 3) Neto Liquidado (con fallbacks robustos) ----------
-        # Caso habitual: el monto aparece después de "Neto ..."
-        m_neto = re.search(r"Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar).*?\$\s*([\d\.\,]+)", texto_completo, flags)
-        if not m_neto:
-            # Fallback 1: el renglón de pago (Echeq...) trae el mismo monto
-            m_neto = re.search(r"Echeq\s*a\s*la\s*Orden.*?\$\s*([\d\.\,]+)", texto_completo, flags)
-        if not m_neto:
-            # Fallback 2: tomar el último "Importe $ X" antes del bloque Neto
-            m_bloque = re.search(r"(Importe\s*\$\s*[\d\.\,]+\s*)+?\s*Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar)", texto_completo, flags)
-            if m_bloque:
-                import re as _re
-                candidatos = _re.findall(r"Importe\s*\$\s*([\d\.\,]+)", m_bloque.group(0))
-                if candidatos:
-                    res["neto_liquidado"] = candidatos[-1]
-        else:
-            res["neto_liquidado"] = m_neto.group(1)
+    @staticmethod
+    def _metadatos_desde_texto(texto_paginas, anclas=None):
+        """Aplica los patrones de metadatos de Tarjeta Naranja sobre el texto completo del PDF."""
+        return ExtractorMetadatos.metadatos(texto_paginas, anclas)
 
-        return res
+    def impuestos_retenciones_contribuciones(self, texto_completo: str, anclas=None):
+        """Detalles de facturación, retenciones impositivas y neto liquidado del texto del PDF."""
+        return ExtractorMetadatos.impuestos(texto_completo, anclas)
 
     def detectar_configuraciones_plan(self):
         """Identifica combinaciones únicas de planes y porcentajes aplicados."""
         if self.dataframe_operaciones is None or self.dataframe_operaciones.empty:
             return {}
 
-        dataframe_agrupado = self.dataframe_operaciones.groupby([
-            "plan", "arancel_pct", "interes_pct", "bonificacion_pct"
-        ]).size().reset_index()
-
-        diccionario_configuraciones = {}
-        
-        for _, fila_actual in dataframe_agrupado.iterrows():
-            plan_actual = str(fila_actual["plan"])
-            clave_unica = (
-                f"{plan_actual} ("
-                f"{fila_actual['arancel_pct']:.2f}/"
-                f"{fila_actual['interes_pct']:.2f}/"
-                f"{fila_actual['bonificacion_pct']:.2f})"
-            )
-            
-            diccionario_configuraciones[clave_unica] = {
-                "arancel": float(fila_actual["arancel_pct"]),
-                "interes": float(fila_actual["interes_pct"]),
-                "bonificacion": float(fila_actual["bonificacion_pct"])
-            }
+        with instrumentacion.medir("deteccion_planes", filas=len(self.dataframe_operaciones)) as tramo:
+            diccionario_configuraciones = dict(self.indice_variantes.porcentajes)
+            tramo.contar(variantes=len(diccionario_configuraciones))
 
         self.diccionario_porcentajes_originales = diccionario_configuraciones
         return diccionario_configuraciones
 
     def recalcular_con_porcentajes_ajustados(self, diccionario_porcentajes_nuevos):
-        """Recalcula los valores usando nuevos porcentajes configurados."""
+        """Recalcula los valores usando nuevos porcentajes configurados.
+
+        Versión columnar y en centavos: los porcentajes se llevan a enteros
+        (hasta `DECIMALES_PORCENTAJES` decimales) y el teórico se redondea al
+        centavo con aritmética entera, con los empates de medio centavo lejos
+        del cero; así la tolerancia de 0,01 es una comparación exacta
+        (diferencia <= 1 centavo) y el resultado es el del cálculo decimal exacto.
+        """
         if self.dataframe_operaciones is None:
             raise ValueError("No hay operaciones cargadas para recalcular")
 
-        self.diccionario_porcentajes_ajustados = diccionario_porcentajes_nuevos
-        dataframe_copia = self.dataframe_operaciones.copy()
-
-        # Crear columna identificadora de variante
-        dataframe_copia["variante_plan"] = dataframe_copia.apply(
-            lambda fila: (
-                f"{fila['plan']} ("
-                f"{fila['arancel_pct']:.2f}/"
-                f"{fila['interes_pct']:.2f}/"
-                f"{fila['bonificacion_pct']:.2f})"
-            ),
-            axis=1
-        )
-
-        lista_abonados_pdf = []
-        lista_diferencias = []
-        lista_estados = []
-
-        for _, fila_actual in dataframe_copia.iterrows():
-            variante_actual = fila_actual["variante_plan"]
-            porcentajes = diccionario_porcentajes_nuevos.get(variante_actual, {
-                "arancel": 0,
-                "interes": 0,
-                "bonificacion": 0
-            })
+        with instrumentacion.medir("recalculo", filas=len(self.dataframe_operaciones)) as tramo:
+            self.diccionario_porcentajes_ajustados = diccionario_porcentajes_nuevos
+            dataframe_copia = self.dataframe_operaciones.copy()
+
+            # Columna identificadora de variante (categórica, desde el índice precalculado)
+            indice = self.indice_variantes
+            dataframe_copia["variante_plan"] = indice.como_categoria()
+
+            # Porcentajes por fila: join del diccionario contra las variantes (faltantes = 0),
+            # llevados a enteros (porcentaje * 10^DECIMALES_PORCENTAJES)
+            porcentajes_por_variante = (
+                pd.DataFrame.from_dict(diccionario_porcentajes_nuevos, orient="index")
+                .reindex(index=indice.claves, columns=["arancel", "interes", "bonificacion"])
+                .fillna(0)
+                .astype(float)
+                .to_numpy()
+            )
+            escala = 10 ** self.DECIMALES_PORCENTAJES
+            escalados = porcentajes_por_variante * escala
+            enteros_por_variante = np.rint(escalados).astype(np.int64)
+            if not np.allclose(escalados, enteros_por_variante, rtol=0, atol=1e-6):
+                logger.warning(
+                    "Porcentajes con más de %d decimales: se redondean a %d para el recálculo",
+                    self.DECIMALES_PORCENTAJES, self.DECIMALES_PORCENTAJES,
+                )
+            arancel, interes, bonificacion = enteros_por_variante[indice.codigos].T
 
-            importe_operacion = CalculosAuxiliares.convertir_a_numero(fila_actual["importe"])
+            def columna_centavos(nombre):
+                if nombre not in dataframe_copia.columns:
+                    return np.zeros(len(dataframe_copia), dtype=np.int64)
+                return dataframe_copia[nombre].to_numpy(dtype=np.int64)
 
-            # Cálculo de valores según porcentajes
-            arancel_calculado = round(importe_operacion * porcentajes["arancel"] / 100, 2)
-            interes_calculado = round(importe_operacion * porcentajes["interes"] / 100, 2)
-            bonificacion_calculada = round(importe_operacion * porcentajes["bonificacion"] / 100, 2)
+            importe_operacion = columna_centavos("importe")
 
-            # Valor abonado según PDF
-            abonado_pdf = round(
+            # Valor abonado según PDF (centavos, exacto)
+            abonado_pdf = (
                 importe_operacion
-                - abs(CalculosAuxiliares.convertir_a_numero(fila_actual.get("arancel_valor", 0)))
-                - abs(CalculosAuxiliares.convertir_a_numero(fila_actual.get("interes_valor", 0)))
-                + abs(CalculosAuxiliares.convertir_a_numero(fila_actual.get("bonificacion_valor", 0))),
-                2
+                - np.abs(columna_centavos("arancel_valor"))
+                - np.abs(columna_centavos("interes_valor"))
+                + np.abs(columna_centavos("bonificacion_valor"))
             )
 
-            # Cálculo teórico según tipo de operación
-            if str(fila_actual.get("tipo_operacion", "")).upper().startswith("DEV"):
-                abonado_teorico = round(
-                    importe_operacion
-                    - (importe_operacion * porcentajes["arancel"] / 100)  # ← Arancel se resta (te lo devuelven)
-                    - (importe_operacion * porcentajes["interes"] / 100)   # ← Interés se resta (te lo devuelven)  
-                    + (importe_operacion * porcentajes["bonificacion"] / 100),  # ← Bonificación se suma (te la retienen)
-                    2
-                )
-            else:  # Operación de venta normal (VTA)
-                abonado_teorico = round(
-                    importe_operacion
-                    - (importe_operacion * porcentajes["arancel"] / 100)
-                    - (importe_operacion * porcentajes["interes"] / 100)
-                    + (importe_operacion * porcentajes["bonificacion"] / 100),
-                    2
-                )
+            # Cálculo teórico: DEV y VTA usan la misma fórmula (arancel e interés se
+            # restan, bonificación se suma): importe * (1 - a% - i% + b%), redondeado al centavo
+            escala_total = 100 * escala
+            factor = escala_total - arancel - interes + bonificacion
+            abonado_teorico = EsquemaOperaciones.dividir_redondeando(importe_operacion * factor, escala_total)
 
-            diferencia = round(abonado_pdf - abonado_teorico, 2)
-            diferencia_absoluta = abs(diferencia)
-            estado = "Correcta" if diferencia_absoluta <= 0.01 else "Incorrecta"
+            diferencia_absoluta = np.abs(abonado_pdf - abonado_teorico)
 
-            lista_abonados_pdf.append(abonado_pdf)
-            lista_diferencias.append(diferencia_absoluta)
-            lista_estados.append(estado)
+            # Añadir columnas calculadas (centavos)
+            dataframe_copia["importe_abonado"] = abonado_pdf
+            dataframe_copia["diferencia"] = diferencia_absoluta
+            es_correcta = diferencia_absoluta <= 1
+            dataframe_copia["estado"] = np.where(es_correcta, "Correcta", "Incorrecta").astype(object)
 
-        # Añadir columnas calculadas
-        dataframe_copia["importe_abonado"] = lista_abonados_pdf
-        dataframe_copia["diferencia"] = lista_diferencias
-        dataframe_copia["estado"] = lista_estados
-
-        self.dataframe_resultados = dataframe_copia
-        print(f"DEBUG: Recalculo completado. Filas: {len(self.dataframe_resultados)}")
+            self.dataframe_resultados = dataframe_copia
+            tramo.contar(incorrectas=int(len(es_correcta) - np.count_nonzero(es_correcta)))
         return dataframe_copia
 
     def generar_reporte_por_plan(self):
@@ -448,40 +1881,53 @@ class ProcesadorLogico:
         if self.dataframe_resultados is None:
             raise ValueError("Primero debe ejecutarse el recálculo")
 
-        reporte = {}
-        variantes_unicas = sorted(self.dataframe_resultados["variante_plan"].unique())
-
-        for variante_actual in variantes_unicas:
-            dataframe_filtrado = self.dataframe_resultados[
-                self.dataframe_resultados["variante_plan"] == variante_actual
-            ]
-            dataframe_errores = dataframe_filtrado[dataframe_filtrado["estado"] == "Incorrecta"]
-
-            if dataframe_errores.empty:
-                continue
-
-            total_operaciones = len(dataframe_filtrado)
-            operaciones_erroneas = len(dataframe_errores)
-            diferencia_total = dataframe_errores["diferencia"].sum()
-
-            porcentajes_originales = self.diccionario_porcentajes_originales.get(variante_actual, {})
-            porcentajes_ajustados = self.diccionario_porcentajes_ajustados.get(variante_actual, {})
-
-            reporte[variante_actual] = {
-                "total_operaciones": total_operaciones,
-                "operaciones_erroneas": operaciones_erroneas,
-                "diferencia_total": diferencia_total,
-                "porcentajes_originales": porcentajes_originales,
-                "porcentajes_ajustados": porcentajes_ajustados,
-                "detalle_errores": dataframe_errores
-            }
-
-            
+        with instrumentacion.medir("reporte_por_plan", filas=len(self.dataframe_resultados)) as tramo:
+            reporte = {}
+            claves, codigos = self._variantes_de_resultados()
+            cantidad_variantes = len(claves)
+
+            # Una sola pasada: totales, errores y diferencias por variante
+            es_error = (self.dataframe_resultados["estado"] == "Incorrecta").to_numpy()
+            codigos_error = codigos[es_error]
+            totales = np.bincount(codigos, minlength=cantidad_variantes)
+            errores = np.bincount(codigos_error, minlength=cantidad_variantes)
+            diferencias = np.zeros(cantidad_variantes, dtype=np.int64)
+            np.add.at(diferencias, codigos_error, self.dataframe_resultados["diferencia"].to_numpy()[es_error])
+
+            # Filas con error agrupadas por variante: una sola copia, solo de esas filas
+            orden, limites = IndiceVariantes.agrupar_posiciones(codigos_error, cantidad_variantes)
+            filas_error = self.dataframe_resultados.take(np.flatnonzero(es_error)[orden])
+
+            for codigo in np.flatnonzero(errores):
+                variante_actual = claves[codigo]
+                reporte[variante_actual] = EntradaReportePlan(
+                    {
+                        "total_operaciones": int(totales[codigo]),
+                        "operaciones_erroneas": int(errores[codigo]),
+                        "diferencia_total": diferencias[codigo] / 100,  # centavos -> pesos
+                        "porcentajes_originales": self.diccionario_porcentajes_originales.get(variante_actual, {}),
+                        "porcentajes_ajustados": self.diccionario_porcentajes_ajustados.get(variante_actual, {}),
+                    },
+                    filas_error.iloc[limites[codigo]:limites[codigo + 1]],
+                )
+            tramo.contar(variantes_con_error=len(reporte))
         return reporte
         
+    def _variantes_de_resultados(self):
+        """Devuelve (claves ordenadas, código por fila) de variante_plan en los resultados."""
+        variantes = self.dataframe_resultados["variante_plan"]
+        if isinstance(variantes.dtype, pd.CategoricalDtype) and variantes.cat.categories.is_monotonic_increasing:
+            return list(variantes.cat.categories), variantes.cat.codes.to_numpy(dtype=np.int64)
+
+        codigos, claves = pd.factorize(variantes, sort=True, use_na_sentinel=False)
+        return list(claves), codigos.astype(np.int64)
+
     def exportacion_de_informes(self, formatos_seleccionados, ruta_base=None):
         """
         Exporta los resultados a los formatos seleccionados por el usuario.
+
+        Cada formato se genera en memoria (ver exportar_en_memoria) y se
+        escribe una sola vez en `ruta_base` + extensión.
         """
         if self.dataframe_resultados is None:
             raise ValueError("No hay resultados para exportar")
@@ -489,55 +1935,119 @@ class ProcesadorLogico:
         # Esta función NO debe manejar diálogos de archivo
         # Solo debe recibir las rutas ya definidas
         rutas_exportadas = {}
-        
-        for formato in formatos_seleccionados:
-            if formato not in ['csv', 'excel', 'pdf']:
-                continue
-                
-            # Determinar la ruta de destino basada en ruta_base
-            if not ruta_base:
-                continue  # Si no hay ruta_base, no podemos exportar
-                
-            if formato == 'csv':
-                ruta_destino = f"{ruta_base}.csv"
-            elif formato == 'excel':
-                ruta_destino = f"{ruta_base}.xlsx"
-            elif formato == 'pdf':
-                ruta_destino = f"{ruta_base}.pdf"
-            
+        if not ruta_base:
+            self.errores_exportacion = {}
+            return rutas_exportadas  # Si no hay ruta_base, no podemos exportar
+
+        for formato, datos in self.exportar_en_memoria(formatos_seleccionados).items():
+            ruta_destino = f"{ruta_base}.{FORMATOS_EXPORTACION[formato][0]}"
             try:
-                if formato == 'pdf':
-                    ruta_grafico_temp = ruta_destino.replace('.pdf', '_grafico_temp.png')
-                    self.guardar_grafico_planes_temp(ruta_grafico_temp)
-                    self._exportar_pdf_interno(ruta_destino, ruta_grafico_temp)
-                    
-                    try:
-                        if os.path.exists(ruta_grafico_temp):
-                            os.remove(ruta_grafico_temp)
-                    except:
-                        pass
-                elif formato == 'csv':
-                    self._exportar_csv_interno(ruta_destino)
-                elif formato == 'excel':
-                    self._exportar_excel_interno(ruta_destino)
-                
+                with open(ruta_destino, "wb") as archivo:
+                    archivo.write(datos)
                 rutas_exportadas[formato] = ruta_destino
-                
-            except Exception as e:
-                print(f"Error exportando {formato.upper()}: {str(e)}")
+            except OSError as e:
+                logger.exception("Error exportando %s a %s", formato.upper(), ruta_destino)
+                self.errores_exportacion[formato] = f"{type(e).__name__}: {e}"
     
         return rutas_exportadas
 
+    @staticmethod
+    def _huella_de_dataframe(dataframe):
+        """SHA-256 del contenido de un DataFrame (columnas, tipos, índice y valores)."""
+        if dataframe is None:
+            return None
+        huella = hashlib.sha256(repr(list(dataframe.dtypes.items())).encode())
+        huella.update(pd.util.hash_pandas_object(dataframe, index=True).to_numpy().tobytes())
+        return huella.hexdigest()
+
+    def huella_exportacion(self, formato):
+        """Clave de caché de una exportación: cambia si cambia algo de lo que sale en el archivo.
+
+        Combina el formato con la huella de `dataframe_resultados` (calculada
+        una vez por cada asignación), los porcentajes ajustados y las opciones
+        del formato; el PDF suma metadatos, resumen impositivo y las
+        operaciones (el gráfico de planes sale de ahí).
+        """
+        if self._huella_resultados is None:
+            self._huella_resultados = self._huella_de_dataframe(self.dataframe_resultados)
+        partes = [formato, self._huella_resultados, self.diccionario_porcentajes_ajustados]
+        if formato == "excel":
+            partes.append(self.excel_hojas_por_variante)
+        elif formato == "pdf":
+            if self._huella_operaciones is None:
+                self._huella_operaciones = self._huella_de_dataframe(self.dataframe_operaciones)
+            partes += [self._huella_operaciones, self.diccionario_metadatos, self.resumen_impositivo]
+        return hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode()).hexdigest()
+
+    def exportacion_en_cache(self, formato):
+        """Bytes de `formato` si ya están en la caché de exportaciones (sin generarlos), o None."""
+        if self.cache_exportaciones is None or self.dataframe_resultados is None:
+            return None
+        return self.cache_exportaciones.obtener(self.huella_exportacion(formato))
+
+    def exportar_bytes(self, formato):
+        """Genera un formato de FORMATOS_EXPORTACION directo en memoria y devuelve sus bytes.
+
+        Con caché de exportaciones, si ya se generó con los mismos resultados,
+        porcentajes y opciones (ver huella_exportacion), se devuelve de ahí.
+        """
+        if formato not in FORMATOS_EXPORTACION:
+            raise ValueError(f"Formato de exportación desconocido: {formato!r} (válidos: {tuple(FORMATOS_EXPORTACION)})")
+        exportar = {"csv": self.exportar_csv_bytes, "excel": self.exportar_excel_bytes, "pdf": self.exportar_pdf_bytes}[formato]
+        if self.cache_exportaciones is None:
+            return exportar().getvalue()
+
+        inicio = time.perf_counter()
+        datos, generados = self.cache_exportaciones.obtener_o_generar(
+            self.huella_exportacion(formato), lambda: exportar().getvalue()
+        )
+        if not generados:
+            instrumentacion.registrar(f"exportar.{formato}.cache", time.perf_counter() - inicio, bytes=len(datos))
+        return datos
+
+    def exportar_en_memoria(self, formatos, max_hilos=None):
+        """Genera varios formatos a la vez, cada uno en su hilo; devuelve {formato: bytes}.
+
+        Los formatos son independientes entre sí y solo leen los resultados.
+        Por defecto hay un hilo por formato hasta la cantidad de CPUs (con una
+        sola, los hilos solo compiten por el GIL). Los que fallan no cortan al
+        resto: quedan fuera del diccionario y con su error en
+        `errores_exportacion`. Cada hilo corre con una copia del contexto, así
+        sus tramos van al registro de tiempos de quien llama.
+        """
+        if self.dataframe_resultados is None:
+            raise ValueError("No hay resultados para exportar")
+
+        formatos = [f for f in dict.fromkeys(formatos) if f in FORMATOS_EXPORTACION]
+        self.errores_exportacion = {}  # formato -> error (los formatos que fallan no cortan al resto)
+        if not formatos:
+            return {}
+
+        exportados = {}
+        with ThreadPoolExecutor(max_workers=max(1, int(max_hilos or min(len(formatos), os.cpu_count() or 1)))) as hilos:
+            futuros = {
+                formato: hilos.submit(contextvars.copy_context().run, self.exportar_bytes, formato)
+                for formato in formatos
+            }
+            for formato, futuro in futuros.items():
+                try:
+                    exportados[formato] = futuro.result()
+                except Exception as e:
+                    logger.exception("Error exportando %s", formato.upper())
+                    self.errores_exportacion[formato] = f"{type(e).__name__}: {e}"
+        return exportados
+
     def _exportar_csv_interno(self, ruta_destino):
         """Exporta los resultados a formato CSV (función interna)"""
-        print(f"DEBUG: Exportando CSV a {ruta_destino}")
-        
         if self.dataframe_resultados is None:
             raise ValueError("No hay resultados para exportar")
-        
-        # Crear copia para no modificar el original
-        df_export = self.dataframe_resultados.copy()
-        print(f"DEBUG: DataFrame a exportar - Filas: {len(df_export)}, Columnas: {len(df_export.columns)}")
+
+        self._escribir_csv(ruta_destino)
+
+    def _escribir_csv(self, destino):
+        """Escribe los resultados como CSV separado por ';' (ruta o buffer)."""
+        # Copia con montos y porcentajes en formato argentino (los resultados se guardan en centavos)
+        df_export = EsquemaOperaciones.vista_formateada(self.dataframe_resultados)
         
         # Asegurar nombre de columna correcto
         if 'terminal_lote' in df_export.columns:
@@ -553,34 +2063,136 @@ class ProcesadorLogico:
         
         # Filtrar columnas existentes
         columnas_existentes = [c for c in columnas_exportacion if c in df_export.columns]
-        print(f"DEBUG: Columnas a exportar: {columnas_existentes}")
-        
-        try:
-            # Exportar
-            df_export.to_csv(ruta_destino, sep=';', index=False, 
-                            columns=columnas_existentes, encoding='utf-8')
-            print(f"DEBUG: CSV exportado exitosamente a {ruta_destino}")
-            
-        except Exception as e:
-            print(f"ERROR exportando CSV: {str(e)}")
-            raise
+        logger.debug("Exportando CSV: %d filas, columnas %s", len(df_export), columnas_existentes)
+
+        df_export.to_csv(destino, sep=';', index=False,
+                         columns=columnas_existentes, encoding='utf-8')
 
     def _exportar_excel_interno(self, ruta_destino):
         """Exporta los resultados a formato Excel (función interna)"""
         if self.dataframe_resultados is None:
             raise ValueError("No hay resultados para exportar")
-        
-        df_export = self.dataframe_resultados.copy()
-        
-        if 'terminal_lote' in df_export.columns:
-            df_export.rename(columns={'terminal_lote': 'terminal-lote'}, inplace=True)
-        
-        df_export.to_excel(ruta_destino, index=False, engine='openpyxl')
 
-    def _exportar_pdf_interno(self, ruta_destino, ruta_imagen_grafico=None):
-        """Exporta los resultados a formato PDF con formato específico"""
+        self._escribir_excel(ruta_destino, self.excel_hojas_por_variante)
+
+    @classmethod
+    def _nombres_de_hojas(cls, variantes):
+        """Nombres de hoja válidos y distintos para cada variante ("6 (2.20-12.00-1.00)")."""
+        nombres, usados = [], {"resultados"}
+        for variante in variantes:
+            base = cls.PATRON_NOMBRE_HOJA_INVALIDO.sub("-", str(variante)).strip("'") or "Variante"
+            nombre, numero = base[:31], 1
+            while nombre.lower() in usados:
+                numero += 1
+                nombre = f"{base[:31 - len(str(numero)) - 1]}~{numero}"
+            usados.add(nombre.lower())
+            nombres.append(nombre)
+        return nombres
+
+    def _escribir_excel(self, destino, hojas_por_variante=False):
+        """Escribe los resultados en un .xlsx (ruta o buffer) sin armar el libro en memoria.
+
+        openpyxl en modo write_only va volcando cada hoja a un archivo
+        temporal a medida que se agregan filas; los resultados se pasan a
+        pesos de a `FILAS_POR_BLOQUE_EXCEL` filas, así nunca hay una copia
+        completa de `dataframe_resultados`. Con `hojas_por_variante`, cada
+        fila se escribe también en la hoja de su variante de plan (en la
+        misma pasada).
+        """
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        resultados = self.dataframe_resultados
+        libro = Workbook(write_only=True)
+        hoja_resultados = libro.create_sheet("Resultados")
+
+        hojas_variante, codigos = [], None
+        if hojas_por_variante:
+            claves, codigos = self._variantes_de_resultados()
+            hojas_variante = [libro.create_sheet(nombre) for nombre in self._nombres_de_hojas(claves)]
+
+        negrita = Font(bold=True)
+        for hoja in [hoja_resultados] + hojas_variante:
+            encabezado = []
+            for columna in resultados.columns:
+                # Mismo nombre de columna que el CSV (sin renombrar el DataFrame, que lo copiaría entero)
+                celda = WriteOnlyCell(hoja, value='terminal-lote' if columna == 'terminal_lote' else str(columna))
+                celda.font = negrita
+                encabezado.append(celda)
+            hoja.append(encabezado)
+
+        for inicio in range(0, len(resultados), self.FILAS_POR_BLOQUE_EXCEL):
+            bloque = EsquemaOperaciones.vista_en_pesos(resultados.iloc[inicio:inicio + self.FILAS_POR_BLOQUE_EXCEL])
+            # Columnas como listas de valores de Python (NaN -> celda vacía)
+            columnas = [serie.astype(object).where(serie.notna(), None).tolist() for _, serie in bloque.items()]
+            if hojas_variante:
+                codigos_bloque = codigos[inicio:inicio + self.FILAS_POR_BLOQUE_EXCEL].tolist()
+                for fila, codigo in zip(zip(*columnas), codigos_bloque):
+                    hoja_resultados.append(fila)
+                    hojas_variante[codigo].append(fila)
+            else:
+                for fila in zip(*columnas):
+                    hoja_resultados.append(fila)
+
+        libro.save(destino)
+
+    @staticmethod
+    def _textos_o_no_figura(serie, vacios_no_figuran=False):
+        """Columna como textos; los nulos (y con `vacios_no_figuran`, los vacíos) quedan "No figura"."""
+        textos = serie.astype(str)
+        presentes = serie.notna().to_numpy()
+        if vacios_no_figuran:
+            presentes &= (textos.str.strip() != "").to_numpy()
+        return np.where(presentes, textos.to_numpy(dtype=object), "No figura")
+
+    @classmethod
+    def _filas_pdf_de_errores(cls, errores, filas_por_bloque):
+        """Filas de texto de la tabla de errores del PDF, generadas de a bloques.
+
+        Cada bloque se pasa a pesos y se formatea columna por columna, así en
+        memoria hay a lo sumo un bloque de celdas formateadas (TablaPorSegmentos
+        las va consumiendo a medida que pagina).
+        """
+        moneda = functools.partial(CalculosAuxiliares.formatear_columna_moneda, prefijo="$")
+        porcentaje = functools.partial(CalculosAuxiliares.formatear_columna_porcentaje, cero_no_figura=True)
+        for inicio in range(0, len(errores), filas_por_bloque):
+            bloque = EsquemaOperaciones.vista_en_pesos(errores.iloc[inicio:inicio + filas_por_bloque])
+            terminal_lote = bloque['terminal-lote'] if 'terminal-lote' in bloque.columns else bloque['terminal_lote']
+            columnas = [
+                cls._textos_o_no_figura(bloque['fecha']),
+                cls._textos_o_no_figura(terminal_lote),
+                cls._textos_o_no_figura(bloque['presentacion'], vacios_no_figuran=True),
+                cls._textos_o_no_figura(bloque['cupon'], vacios_no_figuran=True),
+                cls._textos_o_no_figura(bloque['plan']),
+                moneda(bloque['importe']),
+                porcentaje(bloque['arancel_pct']),
+                moneda(bloque['arancel_valor'], cero_no_figura=True),
+                porcentaje(bloque['interes_pct']),
+                moneda(bloque['interes_valor'], cero_no_figura=True),
+                porcentaje(bloque['bonificacion_pct']),
+                moneda(bloque['bonificacion_valor'], cero_no_figura=True),
+                cls._textos_o_no_figura(bloque['tipo_operacion']),
+                moneda(bloque['importe_abonado']),
+                moneda(bloque['diferencia']),
+            ]
+            yield from map(list, zip(*columnas))
+
+    def _exportar_pdf_interno(self, ruta_destino):
+        """Exporta los resultados a formato PDF con formato específico
+
+        `ruta_destino` puede ser una ruta o un buffer. El gráfico de planes se
+        dibuja vectorial con reportlab.
+        """
         if self.dataframe_resultados is None:
             raise ValueError("No hay resultados para exportar")
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.lib.units import cm
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import SimpleDocTemplate, TableStyle, Paragraph, Spacer
+        from informe_pdf import TablaPorSegmentos, grafico_torta
+
     
         # Configuración del documento
         doc = SimpleDocTemplate(ruta_destino, pagesize=landscape(A4),
@@ -629,15 +2241,15 @@ class ProcesadorLogico:
             
             elements.append(Spacer(1, 16))
         
-        # Gráfico de planes si está disponible
-        if ruta_imagen_grafico and os.path.exists(ruta_imagen_grafico):
-            try:
-                elements.append(Paragraph("DISTRIBUCIÓN DE PLANES", styles['Heading2']))
-                img = RLImage(ruta_imagen_grafico, width=14*cm, height=8*cm)
-                elements.append(img)
-                elements.append(Spacer(1, 16))
-            except:
-                pass  # Si falla la imagen, continuar sin ella
+        # Gráfico de planes (solo ventas)
+        conteo = self.conteo_planes_ventas()
+        if conteo is not None:
+            elements.append(Paragraph("DISTRIBUCIÓN DE PLANES", styles['Heading2']))
+            elements.append(grafico_torta(
+                [(f"Plan {plan}", int(cantidad)) for plan, cantidad in conteo.items()],
+                "Distribución de Planes (Ventas)", 14*cm, 8*cm,
+            ))
+            elements.append(Spacer(1, 16))
         
         # Tabla de operaciones con errores - FORMATO COMPLETO
         errores = self.dataframe_resultados[self.dataframe_resultados['estado'] == 'Incorrecta']
@@ -653,47 +2265,6 @@ class ProcesadorLogico:
                 '% Bonificación', 'Bonificación', 'Operac.', 'Importe Abonado', 'Diferencia Adeudada'
             ]
             
-            datos = [columnas]  # Encabezados
-            
-            for _, fila in errores.iterrows():
-                # Obtener valores, usando "No figura" cuando no hay datos
-                fecha = str(fila['fecha']) if pd.notna(fila['fecha']) else 'No figura'
-                terminal_lote = str(fila.get('terminal-lote', fila.get('terminal_lote', 'No figura')))
-                presentacion = str(fila['presentacion']) if pd.notna(fila['presentacion']) and str(fila['presentacion']).strip() else 'No figura'
-                cupon = str(fila['cupon']) if pd.notna(fila['cupon']) and str(fila['cupon']).strip() else 'No figura'
-                plan = str(fila['plan']) if pd.notna(fila['plan']) else 'No figura'
-                
-                # Valores numéricos formateados
-                importe_valor = CalculosAuxiliares.formatear_moneda_pesos(fila['importe']) if pd.notna(fila['importe']) else 'No figura'
-                arancel_pct = f"{fila['arancel_pct']:.2f}%" if pd.notna(fila['arancel_pct']) and fila['arancel_pct'] != 0 else 'No figura'
-                arancel_valor = CalculosAuxiliares.formatear_moneda_pesos(fila['arancel_valor']) if pd.notna(fila['arancel_valor']) and fila['arancel_valor'] != 0 else 'No figura'
-                interes_pct = f"{fila['interes_pct']:.2f}%" if pd.notna(fila['interes_pct']) and fila['interes_pct'] != 0 else 'No figura'
-                interes_valor = CalculosAuxiliares.formatear_moneda_pesos(fila['interes_valor']) if pd.notna(fila['interes_valor']) and fila['interes_valor'] != 0 else 'No figura'
-                bonificacion_pct = f"{fila['bonificacion_pct']:.2f}%" if pd.notna(fila['bonificacion_pct']) and fila['bonificacion_pct'] != 0 else 'No figura'
-                bonificacion_valor = CalculosAuxiliares.formatear_moneda_pesos(fila['bonificacion_valor']) if pd.notna(fila['bonificacion_valor']) and fila['bonificacion_valor'] != 0 else 'No figura'
-                
-                tipo_operacion = str(fila['tipo_operacion']) if pd.notna(fila['tipo_operacion']) else 'No figura'
-                importe_abonado = CalculosAuxiliares.formatear_moneda_pesos(fila['importe_abonado']) if pd.notna(fila['importe_abonado']) else 'No figura'
-                diferencia = CalculosAuxiliares.formatear_moneda_pesos(fila['diferencia']) if pd.notna(fila['diferencia']) else 'No figura'
-                
-                datos.append([
-                    fecha,
-                    terminal_lote,
-                    presentacion,
-                    cupon,
-                    plan,
-                    f"${importe_valor}",
-                    arancel_pct,
-                    f"${arancel_valor}" if arancel_valor != 'No figura' else 'No figura',
-                    interes_pct,
-                    f"${interes_valor}" if interes_valor != 'No figura' else 'No figura',
-                    bonificacion_pct,
-                    f"${bonificacion_valor}" if bonificacion_valor != 'No figura' else 'No figura',
-                    tipo_operacion,
-                    f"${importe_abonado}",
-                    f"${diferencia}"
-                ])
-            
             # Crear tabla con anchos de columna específicos
             ancho_columnas = [
                 2.0*cm,  # Fecha
@@ -713,8 +2284,6 @@ class ProcesadorLogico:
                 2.0*cm,  # Diferencia Adeudada
             ]
             
-            tabla = Table(datos, colWidths=ancho_columnas, repeatRows=1)
-            
             # Estilo de la tabla
             estilo_tabla = TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FFA500')),
@@ -728,12 +2297,17 @@ class ProcesadorLogico:
                 ('WORDWRAP', (0, 0), (-1, -1), True),  # Permitir wrap de texto
             ])
             
-            tabla.setStyle(estilo_tabla)
-            
-            elements.append(tabla)
+            # Las filas se formatean y se paginan de a segmentos (memoria acotada con cualquier cantidad de errores)
+            elements.append(TablaPorSegmentos(
+                columnas,
+                self._filas_pdf_de_errores(errores, self.FILAS_POR_SEGMENTO_PDF),
+                ancho_columnas,
+                estilo_tabla,
+                self.FILAS_POR_SEGMENTO_PDF,
+            ))
             
             # Resumen total de diferencias
-            total_diferencia = errores['diferencia'].sum()
+            total_diferencia = EsquemaOperaciones.vista_en_pesos(errores[['diferencia']])['diferencia'].sum()
             elements.append(Spacer(1, 12))
             elements.append(Paragraph(
                 f"<b>TOTAL DIFERENCIA ADEUDADA: ${CalculosAuxiliares.formatear_moneda_pesos(total_diferencia)}</b>", 
@@ -752,55 +2326,47 @@ class ProcesadorLogico:
         # Generar PDF
         doc.build(elements, onFirstPage=add_footer, onLaterPages=add_footer)
 
-    def guardar_grafico_planes_temp(self, ruta_destino):
-        """Guarda un gráfico temporal de distribución de planes para usar en PDF"""
-        try:
-            df = self.dataframe_operaciones
-            if df is None or df.empty:
-                return
-            
-            ventas = df[df["tipo_operacion"].astype(str).str.upper() == "VTA"]
-            if ventas.empty:
-                return
-            
-            conteo = ventas["plan"].value_counts()
-            
-            plt.figure(figsize=(8, 6))
-            plt.pie(conteo.values.tolist(), labels=conteo.index.tolist(), autopct='%1.1f%%')
-            plt.title('Distribución de Planes (Ventas)')
-            plt.savefig(ruta_destino, bbox_inches='tight', dpi=100)
-            plt.close()
-            
-        except Exception as e:
-            print(f"Error al guardar gráfico temporal: {e}")
+    def conteo_planes_ventas(self):
+        """Cantidad de ventas por plan (de mayor a menor), o None si no hay ventas.
+
+        Se calcula una vez por cada asignación de `dataframe_operaciones`; de
+        acá sale el gráfico de planes del PDF.
+        """
+        df = self.dataframe_operaciones
+        if df is None or df.empty:
+            return None
+        if self._conteo_planes is None:
+            ventas = df["tipo_operacion"].astype(str).str.upper() == "VTA"
+            conteo = df.loc[ventas, "plan"].value_counts()
+            self._conteo_planes = conteo[conteo > 0]  # plan es categórico: fuera los planes sin ventas
+        return self._conteo_planes if not self._conteo_planes.empty else None
 
     def exportar_csv_bytes(self):
         if self.dataframe_resultados is None:
             raise ValueError("No hay resultados para exportar")
-        buffer = io.BytesIO()
-        self.dataframe_resultados.to_csv(buffer, sep=";", index=False, encoding="utf-8")
+        with instrumentacion.medir("exportar.csv", filas=len(self.dataframe_resultados)) as tramo:
+            buffer = io.BytesIO()
+            self._escribir_csv(buffer)
+            tramo.contar(bytes=buffer.tell())
         buffer.seek(0)
         return buffer
 
     def exportar_excel_bytes(self):
         if self.dataframe_resultados is None:
             raise ValueError("No hay resultados para exportar")
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-            self.dataframe_resultados.to_excel(writer, index=False)
+        with instrumentacion.medir("exportar.excel", filas=len(self.dataframe_resultados)) as tramo:
+            buffer = io.BytesIO()
+            self._escribir_excel(buffer, self.excel_hojas_por_variante)
+            tramo.contar(bytes=buffer.tell())
         buffer.seek(0)
         return buffer
 
     def exportar_pdf_bytes(self):
         if self.dataframe_resultados is None:
             raise ValueError("No hay resultados para exportar")
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=landscape(A4))
-        styles = getSampleStyleSheet()
-        elements = []
-        elements.append(Paragraph("ANÁLISIS DE LIQUIDACIÓN - TARJETA NARANJA", styles['Heading1']))
-        elements.append(Spacer(1, 12))
-        # (acá podés armar el mismo contenido que en tu _exportar_pdf_interno)
-        doc.build(elements)
+        with instrumentacion.medir("exportar.pdf", filas=len(self.dataframe_resultados)) as tramo:
+            buffer = io.BytesIO()
+            self._exportar_pdf_interno(buffer)
+            tramo.contar(bytes=buffer.tell())
         buffer.seek(0)
         return buffer
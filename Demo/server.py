@@ -11,6 +11,7 @@ Este módulo funciona en dos modos:
 ¿Cómo ejecutarlo?
 - **Streamlit**: `streamlit run server.py`
 - **CLI** (sin Streamlit): `python server.py --file ruta/al/archivo.ext --run`
+- **Lote de resúmenes**: `python server.py --lote a.pdf b.pdf ... [--procesos N] [--profile]`
 - **Tests**: `python server.py --test`
 """
 
@@ -24,13 +25,15 @@ from typing import Optional
 # ---------------------------------------------------------------
 # Carga segura de Streamlit (evita ModuleNotFoundError en sandbox)
 # ---------------------------------------------------------------
-try:  # Import condicional: no rompe si streamlit no está instalado
-    import importlib
-    st = importlib.import_module("streamlit")  # type: ignore
-    HAS_STREAMLIT = True
-except Exception:
-    st = None  # type: ignore
+# Solo se verifica que esté instalado; el import real (~0,3 s) se hace en
+# run_streamlit_app, así el modo CLI y los tests arrancan sin pagarlo.
+import importlib.util
+
+try:
+    HAS_STREAMLIT = importlib.util.find_spec("streamlit") is not None
+except (ImportError, ValueError):
     HAS_STREAMLIT = False
+st = None  # type: ignore  # se carga en run_streamlit_app
 
 
 # -----------------
@@ -81,7 +84,9 @@ def process_content(content_bytes: bytes, preview_len: int = DEFAULT_PREVIEW_LEN
 # -----------------
 
 def run_streamlit_app() -> None:
-    assert HAS_STREAMLIT and st is not None, "Streamlit no está disponible"
+    global st
+    assert HAS_STREAMLIT, "Streamlit no está disponible"
+    import streamlit as st  # type: ignore
 
     # Config y cabecera
     st.set_page_config(page_title="Demo App", layout="wide")
@@ -124,12 +129,31 @@ def run_cli(argv: Optional[list[str]] = None) -> int:
     parser.add_argument("--preview-len", type=int, default=DEFAULT_PREVIEW_LEN, help="Largo del preview")
     parser.add_argument("--print-base-path", action="store_true", help="Muestra la ruta base y sale")
     parser.add_argument("--test", action="store_true", help="Ejecuta los tests unitarios y sale")
+    parser.add_argument("--lote", nargs="+", metavar="PDF", default=None,
+                        help="Procesa uno o más resúmenes PDF en paralelo y muestra un resumen por archivo")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Cantidad de procesos para --lote (por defecto, todos los núcleos)")
+    parser.add_argument("--sin-cache", action="store_true", help="No usa la caché en disco de resúmenes")
+    parser.add_argument("--modo", choices=("tablas", "texto"), default="tablas",
+                        help="Extracción de filas: tablas (extract_tables) o texto (capa de texto con respaldo)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Registra los tiempos de cada etapa (logging) y muestra un resumen al terminar")
 
     args = parser.parse_args(argv)
 
     if args.test:
         return run_tests()
 
+    if args.profile:
+        registro_tiempos = _activar_perfilado()
+
+    if args.lote:
+        codigo = run_lote(args.lote, args.procesos, usar_cache=not args.sin_cache, modo_extraccion=args.modo)
+        if args.profile:
+            print("--- Tiempos ---")
+            print(registro_tiempos.como_texto())
+        return codigo
+
     if args.print_base_path:
         print(f"Ruta base: {get_base_path()}")
 
@@ -153,6 +177,48 @@ def run_cli(argv: Optional[list[str]] = None) -> int:
     return 0
 
 
+def _activar_perfilado():
+    """Logging de tiempos a stderr y un registro propio para el resumen final (--profile)."""
+    import logging
+    import instrumentacion
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    logging.getLogger("instrumentacion").setLevel(logging.DEBUG)
+    registro_tiempos = instrumentacion.Registro()
+    instrumentacion.activar(registro_tiempos)
+    return registro_tiempos
+
+
+def run_lote(
+    rutas: list[str], max_procesos: Optional[int] = None, usar_cache: bool = True, modo_extraccion: str = "tablas"
+) -> int:
+    """Procesa un lote de resúmenes PDF con ProcesadorLogico.cargar_resumenes_lote."""
+    from logic import ProcesadorLogico  # import diferido: el modo preview no necesita pdfplumber
+
+    cache = None
+    if usar_cache:
+        from cache_resumenes import CacheResumenes
+        cache = CacheResumenes()
+
+    procesador = ProcesadorLogico(cache=cache, modo_extraccion=modo_extraccion)
+    resumenes = procesador.cargar_resumenes_lote(rutas, max_procesos=max_procesos)
+
+    errores = 0
+    for ruta, resumen in zip(rutas, resumenes):
+        if resumen.error:
+            errores += 1
+            print(f"[ERROR] {ruta}: {resumen.error}")
+            continue
+        origen = "caché" if resumen.desde_cache else "PDF"
+        print(
+            f"{ruta}: {len(resumen.operaciones):,} operaciones | "
+            f"Tipo y Nº: {resumen.metadatos.get('tipo_numero') or '--'} | origen: {origen} | "
+            f"{resumen.descripcion_extraccion() or '--'}"
+        )
+    print(f"Procesados {len(rutas) - errores}/{len(rutas)} archivos.")
+    return 1 if errores else 0
+
+
 # ---------
 # Test cases
 # ---------
@@ -197,8 +263,1201 @@ class TestLogic(unittest.TestCase):
         self.assertEqual(out, "ABC")
 
 
+def _pdf_resumen_de_prueba(cantidad_operaciones: int = 30, paginas_sin_operaciones: int = 0) -> bytes:
+    """Genera con reportlab un PDF mínimo con el formato de un resumen Naranja.
+
+    `paginas_sin_operaciones` agrega al principio páginas de texto legal (con fechas, sin tabla).
+    """
+    import io
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    elementos = []
+    for _ in range(paginas_sin_operaciones):
+        elementos += [
+            Paragraph("Condiciones generales vigentes desde el 01/01/2024.", styles["Normal"]),
+            Paragraph("Las operaciones presentadas se liquidan según el plan elegido.", styles["Normal"]),
+            PageBreak(),
+        ]
+    elementos += [
+        Paragraph("Tipo y Nº: LIQ 0001-00012345", styles["Normal"]),
+        Paragraph("Fecha de Emisión: 05/03/2024", styles["Normal"]),
+        Paragraph("Echeq a la Orden Pago Diferido Fecha: 10/03/2024", styles["Normal"]),
+        Paragraph("Detalle de facturación", styles["Normal"]),
+        Paragraph("Arancel $ 1.234,00", styles["Normal"]),
+        Paragraph("Neto Liquidado $ 98.765,43", styles["Normal"]),
+    ]
+    filas = [["Fecha", "Terminal-Lote", "Presentación", "Cupón", "Plan", "Importe", "% Arancel",
+              "Arancel", "% Interés", "Interés", "% Bonif.", "Bonif.", "Operac."]]
+    for i in range(cantidad_operaciones):
+        tipo = "DEV" if i % 7 == 0 else "VTA"
+        filas.append([
+            f"{1 + i % 28:02d}/03/2024", "123-45", "02/03/2024", str(1000 + i), str(1 + i % 3),
+            f"$ {1000 + i}.234,56", "1,80 %", "$ 22,22", "", "", "0,50 %", "$ 6,17", tipo,
+        ])
+    tabla = Table(filas, repeatRows=1)
+    tabla.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.5, colors.black), ("FONTSIZE", (0, 0), (-1, -1), 7)]))
+    elementos.append(tabla)
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=landscape(A4)).build(elementos)
+    return buffer.getvalue()
+
+
+def _metadatos_por_busquedas(texto_paginas):
+    """Metadatos con un re.search por patrón (la implementación anterior a `ExtractorMetadatos`).
+
+    Referencia para el test diferencial de `ProcesadorLogico._metadatos_desde_texto`.
+    """
+    import re
+
+    metadatos = {
+        "tipo_numero": "",   # 🔹 Nuevo campo
+        "fecha_emision": "",
+        "fecha_pago": "",
+        "forma_pago": ""
+    }
+
+
+    # Patrones optimizados para este formato específico de resumen
+    patrones = {
+        "fecha_emision": [
+            r"Fecha\s*de\s*Emisi[oó]n\s*:\s*(\d{2}/\d{2}/\d{4})",
+            r"Tipo\s*y\s*N[º°]\s*:\s*.*?\n.*?Fecha\s*de\s*Emisi[oó]n\s*:\s*(\d{2}/\d{2}/\d{4})",
+            r"Hoja\s*N[º°]\s*:\s*\d+\nFecha\s*de\s*Emisi[oó]n\s*:\s*(\d{2}/\d{2}/\d{4})"
+        ],
+        "tipo_numero": [
+            r"Tipo\s*y\s*N[º°]\s*:\s*(\S.*?)(?:\n|$)"
+        ]
+    }
+
+    texto_normalizado = re.sub(r'\s+', ' ', texto_paginas).strip()
+
+    # ---------------------------------------------------
+    # 🔹 Fecha de Emisión
+    # ---------------------------------------------------
+    for patron in patrones["fecha_emision"]:
+        match = re.search(patron, texto_normalizado, re.IGNORECASE)
+        if match:
+            metadatos["fecha_emision"] = next((g for g in match.groups() if g), "")
+            break
+    # Tipo y Nº
+    for patron in patrones["tipo_numero"]:
+        match = re.search(patron, texto_paginas, re.IGNORECASE)
+        if match:
+            metadatos["tipo_numero"] = match.group(1).strip()
+            break
+
+
+    # ---------------------------------------------------
+    # 🔹 Forma y Fecha de Pago (con soporte a varios métodos)
+    # ---------------------------------------------------
+    metodos_pago = ["Echeq", "Transferencia", "Dep[oó]sito", "Nota de Cr[eé]dito"]
+
+    # Construir patrón dinámico
+    patron_metodo_pago = (
+        r"(" + "|".join(metodos_pago) + r")"
+        r"(?:\s*a\s*la\s*Orden)?(?:\s*Pago\s*Diferido)?"
+        r"\s*Fecha\s*:\s*(\d{2}/\d{2}/\d{4})"
+    )
+
+    match = re.search(patron_metodo_pago, texto_paginas, re.IGNORECASE)
+    if match:
+        metadatos["forma_pago"] = match.group(1).strip()
+        metadatos["fecha_pago"] = match.group(2).strip()
+
+    # ---------------------------------------------------
+    # 🔹 Fallback si no se encontró con el patrón dinámico
+    # ---------------------------------------------------
+    if not metadatos["fecha_pago"]:
+        posibles_fechas = [
+            r"Fecha\s*de\s*Pago\s*:\s*(\d{2}/\d{2}/\d{4})",
+            r"Detalle\s*de\s*Cupones\s*Liquidados.*?Fecha\s*de\s*Pago\s*:\s*(\d{2}/\d{2}/\d{4})",
+            r"Echeq\s*a\s*la\s*Orden\s*Pago\s*Diferido\s*Fecha\s*:\s*(\d{2}/\d{2}/\d{4})"
+        ]
+        for patron in posibles_fechas:
+            match = re.search(patron, texto_paginas, re.IGNORECASE)
+            if match:
+                metadatos["fecha_pago"] = next((g for g in match.groups() if g), "")
+                break
+
+    if not metadatos["forma_pago"]:
+        posibles_formas = [
+            r"A\s*Pagar\s*\n.*?\n.*?\n.*?\n(.*?)\n",
+            r"Echeq\s*a\s*la\s*Orden\s*(Pago\s*Diferido)",
+            r"Forma\s*de\s*Pago\s*:\s*(.*?)(?:\n|$)"
+        ]
+        for patron in posibles_formas:
+            match = re.search(patron, texto_paginas, re.IGNORECASE)
+            if match:
+                forma_pago = next((g for g in match.groups() if g), "")
+                forma_pago = forma_pago.strip()
+                forma_pago = re.sub(r'^\W+|\W+$', '', forma_pago)
+                forma_pago = ' '.join(forma_pago.split())
+                if forma_pago:
+                    metadatos["forma_pago"] = forma_pago
+                    break
+
+    # ---------------------------------------------------
+    # 🔹 Validación final de fechas
+    # ---------------------------------------------------
+    for campo in ["fecha_emision", "fecha_pago"]:
+        if metadatos[campo] and not re.match(r"\d{2}/\d{2}/\d{4}", metadatos[campo]):
+            metadatos[campo] = ""
+
+    return metadatos
+
+
+def _impuestos_por_busquedas(texto_completo: str):
+    """Impuestos con un re.search por patrón (la implementación anterior a `ExtractorMetadatos`).
+
+    Referencia para el test diferencial de `impuestos_retenciones_contribuciones`.
+    """
+    import re
+
+    flags = re.I | re.S
+    res = {
+        "detalles_facturacion": {},   # {concepto: "$ monto"}
+        "retenciones_impositivas": {},# {concepto: "$ monto"}
+        "neto_liquidado": None
+    }
+
+    # ---------- 1) Bloque "Detalles de facturación" ----------
+    pat_detalles = re.compile(
+        r"(?:Detalle|Detalles?)\s+de\s+facturaci[oó]n(.*?)"
+        r"(?:(?:Detalle\s+(?:de\s+)?)?Retenciones(?:\s+y\s+Percepciones)?\s+Impositivas?|"
+        r"Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar))",
+        flags
+    )
+    m = pat_detalles.search(texto_completo)
+    if m:
+        bloque = m.group(1)
+        for linea in bloque.splitlines():
+            ln = linea.strip()
+            if "$" in ln:
+                partes = ln.split("$")
+                concepto = partes[0].strip(" -")
+                monto = partes[-1].strip()
+                if concepto and monto:
+                    res["detalles_facturacion"][concepto] = monto
+
+    # ---------- 2) Bloque "Retenciones / Percepciones Impositivas" ----------
+    pat_ret = re.compile(
+        r"(?:Detalle\s+(?:de\s+)?)?Retenciones(?:\s+y\s+Percepciones)?\s+Impositivas?(.*?)"
+        r"(?:(?:Importe\s*\$\s*[\d\.,]+)|Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar))",
+        flags
+    )
+    m = pat_ret.search(texto_completo)
+    if m:
+        bloque = m.group(1)
+        for linea in bloque.splitlines():
+            ln = linea.strip()
+            if "$" in ln and "Retenciones Impositivas" not in ln:
+                partes = ln.split("$")
+                concepto = partes[0].strip(" -")
+                monto = partes[-1].strip()
+                if concepto and monto:
+                    res["retenciones_impositivas"][concepto] = monto
+
+    # ---------- 3) Neto Liquidado (con fallbacks robustos) ----------
+    # Caso habitual: el monto aparece después de "Neto ..."
+    m_neto = re.search(r"Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar).*?\$\s*([\d\.\,]+)", texto_completo, flags)
+    if not m_neto:
+        # Fallback 1: el renglón de pago (Echeq...) trae el mismo monto
+        m_neto = re.search(r"Echeq\s*a\s*la\s*Orden.*?\$\s*([\d\.\,]+)", texto_completo, flags)
+    if not m_neto:
+        # Fallback 2: tomar el último "Importe $ X" antes del bloque Neto
+        m_bloque = re.search(r"(Importe\s*\$\s*[\d\.\,]+\s*)+?\s*Neto\s+(?:Liquidado|a\s+Liquidar|a\s+Pagar)", texto_completo, flags)
+        if m_bloque:
+            candidatos = re.findall(r"Importe\s*\$\s*([\d\.\,]+)", m_bloque.group(0))
+            if candidatos:
+                res["neto_liquidado"] = candidatos[-1]
+    else:
+        res["neto_liquidado"] = m_neto.group(1)
+
+    return res
+
+
+class TestProcesadorLogico(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pdf_bytes = _pdf_resumen_de_prueba()
+
+    def _buffer(self):
+        import io
+        return io.BytesIO(self.pdf_bytes)
+
+    def test_cargar_resumen_equivale_a_lecturas_separadas(self):
+        from logic import ProcesadorLogico
+
+        separado = ProcesadorLogico()
+        df_ops = separado.extraer_operaciones_del_pdf(self._buffer())
+        meta = separado.extraer_metadatos_del_pdf(self._buffer())
+
+        resumen = ProcesadorLogico().cargar_resumen_pdf(self._buffer())
+        self.assertTrue(resumen.operaciones.equals(df_ops))
+        self.assertEqual(resumen.metadatos, meta)
+        self.assertEqual(resumen.resumen_impositivo, separado.resumen_impositivo)
+        self.assertEqual(len(resumen.operaciones), 30)
+        self.assertEqual(resumen.metadatos["tipo_numero"], "LIQ 0001-00012345")
+
+    def test_cargar_resumen_abre_el_pdf_una_sola_vez(self):
+        from unittest import mock
+        import logic
+
+        with mock.patch.object(logic.pdfplumber, "open", wraps=logic.pdfplumber.open) as abrir:
+            logic.ProcesadorLogico().cargar_resumen_pdf(self._buffer())
+        self.assertEqual(abrir.call_count, 1)
+
+    def test_extraccion_por_paginas_igual_a_secuencial(self):
+        from logic import ProcesadorLogico
+
+        pdf_largo = _pdf_resumen_de_prueba(200)
+        secuencial = ProcesadorLogico().cargar_resumen_pdf(pdf_largo)
+        paralelo = ProcesadorLogico().cargar_resumen_pdf(pdf_largo, procesos_por_paginas=2)
+
+        self.assertTrue(paralelo.operaciones.equals(secuencial.operaciones))
+        self.assertEqual(paralelo.metadatos, secuencial.metadatos)
+        self.assertEqual(paralelo.resumen_impositivo, secuencial.resumen_impositivo)
+        self.assertEqual(paralelo.operaciones["cupon"].tolist(), [str(1000 + i) for i in range(200)])
+
+    def test_modo_texto_igual_a_tablas_y_vuelve_a_tablas_si_no_valida(self):
+        from unittest import mock
+        from logic import ProcesadorLogico
+
+        pdf_largo = _pdf_resumen_de_prueba(200)
+        tablas = ProcesadorLogico().cargar_resumen_pdf(pdf_largo)
+        texto = ProcesadorLogico(modo_extraccion="texto").cargar_resumen_pdf(pdf_largo)
+
+        self.assertTrue(texto.operaciones.equals(tablas.operaciones))
+        self.assertEqual(texto.metadatos, tablas.metadatos)
+        self.assertEqual(tablas.extraccion["paginas_texto"], 0)
+        self.assertEqual(texto.extraccion["paginas_texto"], 9)
+
+        # Página que no valida: se lee con extract_tables() y se informa
+        originales = ProcesadorLogico._filas_de_operaciones_por_texto
+        sin_primera = lambda pagina: None if pagina.page_number == 1 else originales(pagina)
+        with mock.patch.object(ProcesadorLogico, "_filas_de_operaciones_por_texto", side_effect=sin_primera):
+            mixto = ProcesadorLogico(modo_extraccion="texto").cargar_resumen_pdf(pdf_largo)
+        self.assertTrue(mixto.operaciones.equals(tablas.operaciones))
+        self.assertEqual(mixto.extraccion["paginas_texto"], 8)
+        self.assertEqual(mixto.extraccion["paginas_plantilla"] + mixto.extraccion["paginas_tablas"], 1)
+
+        with self.assertRaises(ValueError):
+            ProcesadorLogico(modo_extraccion="ocr")
+
+    def test_paginas_sin_operaciones_se_omiten_y_se_cuentan(self):
+        from logic import ProcesadorLogico
+
+        pdf = _pdf_resumen_de_prueba(30, paginas_sin_operaciones=2)
+        for modo in ("tablas", "texto"):
+            resumen = ProcesadorLogico(modo_extraccion=modo).cargar_resumen_pdf(pdf)
+            self.assertEqual(resumen.extraccion["paginas_omitidas"], 2)
+            self.assertEqual(len(resumen.operaciones), 30)
+            self.assertEqual(resumen.metadatos["tipo_numero"], "LIQ 0001-00012345")
+
+    def test_geometria_de_tabla_aprendida_y_reaprendida(self):
+        import io
+        import pdfplumber
+        from logic import GeometriaTabla, LectorTablas, ProcesadorLogico
+
+        pdf_largo = _pdf_resumen_de_prueba(200)
+        procesador = ProcesadorLogico()
+        resumen = procesador.cargar_resumen_pdf(pdf_largo)
+
+        # Se aprende en la primera página y el resto usa la plantilla
+        self.assertEqual((resumen.extraccion["paginas_tablas"], resumen.extraccion["paginas_plantilla"]), (1, 8))
+        self.assertEqual(resumen.operaciones["cupon"].tolist(), [str(1000 + i) for i in range(200)])
+        (formato, geometria), = procesador.plantillas_tabla.items()
+        self.assertEqual(len(geometria.columnas), 14)
+
+        with pdfplumber.open(io.BytesIO(pdf_largo)) as documento_pdf:
+            paginas = documento_pdf.pages[:3]
+            esperadas = [ProcesadorLogico._filas_de_operaciones(p) for p in paginas]
+
+            # Plantilla guardada que no encaja: se vuelve a detectar la tabla y se reemplaza
+            corrida = GeometriaTabla([x + 20 for x in geometria.columnas], geometria.bbox, formato)
+            self.assertIsNone(corrida.filas(paginas[1]))
+            lector = LectorTablas({formato: corrida})
+            leidas = [lector.filas(p) for p in paginas]
+
+        self.assertEqual([filas for filas, _ in leidas], esperadas)
+        self.assertEqual([metodo for _, metodo in leidas], ["tablas", "plantilla", "plantilla"])
+        self.assertEqual(lector.plantillas[formato].columnas, geometria.columnas)
+
+    def test_geometria_ignora_rayas_fuera_de_la_tabla(self):
+        import io
+        import pdfplumber
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.pdfgen import canvas
+        from generador_resumenes import ALTO_FILA, ANCHOS_COLUMNAS, ENCABEZADOS, MARGEN, GeneradorResumenes
+        from logic import ProcesadorLogico
+
+        # Página 2 con una raya del ancho de la tabla y una línea que empieza con fecha entre la raya y la tabla
+        generador = GeneradorResumenes(semilla=5)
+        filas = generador.filas(30)
+        xs = [float(MARGEN)]
+        for ancho in ANCHOS_COLUMNAS:
+            xs.append(xs[-1] + ancho)
+        _, alto_pagina = landscape(A4)
+        buffer = io.BytesIO()
+        lienzo = canvas.Canvas(buffer, pagesize=landscape(A4))
+        y = generador._dibujar_lineas(lienzo, generador._metadatos(), alto_pagina - MARGEN)
+        generador._dibujar_tabla(lienzo, xs, y, [ENCABEZADOS] + filas[:15])
+        lienzo.showPage()
+        y = alto_pagina - MARGEN
+        lienzo.setLineWidth(0.5)
+        lienzo.line(xs[0], y, xs[-1], y)
+        lienzo.setFont("Helvetica", 7)
+        lienzo.drawString(xs[0] + 2, y - 11, "01/03/2024 Periodo")
+        generador._dibujar_tabla(lienzo, xs, y - 2 * ALTO_FILA, [ENCABEZADOS] + filas[15:])
+        lienzo.showPage()
+        lienzo.save()
+
+        resumen = ProcesadorLogico().cargar_resumen_pdf(buffer.getvalue())
+        self.assertEqual(resumen.extraccion["paginas_plantilla"], 1)
+        with pdfplumber.open(io.BytesIO(buffer.getvalue())) as documento_pdf:
+            esperadas = [fila for pagina in documento_pdf.pages for fila in ProcesadorLogico._filas_de_operaciones(pagina)]
+        self.assertEqual(len(esperadas), 30)
+        self.assertEqual(resumen.operaciones["cupon"].tolist(), [fila[3] for fila in esperadas])
+
+    def test_import_liviano_de_logic(self):
+        import subprocess
+
+        # Proceso nuevo: importar logic no debe cargar pdfplumber, matplotlib ni reportlab
+        codigo = (
+            "import sys, logic; "
+            "print(','.join(m for m in ('pdfplumber', 'matplotlib', 'reportlab') if m in sys.modules))"
+        )
+        salida = subprocess.run(
+            [sys.executable, "-c", codigo],
+            cwd=get_base_path(), capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(salida.stdout.strip(), "")
+
+    def test_extractor_de_metadatos_igual_a_busquedas_por_patron(self):
+        import random
+        from logic import ExtractorMetadatos, ProcesadorLogico
+
+        fragmentos = [
+            "Fecha de Emisión: 05/03/2024", "Fecha de\nEmision:12/12/2023", "FECHA DE PAGO : 01/02/2024",
+            "Tipo y Nº: LIQ 0001-1", "Tipo y N°:", "Hoja Nº: 3\n", "Echeq a la Orden Pago Diferido Fecha: 10/03/2024",
+            "Echeq a la Orden", "Transferencia Fecha: 11/03/2024", "Depósito", "Nota de Crédito Fecha: 1/1/2024",
+            "Detalle de facturación", "Detalles de facturacion", "Detalle de Cupones Liquidados x Fecha de Pago: 02/02/2024",
+            "Retenciones Impositivas", "Detalle de Retenciones y Percepciones Impositiva", "Neto Liquidado",
+            "Neto a Pagar", "A Pagar", "Forma de Pago: Echeq ", "Importe $ 1.234,56", "IVA $ 3,00", "$ 99,9",
+            "\n", "  ", ":", "para", "Fecha", "Detalle", "12/03/2024", "Tıpo y Nº: Z", "ſ", "İ",
+        ]
+        generador = random.Random(11)
+        procesador = ProcesadorLogico()
+        for _ in range(3000):
+            texto = "".join(
+                generador.choice(fragmentos) + generador.choice(["", " ", "\n"])
+                for _ in range(generador.randint(0, 30))
+            )
+            anclas = ExtractorMetadatos.anclas(texto)
+            self.assertEqual(
+                ProcesadorLogico._metadatos_desde_texto(texto, anclas),
+                _metadatos_por_busquedas(texto),
+                repr(texto),
+            )
+            self.assertEqual(
+                procesador.impuestos_retenciones_contribuciones(texto, anclas),
+                _impuestos_por_busquedas(texto),
+                repr(texto),
+            )
+
+    def test_iterador_de_operaciones_por_bloques(self):
+        import pandas as pd
+        from logic import COLUMNAS_OPERACIONES, EsquemaOperaciones, ProcesadorLogico
+
+        pdf_largo = _pdf_resumen_de_prueba(200)
+        procesador = ProcesadorLogico()
+        bloques = list(procesador.iterar_operaciones_del_pdf(pdf_largo))
+
+        self.assertGreater(len(bloques), 1)  # uno por página con operaciones
+        self.assertIsNone(procesador.dataframe_operaciones)
+        for bloque in bloques:
+            self.assertEqual(list(bloque.columns), COLUMNAS_OPERACIONES)
+            self.assertTrue(EsquemaOperaciones.es_compacto(bloque))
+
+        completo = ProcesadorLogico().cargar_resumen_pdf(pdf_largo).operaciones
+        self.assertTrue(procesador.extraer_operaciones_del_pdf(pdf_largo).equals(completo))
+        self.assertEqual(pd.concat(bloques)["cupon"].tolist(), completo["cupon"].tolist())
+
+        agrupados = list(procesador.iterar_operaciones_del_pdf(pdf_largo, filas_por_bloque=120))
+        self.assertLess(len(agrupados), len(bloques))
+        self.assertEqual(sum(len(b) for b in agrupados), 200)
+
+    def test_indice_duplicados_por_tipo_contenido_y_operaciones(self):
+        import copy
+        from logic import IndiceDuplicados, ProcesadorLogico
+
+        indice = IndiceDuplicados()
+        original = ProcesadorLogico().cargar_resumen_pdf(self.pdf_bytes)
+        indice.registrar("a.pdf", original)
+
+        # Mismo archivo con el mismo nombre (rerun de Streamlit): no es duplicado
+        self.assertIsNone(indice.buscar("a.pdf", original)["duplicado_de"])
+
+        # Mismas operaciones con otro Tipo y Nº y otros bytes
+        copia = copy.deepcopy(original)
+        copia.metadatos["tipo_numero"] = "LIQ 9999"
+        copia.hash_contenido = "otro"
+        self.assertEqual(indice.buscar("b.pdf", copia)["motivo"], "operaciones")
+
+        # Resumen distinto que repite 5 operaciones del primero
+        parcial = ProcesadorLogico().cargar_resumen_pdf(_pdf_resumen_de_prueba(5))
+        parcial.metadatos["tipo_numero"] = "LIQ 0002"
+        coincidencias = indice.buscar("c.pdf", parcial)
+        self.assertIsNone(coincidencias["duplicado_de"])
+        self.assertEqual(coincidencias["operaciones_repetidas"], {"a.pdf": 5})
+
+        indice.registrar("c.pdf", parcial)
+        indice.registrar("b.pdf", copia)
+        indice.quitar("a.pdf")
+        # Las claves compartidas quedan a cargo del siguiente dueño, en orden de registro
+        coincidencias = indice.buscar("d.pdf", original)
+        self.assertEqual(coincidencias["operaciones_repetidas"], {"c.pdf": 5, "b.pdf": 25})
+        self.assertEqual((coincidencias["duplicado_de"], coincidencias["motivo"]), ("b.pdf", "operaciones"))
+
+        indice.quitar("b.pdf")
+        coincidencias = indice.buscar("d.pdf", original)
+        self.assertEqual(coincidencias["operaciones_repetidas"], {"c.pdf": 5})
+        self.assertIsNone(coincidencias["duplicado_de"])
+        self.assertEqual(len(indice), 1)
+        self.assertNotIn("a.pdf", indice)
+
+    def test_lote_respeta_orden_y_aisla_errores(self):
+        from logic import ProcesadorLogico
+
+        otro_pdf = _pdf_resumen_de_prueba(5)
+        origenes = [self.pdf_bytes, b"esto no es un PDF", otro_pdf]
+        resumenes = ProcesadorLogico().cargar_resumenes_lote(origenes, max_procesos=2)
+
+        self.assertEqual(len(resumenes), 3)
+        self.assertIsNone(resumenes[0].error)
+        self.assertIsNotNone(resumenes[1].error)
+        self.assertIsNone(resumenes[2].error)
+        self.assertEqual(len(resumenes[0].operaciones), 30)
+        self.assertEqual(len(resumenes[2].operaciones), 5)
+        self.assertTrue(resumenes[1].operaciones.empty)
+
+    def test_pools_por_tamano_no_se_cancelan_entre_si(self):
+        import time
+        from logic import _descartar_pool_procesos, _obtener_pool_procesos
+
+        pool_dos = _obtener_pool_procesos(2)
+        en_curso = [pool_dos.submit(time.sleep, 0.3) for _ in range(4)]  # más tareas que workers: hay pendientes
+        pool_tres = _obtener_pool_procesos(3)  # otro tamaño (otra sesión): no toca el pool de dos
+        self.assertIsNot(pool_tres, pool_dos)
+        self.assertEqual([futuro.result() for futuro in en_curso], [None] * 4)
+        self.assertIs(_obtener_pool_procesos(2), pool_dos)
+
+        _descartar_pool_procesos(pool_tres)
+        self.assertIsNot(_obtener_pool_procesos(3), pool_tres)
+        _descartar_pool_procesos(_obtener_pool_procesos(3))
+
+
+def _recalculo_fila_a_fila(operaciones, diccionario_porcentajes_nuevos):
+    """Recálculo fila a fila (en pesos; el teórico, en Decimal), como era antes de vectorizarlo.
+
+    Referencia para el test diferencial de `recalcular_con_porcentajes_ajustados`.
+    """
+    from decimal import Decimal, ROUND_HALF_UP
+    from logic import CalculosAuxiliares, EsquemaOperaciones
+
+    dataframe_copia = EsquemaOperaciones.vista_en_pesos(operaciones)
+
+    # Crear columna identificadora de variante
+    dataframe_copia["variante_plan"] = dataframe_copia.apply(
+        lambda fila: (
+            f"{fila['plan']} ("
+            f"{fila['arancel_pct']:.2f}/"
+            f"{fila['interes_pct']:.2f}/"
+            f"{fila['bonificacion_pct']:.2f})"
+        ),
+        axis=1
+    )
+
+    lista_abonados_pdf = []
+    lista_diferencias = []
+    lista_estados = []
+
+    for _, fila_actual in dataframe_copia.iterrows():
+        variante_actual = fila_actual["variante_plan"]
+        porcentajes = diccionario_porcentajes_nuevos.get(variante_actual, {
+            "arancel": 0,
+            "interes": 0,
+            "bonificacion": 0
+        })
+
+        importe_operacion = CalculosAuxiliares.convertir_a_numero(fila_actual["importe"])
+
+        # Valor abonado según PDF
+        abonado_pdf = round(
+            importe_operacion
+            - abs(CalculosAuxiliares.convertir_a_numero(fila_actual.get("arancel_valor", 0)))
+            - abs(CalculosAuxiliares.convertir_a_numero(fila_actual.get("interes_valor", 0)))
+            + abs(CalculosAuxiliares.convertir_a_numero(fila_actual.get("bonificacion_valor", 0))),
+            2
+        )
+
+        # Cálculo teórico (DEV y VTA usan la misma fórmula), exacto en decimal y
+        # con los empates de medio centavo lejos del cero
+        factor = 1 - (
+            Decimal(str(porcentajes["arancel"]))
+            + Decimal(str(porcentajes["interes"]))
+            - Decimal(str(porcentajes["bonificacion"]))
+        ) / 100
+        abonado_teorico = float(
+            (Decimal(str(importe_operacion)) * factor).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        )
+
+        diferencia = round(abonado_pdf - abonado_teorico, 2)
+        diferencia_absoluta = abs(diferencia)
+        estado = "Correcta" if diferencia_absoluta <= 0.01 else "Incorrecta"
+
+        lista_abonados_pdf.append(abonado_pdf)
+        lista_diferencias.append(diferencia_absoluta)
+        lista_estados.append(estado)
+
+    # Añadir columnas calculadas
+    dataframe_copia["importe_abonado"] = lista_abonados_pdf
+    dataframe_copia["diferencia"] = lista_diferencias
+    dataframe_copia["estado"] = lista_estados
+
+    return dataframe_copia
+
+
+class TestRecalculo(unittest.TestCase):
+    @staticmethod
+    def _operaciones_aleatorias(cantidad: int = 3000, semilla: int = 7):
+        import numpy as np
+        import pandas as pd
+
+        rng = np.random.default_rng(semilla)
+        importe = np.round(rng.uniform(-5_000, 250_000, cantidad), 2)
+        importe[:4] = [2.675, 1.005, 0.125, 1_000_000.345]  # casos cercanos a empates
+        arancel_pct = rng.choice([1.8, 2.5, 3.0, 0.0], cantidad)
+        interes_pct = rng.choice([0.0, 4.35, 10.12], cantidad)
+        bonificacion_pct = rng.choice([0.0, 0.5], cantidad)
+        ruido = rng.choice([0.0, 0.0, 0.01, 0.02, 3.5], cantidad)
+        return pd.DataFrame({
+            "fecha": "01/03/2024",
+            "terminal-lote": "123-45",
+            "presentacion": "02/03/2024",
+            "cupon": [str(i) for i in range(cantidad)],
+            "plan": rng.choice(["1", "3", "6", "Z"], cantidad),
+            "importe": importe,
+            "arancel_pct": arancel_pct,
+            "arancel_valor": np.round(importe * arancel_pct / 100 + ruido, 2),
+            "interes_pct": interes_pct,
+            "interes_valor": np.round(importe * interes_pct / 100, 2),
+            "bonificacion_pct": bonificacion_pct,
+            "bonificacion_valor": -np.round(importe * bonificacion_pct / 100, 2),
+            "tipo_operacion": rng.choice(["VTA", "VTA", "DEV", "dev"], cantidad),
+        })
+
+    def test_recalculo_columnar_igual_a_version_iterativa(self):
+        import numpy as np
+        import pandas as pd
+        from logic import EsquemaOperaciones, ProcesadorLogico
+
+        procesador = ProcesadorLogico()
+        procesador.dataframe_operaciones = self._operaciones_aleatorias()
+        porcentajes = procesador.detectar_configuraciones_plan()
+        # Ajustar algunas variantes y dejar otras sin configurar (se toman como 0)
+        for i, variante in enumerate(sorted(porcentajes)):
+            if i % 3 == 0:
+                porcentajes[variante] = {"arancel": 2.0, "interes": 1.25, "bonificacion": 0.75}
+            elif i % 3 == 1:
+                del porcentajes[variante]
+
+        esperado = _recalculo_fila_a_fila(procesador.dataframe_operaciones, porcentajes)
+        obtenido = procesador.recalcular_con_porcentajes_ajustados(porcentajes)
+
+        # variante_plan sale categórica del índice de variantes; los valores deben coincidir
+        self.assertIsInstance(obtenido["variante_plan"].dtype, pd.CategoricalDtype)
+        self.assertEqual(obtenido["diferencia"].dtype, np.int64)
+        obtenido = EsquemaOperaciones.vista_en_pesos(obtenido)
+        obtenido = obtenido.assign(variante_plan=obtenido["variante_plan"].astype(object))
+
+        # Incluye empates exactos de medio centavo (se redondean lejos del cero en ambas versiones)
+        ajustes = pd.DataFrame.from_dict(porcentajes, orient="index")
+        factores = [
+            1_000_000 - round(ajustes.at[v, "arancel"] * 10_000) - round(ajustes.at[v, "interes"] * 10_000)
+            + round(ajustes.at[v, "bonificacion"] * 10_000) if v in ajustes.index else 1_000_000
+            for v in obtenido["variante_plan"]
+        ]
+        productos = np.abs(procesador.dataframe_operaciones["importe"].to_numpy() * np.array(factores))
+        self.assertTrue((productos % 1_000_000 == 500_000).any())
+        pd.testing.assert_frame_equal(obtenido, esperado)
+        self.assertIn("Incorrecta", set(obtenido["estado"]))
+        self.assertIn("Correcta", set(obtenido["estado"]))
+
+    def test_porcentajes_con_mas_de_dos_decimales(self):
+        from logic import ProcesadorLogico
+
+        operaciones = self._operaciones_aleatorias(4)
+        operaciones["importe"] = [1000.0, 200.0, 2.0, 0.4]
+        operaciones["arancel_pct"] = 1.825
+        operaciones["arancel_valor"] = [18.25, 3.65, 0.04, 0.01]
+        operaciones[["interes_pct", "interes_valor", "bonificacion_pct", "bonificacion_valor"]] = 0
+        procesador = ProcesadorLogico()
+        procesador.dataframe_operaciones = operaciones
+        porcentajes = {v: {"arancel": 1.825, "interes": 0, "bonificacion": 0} for v in procesador.indice_variantes.claves}
+
+        # 1,825 % no se redondea a 1,82 %: 1000 - 18,25 = 981,75 (con 1,82 % daría 981,80)
+        resultados = procesador.recalcular_con_porcentajes_ajustados(porcentajes)
+        self.assertEqual(resultados["diferencia"].tolist(), [0, 0, 0, 0])
+        self.assertEqual(resultados["estado"].tolist(), ["Correcta"] * 4)
+
+        # Con más decimales de los que se respetan, se avisa
+        porcentajes = {v: {"arancel": 1.82549, "interes": 0, "bonificacion": 0} for v in porcentajes}
+        with self.assertLogs("logic", "WARNING"):
+            procesador.recalcular_con_porcentajes_ajustados(porcentajes)
+
+    def test_indice_variantes_reutilizado_en_deteccion_y_reporte(self):
+        from logic import EsquemaOperaciones, ProcesadorLogico
+
+        procesador = ProcesadorLogico()
+        procesador.dataframe_operaciones = self._operaciones_aleatorias(500)
+        indice = procesador.indice_variantes
+        self.assertIs(procesador.indice_variantes, indice)
+
+        porcentajes = procesador.detectar_configuraciones_plan()
+        self.assertEqual(set(porcentajes), set(indice.claves))
+        resultados = procesador.recalcular_con_porcentajes_ajustados(porcentajes)
+        self.assertEqual(list(resultados["variante_plan"].cat.categories), indice.claves)
+
+        # Mismo reporte que filtrando por texto de variante
+        reporte = procesador.generar_reporte_por_plan()
+        variantes = resultados["variante_plan"].astype(object)
+        for variante, datos in reporte.items():
+            filtrado = resultados[variantes == variante]
+            self.assertEqual(datos["total_operaciones"], len(filtrado))
+            self.assertTrue(datos["detalle_errores"].equals(
+                EsquemaOperaciones.vista_en_pesos(filtrado[filtrado["estado"] == "Incorrecta"])
+            ))
+
+        procesador.dataframe_operaciones = self._operaciones_aleatorias(50)
+        self.assertIsNot(procesador.indice_variantes, indice)
+
+    def test_reporte_por_plan_en_una_pasada_con_detalle_diferido(self):
+        from logic import EsquemaOperaciones, ProcesadorLogico
+
+        procesador = ProcesadorLogico()
+        procesador.dataframe_operaciones = self._operaciones_aleatorias(2000)
+        resultados = procesador.recalcular_con_porcentajes_ajustados(procesador.detectar_configuraciones_plan())
+        reporte = procesador.generar_reporte_por_plan()
+        self.assertTrue(reporte)
+
+        variantes = resultados["variante_plan"].astype(object)
+        for variante, datos in reporte.items():
+            # La clave figura aunque todavía no se haya pedido el detalle
+            self.assertEqual(list(datos)[-1], "detalle_errores")
+            self.assertEqual(len(datos), 6)
+            self.assertEqual(set({**datos}), set(dict(datos)))
+            errores = resultados[(variantes == variante) & (resultados["estado"] == "Incorrecta")]
+            self.assertEqual(datos["operaciones_erroneas"], len(errores))
+            self.assertEqual(datos["diferencia_total"], errores["diferencia"].sum() / 100)  # centavos exactos
+            self.assertTrue(datos.get("detalle_errores").equals(EsquemaOperaciones.vista_en_pesos(errores)))
+
+        # Sin pedir el detalle, el reporte no queda atado a los resultados: cambiarlos después no lo afecta
+        detalle = {variante: datos["detalle_errores"] for variante, datos in reporte.items()}
+        sin_pedir = procesador.generar_reporte_por_plan()
+        resultados["diferencia"] = 0
+        for variante, datos in sin_pedir.items():
+            self.assertTrue(datos["detalle_errores"].equals(detalle[variante]))
+
+    def test_esquema_compacto_de_operaciones(self):
+        import numpy as np
+        import pandas as pd
+        from logic import EsquemaOperaciones, ProcesadorLogico
+
+        original = self._operaciones_aleatorias(5000)
+        procesador = ProcesadorLogico()
+        procesador.dataframe_operaciones = original
+        compacto = procesador.dataframe_operaciones
+
+        self.assertEqual(compacto["importe"].dtype, np.int64)
+        self.assertEqual(compacto["importe"].iloc[4], round(original["importe"].iloc[4] * 100))
+        self.assertTrue(pd.api.types.is_integer_dtype(compacto["arancel_pct"]))
+        self.assertEqual(set(compacto["arancel_pct"]), {180, 250, 300, 0})
+        for columna in EsquemaOperaciones.COLUMNAS_CATEGORIA:
+            self.assertIsInstance(compacto[columna].dtype, pd.CategoricalDtype)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(compacto["fecha"]))
+        self.assertLess(compacto.memory_usage(deep=True).sum(), original.memory_usage(deep=True).sum() / 2)
+
+        # Idempotente y reversible para mostrar/exportar
+        self.assertIs(EsquemaOperaciones.aplicar(compacto), compacto)
+        vista = EsquemaOperaciones.vista_en_pesos(compacto)
+        self.assertEqual(vista["fecha"].iloc[0], "01/03/2024")
+        np.testing.assert_allclose(vista["importe"].iloc[4:], original["importe"].iloc[4:], rtol=0, atol=1e-9)
+
+    def test_convertir_columna_igual_a_version_escalar(self):
+        import random
+        import numpy as np
+        import pandas as pd
+        from logic import CalculosAuxiliares
+
+        random.seed(3)
+        alfabeto = list("0123456789.,-$% ") + ["e", "+", "_", "\n", "inf", "x"]
+        valores = ["".join(random.choice(alfabeto) for _ in range(random.randint(0, 9))) for _ in range(5000)]
+        valores += [None, float("nan"), 3, 2.5, "$ 1.234,56", "3,50 %", "1.234", "-", "", "  "]
+
+        esperado = np.array([CalculosAuxiliares.convertir_a_numero(v) for v in valores])
+        for cachear in (False, True):
+            obtenido = CalculosAuxiliares.convertir_columna_a_numero(
+                pd.Series(valores, dtype=object), cachear=cachear
+            ).to_numpy()
+            np.testing.assert_array_equal(obtenido, esperado)
+
+        limpios = [v.replace("\n", "") for v in valores if isinstance(v, str)]
+        np.testing.assert_array_equal(
+            CalculosAuxiliares.convertir_columna_a_numero(pd.Series(limpios)).to_numpy(),
+            [CalculosAuxiliares.convertir_a_numero(v) for v in limpios],
+        )
+
+    def test_formatear_columna_igual_a_version_escalar(self):
+        import numpy as np
+        import pandas as pd
+        from logic import CalculosAuxiliares, EsquemaOperaciones
+
+        rng = np.random.default_rng(5)
+        valores = np.concatenate([
+            rng.integers(-10**9, 10**12, 3000) / 100,
+            rng.uniform(-1_000, 1_000, 3000),
+            [0.0, -0.0, -0.001, 0.005, 2.675, 1.005, 1.115, 999.995, -999.995, 0.5, 1000, 999999.999],
+        ])
+        np.testing.assert_array_equal(
+            CalculosAuxiliares.formatear_columna_moneda(valores),
+            [CalculosAuxiliares.formatear_moneda_pesos(v) for v in valores],
+        )
+        np.testing.assert_array_equal(
+            CalculosAuxiliares.formatear_columna_porcentaje(valores),
+            [CalculosAuxiliares.formatear_porcentaje(v) for v in valores],
+        )
+
+        # Nulos y ceros, enteros ya escalados y Series
+        serie = pd.Series([1234.5, None, 0.0, -7.25], index=[10, 11, 12, 13])
+        self.assertEqual(
+            CalculosAuxiliares.formatear_columna_moneda(serie, cero_no_figura=True, prefijo="$").tolist(),
+            ["$1.234,50", "No figura", "No figura", "$-7,25"],
+        )
+        self.assertEqual(list(CalculosAuxiliares.formatear_columna_moneda(serie, no_figura="").index), [10, 11, 12, 13])
+        self.assertEqual(
+            list(CalculosAuxiliares.formatear_columna_moneda(np.array([123456, -5, 0]), en_centavos=True)),
+            ["1.234,56", "-0,05", "0,00"],
+        )
+        self.assertEqual(
+            list(CalculosAuxiliares.formatear_columna_porcentaje(np.array([350, 0]), en_puntos_basicos=True)),
+            ["3,50 %", "0,00 %"],
+        )
+
+        compacto = EsquemaOperaciones.aplicar(self._operaciones_aleatorias(50))
+        vista = EsquemaOperaciones.vista_formateada(compacto)
+        self.assertEqual(vista["importe"].tolist(), [CalculosAuxiliares.formatear_moneda_pesos(v / 100) for v in compacto["importe"]])
+        self.assertEqual(vista["arancel_pct"].iloc[0], CalculosAuxiliares.formatear_porcentaje(compacto["arancel_pct"].iloc[0] / 100))
+
+    def test_redondear_como_python(self):
+        import numpy as np
+        from logic import CalculosAuxiliares
+
+        valores = np.array([2.675, 1.005, 0.125, 0.375, -2.675, 1e9 + 0.005, 12.3449999, float("nan")])
+        esperado = [round(float(v), 2) for v in valores]
+        obtenido = CalculosAuxiliares.redondear_como_python(valores).tolist()
+        self.assertEqual(obtenido[:-1], esperado[:-1])
+        self.assertTrue(np.isnan(obtenido[-1]))
+
+
+class TestExportacion(unittest.TestCase):
+    def test_excel_por_bloques_con_hojas_por_variante(self):
+        import pandas as pd
+        from logic import EsquemaOperaciones, ProcesadorLogico
+
+        procesador = ProcesadorLogico()
+        procesador.FILAS_POR_BLOQUE_EXCEL = 70  # varios bloques
+        procesador.dataframe_operaciones = EsquemaOperaciones.aplicar(TestRecalculo._operaciones_aleatorias(500))
+        procesador.recalcular_con_porcentajes_ajustados(procesador.detectar_configuraciones_plan())
+        esperado = EsquemaOperaciones.vista_en_pesos(procesador.dataframe_resultados).reset_index(drop=True)
+
+        procesador.excel_hojas_por_variante = True
+        hojas = pd.read_excel(procesador.exportar_excel_bytes(), sheet_name=None, dtype={"cupon": str, "plan": str})
+        self.assertEqual(list(hojas)[0], "Resultados")
+        resultados = hojas.pop("Resultados")
+        self.assertEqual(list(resultados.columns), list(esperado.columns))
+        self.assertEqual(resultados["cupon"].tolist(), esperado["cupon"].tolist())
+        self.assertEqual(resultados["diferencia"].tolist(), esperado["diferencia"].tolist())
+
+        # Una hoja por variante, con nombres válidos para Excel, que juntas cubren todas las filas
+        variantes = sorted(esperado["variante_plan"].unique())
+        self.assertEqual(len(hojas), len(variantes))
+        self.assertTrue(all(len(nombre) <= 31 and "/" not in nombre for nombre in hojas))
+        for nombre, variante in zip(hojas, variantes):
+            self.assertEqual(set(hojas[nombre]["variante_plan"]), {variante})
+        self.assertEqual(sum(len(hoja) for hoja in hojas.values()), len(esperado))
+
+    def test_exportacion_en_memoria_concurrente(self):
+        import os
+        import tempfile
+        import instrumentacion
+        from generador_resumenes import GeneradorResumenes
+        from logic import ProcesadorLogico
+
+        procesador = ProcesadorLogico()
+        procesador.dataframe_operaciones = GeneradorResumenes(proporcion_errores=0.2, semilla=6).dataframe(80)
+        procesador.recalcular_con_porcentajes_ajustados(procesador.detectar_configuraciones_plan())
+
+        with instrumentacion.capturar() as registro:
+            exportados = procesador.exportar_en_memoria(["pdf", "csv", "excel", "otro"])
+        self.assertEqual(list(exportados), ["pdf", "csv", "excel"])
+        self.assertEqual(procesador.errores_exportacion, {})
+        self.assertTrue(exportados["pdf"].startswith(b"%PDF"))
+        self.assertTrue(exportados["excel"].startswith(b"PK"))
+        self.assertEqual(exportados["csv"], procesador.exportar_bytes("csv"))
+        # Los tramos de los hilos quedan en el registro de quien exporta
+        self.assertEqual({"exportar.csv", "exportar.excel", "exportar.pdf"} - set(registro.instantanea()), set())
+
+        # En disco se escribe lo mismo que en memoria
+        with tempfile.TemporaryDirectory() as directorio:
+            rutas = procesador.exportacion_de_informes(["csv"], os.path.join(directorio, "r"))
+            with open(rutas["csv"], "rb") as archivo:
+                self.assertEqual(archivo.read(), exportados["csv"])
+
+        # Un formato que falla no corta a los demás
+        procesador.exportar_excel_bytes = lambda: 1 / 0
+        exportados = procesador.exportar_en_memoria(["csv", "excel"])
+        self.assertEqual(list(exportados), ["csv"])
+        self.assertIn("ZeroDivisionError", procesador.errores_exportacion["excel"])
+        with self.assertRaises(ValueError):
+            procesador.exportar_bytes("docx")
+
+    def test_tabla_de_errores_del_pdf_por_segmentos(self):
+        import os
+        import tempfile
+        import pdfplumber
+        from generador_resumenes import GeneradorResumenes
+        from logic import ProcesadorLogico
+
+        procesador = ProcesadorLogico()
+        procesador.FILAS_POR_SEGMENTO_PDF = 7  # segmentos más chicos que una página
+        procesador.dataframe_operaciones = GeneradorResumenes(proporcion_errores=1.0, semilla=4).dataframe(90)
+        procesador.recalcular_con_porcentajes_ajustados(procesador.detectar_configuraciones_plan())
+        errores = procesador.dataframe_resultados[procesador.dataframe_resultados["estado"] == "Incorrecta"]
+
+        filas = list(procesador._filas_pdf_de_errores(errores, 7))
+        self.assertEqual(len(filas), len(errores))
+        self.assertEqual([fila[3] for fila in filas], list(errores["cupon"]))
+        self.assertTrue(all(len(fila) == 15 and fila[13].startswith("$") for fila in filas))
+
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "r.pdf")
+            procesador._exportar_pdf_interno(ruta)
+            with pdfplumber.open(ruta) as pdf:
+                textos = [pagina.extract_text() for pagina in pdf.pages]
+
+        self.assertGreater(len(textos), 2)
+        es_fila = lambda linea: linea[:2].isdigit() and "/" in linea[:10]
+        paginas_tabla = [texto for texto in textos if any(es_fila(linea) for linea in texto.splitlines())]
+        self.assertGreater(len(paginas_tabla), 2)
+        self.assertTrue(all("Fecha de Compra" in texto for texto in paginas_tabla))  # encabezado en cada página
+        cupones = [linea.split()[3] for texto in textos for linea in texto.splitlines() if es_fila(linea)]
+        self.assertEqual(cupones, list(errores["cupon"]))
+        self.assertIn("TOTAL DIFERENCIA ADEUDADA", textos[-1])
+
+    def test_grafico_de_planes_vectorial_en_pdf(self):
+        import sys
+        from unittest import mock
+        import pdfplumber
+        from generador_resumenes import GeneradorResumenes
+        from logic import ProcesadorLogico
+
+        procesador = ProcesadorLogico()
+        procesador.dataframe_operaciones = GeneradorResumenes(proporcion_errores=0.2, semilla=8).dataframe(60)
+        procesador.recalcular_con_porcentajes_ajustados(procesador.detectar_configuraciones_plan())
+        conteo = procesador.conteo_planes_ventas()
+        self.assertIs(procesador.conteo_planes_ventas(), conteo)  # una vez por asignación
+
+        # Sin matplotlib disponible el PDF sale igual, con el gráfico como texto y trazos (sin imagen)
+        with mock.patch.dict(sys.modules, {"matplotlib": None, "matplotlib.figure": None}):
+            datos = procesador.exportar_pdf_bytes()
+        with pdfplumber.open(datos) as pdf:
+            pagina = pdf.pages[0]
+            texto = pagina.extract_text()
+            self.assertEqual(pagina.images, [])
+        self.assertIn("DISTRIBUCIÓN DE PLANES", texto)
+        total = int(conteo.sum())
+        for plan, cantidad in conteo.items():
+            self.assertIn(f"Plan {plan} ({100 * cantidad / total:.1f}%)", texto)
+
+
+class TestCacheResumenes(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def test_segunda_carga_sale_de_cache_sin_abrir_el_pdf(self):
+        from unittest import mock
+        import logic
+        from cache_resumenes import CacheResumenes
+
+        pdf_bytes = _pdf_resumen_de_prueba(10)
+        cache = CacheResumenes(self._tmp.name)
+        primero = logic.ProcesadorLogico(cache=cache).cargar_resumen_pdf(pdf_bytes)
+        self.assertFalse(primero.desde_cache)
+
+        procesador = logic.ProcesadorLogico(cache=cache)
+        with mock.patch.object(logic.pdfplumber, "open") as abrir:
+            segundo = procesador.cargar_resumen_pdf(pdf_bytes)
+        abrir.assert_not_called()
+        self.assertTrue(segundo.desde_cache)
+        self.assertTrue(segundo.operaciones.equals(primero.operaciones))
+        self.assertEqual(segundo.metadatos, primero.metadatos)
+        self.assertIs(procesador.dataframe_operaciones, segundo.operaciones)
+
+    def test_desalojo_lru_respeta_el_limite(self):
+        import os
+        import time
+        from cache_resumenes import CacheResumenes
+
+        cache = CacheResumenes(self._tmp.name, limite_bytes=13_000)
+        for i in range(3):
+            cache.guardar(f"k{i}", b"x" * 4_000)
+            marca = time.time() - 100 + i
+            os.utime(cache._ruta(f"k{i}"), (marca, marca))
+        self.assertIsNotNone(cache.obtener("k0"))  # k0 pasa a ser el más reciente
+        cache.guardar("k3", b"x" * 4_000)
+
+        self.assertLessEqual(cache.tamano_total(), 13_000)
+        self.assertIsNotNone(cache.obtener("k0"))
+        self.assertIsNone(cache.obtener("k1"))
+
+
+class TestCacheExportaciones(unittest.TestCase):
+    def test_cache_de_exportaciones_por_huella(self):
+        import threading
+        from cache_exportaciones import CacheExportaciones
+        from generador_resumenes import GeneradorResumenes
+        from logic import ProcesadorLogico
+
+        cache = CacheExportaciones()
+        procesador = ProcesadorLogico(cache_exportaciones=cache)
+        procesador.dataframe_operaciones = GeneradorResumenes(proporcion_errores=0.2, semilla=8).dataframe(60)
+        porcentajes = procesador.detectar_configuraciones_plan()
+        procesador.recalcular_con_porcentajes_ajustados(porcentajes)
+
+        self.assertIsNone(procesador.exportacion_en_cache("csv"))
+        primero = procesador.exportar_bytes("csv")
+        self.assertEqual(procesador.exportar_bytes("csv"), primero)
+        self.assertEqual((cache.generadas, cache.aciertos), (1, 1))
+        self.assertEqual(procesador.exportacion_en_cache("csv"), primero)
+
+        # Cambian las opciones o los porcentajes: cambia la clave
+        clave_excel = procesador.huella_exportacion("excel")
+        procesador.excel_hojas_por_variante = True
+        self.assertNotEqual(procesador.huella_exportacion("excel"), clave_excel)
+        clave_csv = procesador.huella_exportacion("csv")
+        otros = {plan: {clave: valor + 1 for clave, valor in datos.items()} for plan, datos in porcentajes.items()}
+        procesador.recalcular_con_porcentajes_ajustados(otros)
+        self.assertNotEqual(procesador.huella_exportacion("csv"), clave_csv)
+        self.assertIsNone(procesador.exportacion_en_cache("csv"))
+
+        # Límite de tamaño: se desaloja lo menos usado y lo que no entra no se guarda
+        chica = CacheExportaciones(limite_bytes=10)
+        chica.guardar("a", b"1234")
+        chica.guardar("b", b"1234")
+        chica.obtener("a")
+        chica.guardar("c", b"1234")
+        self.assertEqual((chica.obtener("a"), chica.obtener("b"), len(chica)), (b"1234", None, 2))
+        chica.guardar("d", b"x" * 11)
+        self.assertIsNone(chica.obtener("d"))
+
+        # Dos pedidos simultáneos de la misma clave generan una sola vez: el
+        # primero no termina de generar hasta que el segundo espera su lock
+        compartida = CacheExportaciones()
+        llamadas = []
+        adentro = threading.Event()
+        esperando = threading.Event()
+        vio_espera = []
+
+        class LockObservado:
+            def __init__(self, lock):
+                self.lock = lock
+
+            def __enter__(self):
+                esperando.set()
+                self.lock.acquire()
+
+            def __exit__(self, *excepcion):
+                self.lock.release()
+
+        def generar():
+            llamadas.append(1)
+            compartida._generando["k"] = LockObservado(compartida._generando["k"])
+            adentro.set()
+            vio_espera.append(esperando.wait(5))
+            return b"datos"
+
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(compartida.obtener_o_generar("k", generar)))
+                 for _ in range(2)]
+        hilos[0].start()
+        self.assertTrue(adentro.wait(5))
+        hilos[1].start()
+        for hilo in hilos:
+            hilo.join(5)
+        self.assertEqual(vio_espera, [True])
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual(sorted(resultados), [(b"datos", False), (b"datos", True)])
+
+
+class TestHistorialOperaciones(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def test_resumen_guardado_vuelve_igual_al_pipeline(self):
+        from logic import ProcesadorLogico
+        from historial_operaciones import HistorialOperaciones
+
+        procesador = ProcesadorLogico(historial=HistorialOperaciones(self._tmp.name))
+        resumen = procesador.cargar_resumen_pdf(_pdf_resumen_de_prueba(30))
+        self.assertEqual(procesador.guardar_en_historial([resumen]), ["LIQ_0001-00012345"])
+        self.assertEqual(procesador.historial.meses("LIQ_0001-00012345"), ["2024-03"])
+
+        otro = ProcesadorLogico(historial=HistorialOperaciones(self._tmp.name))
+        self.assertTrue(otro.cargar_desde_historial().equals(resumen.operaciones))
+        self.assertTrue(otro.detectar_configuraciones_plan())
+
+    def test_particiones_por_mes_proyeccion_y_reemplazo(self):
+        import pandas as pd
+        from historial_operaciones import HistorialOperaciones
+
+        historial = HistorialOperaciones(self._tmp.name)
+        operaciones = TestRecalculo._operaciones_aleatorias(900)
+        operaciones["fecha"] = ["15/01/2024", "15/02/2024", "15/03/2024"] * 300
+        historial.agregar(operaciones, "A")
+        historial.agregar(operaciones.iloc[:10], "B")
+        self.assertEqual(historial.meses("A"), ["2024-01", "2024-02", "2024-03"])
+
+        proyectado = historial.leer(columnas=["importe", "plan"], desde="2024-02", con_resumen=True)
+        self.assertEqual(list(proyectado.columns), ["importe", "plan", "resumen"])
+        self.assertEqual(len(proyectado), 600 + 6)
+        self.assertEqual(proyectado["resumen"].value_counts().to_dict(), {"A": 600, "B": 6})
+        self.assertIsInstance(proyectado["plan"].dtype, pd.CategoricalDtype)
+
+        historial.agregar(operaciones.iloc[:3], "A")  # volver a guardar reemplaza, no duplica
+        self.assertEqual(len(historial.leer(resumenes=["A"])), 3)
+
+    def test_leer_sin_particiones_y_columnas_desconocidas(self):
+        from historial_operaciones import HistorialOperaciones
+
+        historial = HistorialOperaciones(self._tmp.name)
+        historial.agregar(TestRecalculo._operaciones_aleatorias(4), "A")
+
+        vacio = historial.leer(columnas=["importe", "plan"], desde="2030-01", con_resumen=True)
+        self.assertTrue(vacio.empty)
+        self.assertEqual(list(vacio.columns), ["importe", "plan", "resumen"])
+
+        # Se valida antes de leer: mismo error con y sin particiones que coincidan
+        for filtro in ({}, {"desde": "2030-01"}):
+            with self.assertRaisesRegex(ValueError, "importe_total"):
+                historial.leer(columnas=["importe", "importe_total"], **filtro)
+
+
+class TestInstrumentacion(unittest.TestCase):
+    def test_tramos_de_tiempo_por_etapa(self):
+        import os
+        import tempfile
+        import instrumentacion
+        from generador_resumenes import GeneradorResumenes
+        from logic import ProcesadorLogico
+
+        procesador = ProcesadorLogico()
+        global_antes = instrumentacion.registro().instantanea()
+        with instrumentacion.capturar() as registro:
+            resumen = procesador.cargar_resumen_pdf(GeneradorResumenes(semilla=2).pdf(60, paginas=3))
+            procesador.dataframe_operaciones = resumen.operaciones
+            procesador.recalcular_con_porcentajes_ajustados(procesador.detectar_configuraciones_plan())
+            procesador.generar_reporte_por_plan()
+            with tempfile.TemporaryDirectory() as directorio:
+                rutas = procesador.exportacion_de_informes(["csv"], os.path.join(directorio, "r"))
+                procesador.exportacion_de_informes(["csv"], os.path.join(directorio, "no", "existe"))
+
+        tramos = registro.instantanea()
+        for nombre in ("ingesta", "metadatos", "operaciones", "deteccion_planes", "recalculo", "reporte_por_plan"):
+            self.assertIn(nombre, tramos)
+        self.assertEqual(tramos["ingesta"]["contadores"]["filas"], 60)
+        self.assertEqual(tramos["recalculo"]["contadores"]["filas"], 60)
+        paginas = sum(t["cantidad"] for n, t in tramos.items() if n.startswith("pagina."))
+        self.assertEqual(paginas, 3)
+        # El export que falla queda registrado (no se imprime) y no invalida los anteriores
+        self.assertIn("csv", rutas)
+        self.assertEqual(tramos["exportar.csv"]["cantidad"], 2)
+        self.assertIn("csv", procesador.errores_exportacion)
+        # Una etapa que falla también queda registrada
+        with instrumentacion.capturar() as con_error:
+            porcentajes_invalidos = {variante: {"arancel": "x"} for variante in procesador.detectar_configuraciones_plan()}
+            with self.assertRaises(ValueError):
+                procesador.recalcular_con_porcentajes_ajustados(porcentajes_invalidos)
+        self.assertEqual(con_error.instantanea()["recalculo"]["cantidad"], 1)
+        # Lo capturado no se mezcla con el registro global
+        self.assertEqual(instrumentacion.registro().instantanea(), global_antes)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_resumen_sintetico_se_lee_igual_a_lo_generado(self):
+        from generador_resumenes import GeneradorResumenes
+        from logic import ProcesadorLogico
+
+        generador = GeneradorResumenes(proporcion_errores=0.1, semilla=7)
+        filas = generador.filas(120)
+        resumen = ProcesadorLogico().cargar_resumen_pdf(generador.pdf(filas=filas, paginas=5, paginas_sin_operaciones=1))
+
+        self.assertTrue(resumen.operaciones.equals(generador.dataframe(filas=filas)))
+        self.assertEqual(resumen.extraccion["paginas"], 6)
+        self.assertEqual(resumen.extraccion["paginas_omitidas"], 1)
+        self.assertEqual(resumen.metadatos["tipo_numero"], "LIQ 0001-00012352")
+
+        procesador = ProcesadorLogico()
+        procesador.dataframe_operaciones = resumen.operaciones
+        resultados = procesador.recalcular_con_porcentajes_ajustados(procesador.detectar_configuraciones_plan())
+        # Solo las operaciones generadas con error dan "Incorrecta"
+        incorrectas = resultados["estado"] == "Incorrecta"
+        self.assertTrue(0 < incorrectas.sum() < 120)
+        self.assertTrue((resultados.loc[incorrectas, "diferencia"] >= 5).all())
+
+    def test_mediciones_por_etapa_con_limites_y_dependencias(self):
+        from benchmark import ETAPAS, comparar, medir_tamano
+
+        etapas = [e for e in ETAPAS if e != "parseo_pdf"]
+        medicion = medir_tamano(300, etapas, limites={"exportar_pdf": 100})
+
+        self.assertEqual(medicion["operaciones"], 300)
+        self.assertNotIn("parseo_pdf", medicion["etapas"])
+        for etapa in ("metadatos", "deteccion_planes", "recalculo", "reporte_por_plan", "exportar_csv", "exportar_excel"):
+            self.assertGreaterEqual(medicion["etapas"][etapa]["segundos"], 0, etapa)
+        self.assertIn("omitida", medicion["etapas"]["exportar_pdf"])
+        self.assertIn("recalculo", comparar({"resultados": [medicion]}, {"resultados": [medicion]}))
+
+        sin_planes = medir_tamano(50, ["recalculo"])
+        self.assertEqual(sin_planes["etapas"]["recalculo"], {"omitida": "requiere deteccion_planes"})
+
+
 def run_tests() -> int:
-    suite = unittest.defaultTestLoader.loadTestsFromTestCase(TestLogic)
+    suite = unittest.TestSuite()
+    for caso in (
+        TestLogic, TestProcesadorLogico, TestRecalculo, TestExportacion, TestCacheResumenes,
+        TestCacheExportaciones, TestHistorialOperaciones, TestInstrumentacion, TestBenchmark,
+    ):
+        suite.addTests(unittest.defaultTestLoader.loadTestsFromTestCase(caso))
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)
     return 0 if result.wasSuccessful() else 1